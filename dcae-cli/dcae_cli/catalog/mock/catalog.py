@@ -24,25 +24,30 @@ Provides the mock catalog
 """
 import os
 import json
-import contextlib
+import base64
 import itertools
+import weakref
+import contextlib
+from collections import namedtuple
 from functools import partial
 from datetime import datetime
 
 import six
 
-from sqlalchemy import create_engine as create_engine_, event, and_, or_
+from sqlalchemy import create_engine as create_engine_, event, and_, or_, func, tuple_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy_utils import database_exists, create_database, drop_database
 
 from dcae_cli import _version as cli_version
-from dcae_cli.catalog.mock.tables import Component, Format, FormatPair, Base
+from dcae_cli.catalog.mock.tables import Component, Format, FormatPair, Base, subscribed, \
+        provided
+from dcae_cli.catalog.mock import migrations
 from dcae_cli.catalog.mock.schema import validate_component, validate_format, apply_defaults_docker_config
 from dcae_cli.util import reraise_with_msg, get_app_dir
 from dcae_cli.util.config import get_config, get_path_component_spec, \
-    get_path_data_format
+    get_path_data_format, get_db_pool_settings
 from dcae_cli.util.logger import get_logger
 from dcae_cli.util.docker_util import image_exists
 from dcae_cli.catalog.exc import CatalogError, DuplicateEntry, MissingEntry, FrozenEntry
@@ -57,7 +62,7 @@ def _get_component(session, name, version):
     '''Returns a single component ORM'''
     try:
         if not version:
-            query = session.query(Component).filter(Component.name==name).order_by(Component.version.desc()).limit(1)
+            query = session.query(Component).filter(Component.name==name).order_by(Component.version_key.desc()).limit(1)
         else:
             query = session.query(Component).filter(Component.name==name, Component.version==version)
         return query.one()
@@ -74,13 +79,18 @@ def _get_docker_image(session, name, version):
     comp = _get_component(session, name, version)
     return _get_docker_image_from_spec(comp.get_spec_as_dict())
 
-def _add_docker_component(session, user, spec, update, enforce_image=True):
-    '''Adds/updates a docker component to the catalog'''
+def _verify_docker_image(spec):
+    '''Raises CatalogError if the docker image of the spec does not exist locally'''
     image = _get_docker_image_from_spec(spec)
 
-    if enforce_image and not image_exists(image):
+    if not image_exists(image):
         raise CatalogError("Specified image '{}' does not exist locally.".format(image))
 
+def _add_docker_component(session, user, spec, update, enforce_image=True):
+    '''Adds/updates a docker component to the catalog'''
+    if enforce_image:
+        _verify_docker_image(spec)
+
     comp = build_generic_component(session, user, spec, update)
     session.commit()
 
@@ -94,11 +104,21 @@ def _add_cdap_component(session, user, spec, update):
     session.commit()
 
 
+_sessionmakers = weakref.WeakKeyDictionary()
+
+def _get_sessionmaker(engine):
+    '''Returns the session factory of the engine, creating it once'''
+    Session = _sessionmakers.get(engine)
+    if Session is None:
+        Session = _sessionmakers[engine] = sessionmaker(engine)
+    return Session
+
+
 #PUBLIC FUNCTIONS
 @contextlib.contextmanager
 def SessionTransaction(engine):
     '''Provides a transactional scope around a series of operations'''
-    Session = sessionmaker(engine)
+    Session = _get_sessionmaker(engine)
     try:
         session = Session()
         yield session
@@ -116,11 +136,12 @@ def SessionTransaction(engine):
 
 _dup_e = DuplicateEntry('Entry already exists. Try using the --update flag.')
 
-def _raise_if_duplicate(url, e):
-    '''Raises if the exception relates to duplicate entries'''
-    if 'sqlite' in url:
-        if 'UNIQUE' in e.orig.args[0].upper():
-            raise _dup_e
+def _is_duplicate(url, e):
+    '''Returns True if the exception relates to duplicate entries'''
+    if not isinstance(e, IntegrityError):
+        return False
+    elif 'sqlite' in url:
+        return 'UNIQUE' in e.orig.args[0].upper()
     elif 'postgres' in url:
         # e.orig is of type psycopg2.IntegrityError that has 
         # pgcode which uses the following:
@@ -128,8 +149,13 @@ def _raise_if_duplicate(url, e):
         # https://www.postgresql.org/docs/current/static/errcodes-appendix.html#ERRCODES-TABLE
         #
         # 23505 means "unique_violation"
-        if e.orig.pgcode == "23505":
-            raise _dup_e
+        return e.orig.pgcode == "23505"
+    return False
+
+def _raise_if_duplicate(url, e):
+    '''Raises if the exception relates to duplicate entries'''
+    if _is_duplicate(url, e):
+        raise _dup_e
 
 def create_engine(base, db_name=None, purge_existing=False, db_url=None):
     '''Returns an initialized database engine'''
@@ -146,30 +172,74 @@ def create_engine(base, db_name=None, purge_existing=False, db_url=None):
         # a full db url is the most explicit input and should be used over other inputs if provided
         url = db_url
 
-    if not database_exists(url):
-        create_database(url)
-    elif purge_existing:
-        drop_database(url)
-        create_database(url)
+    if purge_existing:
+        _dispose_engine(url)
+
+        if database_exists(url):
+            drop_database(url)
 
-    engine = create_engine_(url)
+    engine = _engines.get(url)
+    if engine is not None:
+        return engine
+
+    engine = create_engine_(url, **_get_pool_settings(url))
     _configure_engine(engine)
-    base.metadata.create_all(engine)
+
+    # An up to date schema is recognized with a single query so the existence
+    # checks and table creation are skipped on most runs
+    if not migrations.is_current(engine):
+        if not database_exists(url):
+            create_database(url)
+
+        migrations.upgrade(engine, base.metadata)
+
+    _engines[url] = engine
     return engine
 
 
+_engines = dict()
+
+def _dispose_engine(url):
+    '''Closes the pooled connections of a cached engine and forgets it'''
+    engine = _engines.pop(url, None)
+    if engine is not None:
+        engine.dispose()
+
+
+def _get_pool_settings(url):
+    '''Returns the configured pool settings. SQLite uses its own default pools.'''
+    if 'sqlite' in url:
+        return {}
+    return get_db_pool_settings()
+
+
 def _configure_engine(engine):
     '''Performs additional db-specific configurations'''
     str_url = str(engine.url)
     if 'sqlite' in str_url:
-        event.listen(engine, 'connect', lambda conn, record: conn.execute('pragma foreign_keys=ON'))
+        event.listen(engine, 'connect', _on_sqlite_connect)
+        event.listen(engine, 'begin', _on_sqlite_begin)
+
+
+def _on_sqlite_connect(conn, record):
+    conn.execute('pragma foreign_keys=ON')
+    # pysqlite's own transaction handling breaks SAVEPOINT (used by bulk adds).
+    # Disable it and emit BEGIN ourselves in _on_sqlite_begin.
+    conn.isolation_level = None
+
+
+def _on_sqlite_begin(conn):
+    if hasattr(conn, 'exec_driver_sql'):
+        conn.exec_driver_sql('BEGIN')
+    else:
+        conn.execute('BEGIN')
 
 
 def get_format(session, name, version):
     '''Returns a single data format ORM'''
     try:
         if not version:
-            query = session.query(Format).filter(Format.name==name).order_by(Format.version.desc()).limit(1)
+            query = session.query(Format).filter(Format.name==name).order_by(Format.version_key.desc()).limit(1)
         else:
             query = session.query(Format).filter(Format.name==name, Format.version==version)
         return query.one()
@@ -177,15 +247,31 @@ def get_format(session, name, version):
         msg = "{}:{}".format(name, version) if version else name
         raise MissingEntry("Data format '{}' was not found in the catalog.".format(msg))
 
+def _make_get_format_cached(session):
+    '''Returns a get_format function that resolves each (name, version) once'''
+    formats = dict()
+
+    def get_format_cached(name, version):
+        key = (name, version)
+        if key not in formats:
+            formats[key] = get_format(session, name, version)
+        return formats[key]
+
+    get_format_cached.formats = formats
+    return get_format_cached
+
 def _create_format_tuple(entry):
     '''Create tuple to identify format'''
     return (entry['format'], entry['version'])
 
 
-def _get_format_pair(session, req_name, req_version, resp_name, resp_version, create=True):
+def _get_format_pair(session, req_name, req_version, resp_name, resp_version, create=True,
+        get_format_func=None):
     '''Returns a single data format pair ORM'''
-    req = get_format(session, req_name, req_version)
-    resp = get_format(session, resp_name, resp_version)
+    get_format_func = partial(get_format, session) if get_format_func is None \
+            else get_format_func
+    req = get_format_func(req_name, req_version)
+    resp = get_format_func(resp_name, resp_version)
 
     query = session.query(FormatPair).filter(and_(FormatPair.req == req, FormatPair.resp == resp))
     try:
@@ -228,6 +314,20 @@ def verify_component(session, name, version):
     return orm.name, orm.version
 
 
+def list_component_keys(session, names):
+    '''Returns the (name, version) of the components named like any of names
+
+    Dashes and dots are treated alike when comparing names as instance names
+    only keep dots. See discovery.replace_dots.
+    '''
+    dotted = set(name.replace('-', '.') for name in names)
+    if not dotted:
+        return []
+    query = session.query(Component.name, Component.version) \
+            .filter(func.replace(Component.name, '-', '.').in_(dotted))
+    return [ (name, version) for name, version in query ]
+
+
 def get_component_type(session, name, version):
     '''Returns the component_type of a given component'''
     return _get_component(session, name, version).component_type
@@ -243,8 +343,12 @@ def get_format_spec(session, name, version):
     return json.loads(get_format(session, name, version).spec)
 
 
-def build_generic_component(session, user, spec, update):
-    '''Builds, adds, and returns a generic component ORM. Does not commit changes.'''
+def build_generic_component(session, user, spec, update, get_format_func=None):
+    '''Builds, adds, and returns a generic component ORM. Does not commit changes.
+
+    get_format_func: func(name, version) -> Format ORM used to resolve the data
+        formats. Defaults to querying the session each time.
+    '''
     attrs = spec['self'].copy()
     attrs['spec'] = json.dumps(spec)
 
@@ -274,7 +378,8 @@ def build_generic_component(session, user, spec, update):
         setattr(comp, attr, val)
 
     # update relationships
-    get_format_local = partial(get_format, session)
+    get_format_local = partial(get_format, session) if get_format_func is None \
+            else get_format_func
     get_unique_formats = partial(_get_unique_format_things, _create_format_tuple,
             get_format_local)
 
@@ -288,7 +393,8 @@ def build_generic_component(session, user, spec, update):
     except MissingEntry as e:
         reraise_with_msg(e, 'Add failed while traversing "subscribes"')
 
-    get_format_pairs = partial(_get_format_pair, session)
+    get_format_pairs = partial(_get_format_pair, session,
+            get_format_func=get_format_local)
     get_unique_format_pairs = partial(_get_unique_format_things,
             _create_format_pair_tuple, get_format_pairs)
 
@@ -305,8 +411,8 @@ def build_generic_component(session, user, spec, update):
     return comp
 
 
-def add_format(session, spec, user, update):
-    '''Helper function which adds a data format to the catalog'''
+def build_format(session, spec, user, update):
+    '''Builds, adds, and returns a data format ORM. Does not commit changes.'''
     attrs = spec['self'].copy()
     attrs['spec'] = json.dumps(spec)
     name, version = attrs['name'], attrs['version']
@@ -331,29 +437,83 @@ def add_format(session, spec, user, update):
     data_format.cli_version = cli_version.__version__
     data_format.schema_path = get_path_data_format()
 
+    return data_format
+
+
+def add_format(session, spec, user, update):
+    '''Helper function which adds a data format to the catalog'''
+    build_format(session, spec, user, update)
     session.commit()
 
 
-def _filter_neighbors(session, neighbors=None):
-    '''Returns a Component query filtered by available neighbors'''
-    if neighbors is None:
-        query = session.query(Component)
+def _validate_bulk(validate_funcs, entries):
+    '''Validates (kind, label, spec) entries
+
+    Validation is CPU bound so it is done in turn. Remote schemas are fetched
+    into the schema cache once and reused by the entries that follow.
+
+    Returns
+    -------
+    Dict of (kind, label) to error message for the entries that failed validation
+    '''
+    errors = dict()
+
+    for kind, label, spec in entries:
+        try:
+            for validate_func in validate_funcs[kind]:
+                validate_func(spec)
+        except Exception as e:
+            errors[(kind, label)] = str(e)
+
+    return errors
+
+
+def _build_bulk_entry(session, user, update, get_format_func, kind, spec):
+    '''Builds and flushes a single data format or component of a bulk add'''
+    if kind == "format":
+        data_format = build_format(session, spec, user, update)
+        session.flush()
+        # Make the new data format resolvable by the components that follow
+        get_format_func.formats[(data_format.name, data_format.version)] = data_format
     else:
-        subfilt = or_(and_(Component.name==n, Component.version==v) for n,v in neighbors)
-        query = session.query(Component).filter(subfilt)
-    return query
+        build_generic_component(session, user, spec, update,
+                get_format_func=get_format_func)
+        session.flush()
+
+
+def _get_linked_neighbors(session, link_table, link_column, link_ids, neighbors=None):
+    '''Returns a dict of link id to the component ORMs linked to it through link_table
+
+    All links are resolved with a single query. When given, the neighbors are
+    matched as a single row-value IN against a VALUES list rather than an OR
+    filter per neighbor so that (name, version) index lookups can be used.
+    '''
+    linked = dict()
+    if not link_ids or (neighbors is not None and not neighbors):
+        return linked
+
+    link_id = link_table.c[link_column]
+    query = session.query(link_id, Component) \
+            .join(link_table, link_table.c.component_id==Component.id) \
+            .filter(link_id.in_(set(link_ids)))
+
+    if neighbors is not None:
+        query = query.filter(tuple_(Component.name, Component.version) \
+                .in_(set(tuple(n) for n in neighbors)))
+
+    for id_, comp in query:
+        linked.setdefault(id_, []).append(comp)
+    return linked
 
 
 def get_subscribers(session, orm, neighbors=None):
     '''Returns a list of component ORMs which subscribe to the specified format'''
-    query = _filter_neighbors(session, neighbors)
-    return query.filter(Component.subscribes.contains(orm)).all()
+    return _get_linked_neighbors(session, subscribed, 'format_id', [orm.id], neighbors).get(orm.id, [])
 
 
 def get_providers(session, orm, neighbors=None):
     '''Returns a list of component ORMs which provide the specified format pair'''
-    query = _filter_neighbors(session, neighbors)
-    return query.filter(Component.provides.contains(orm)).all()
+    return _get_linked_neighbors(session, provided, 'pair_id', [orm.id], neighbors).get(orm.id, [])
 
 
 def _match_pub(entries, orms):
@@ -374,23 +534,40 @@ def _match_call(entries, orms):
         key = (entry['request']['format'], entry['request']['version'], entry['response']['format'], entry['response']['version'])
         yield entry['config_key'], lookup[key]
 
-def get_discovery(get_params_func, session, name, version,  neighbors=None):
-    '''Returns the parameters and interface map for a given component and considering its neighbors'''
-    comp = _get_component(session, name, version)
-    spec = json.loads(comp.spec)
+def _get_discovery_for_orm(get_params_func, session, comp, spec, neighbors=None):
+    '''Returns the parameters and interface map for a component ORM and its parsed spec'''
+    # neighbors may be a one-shot iterator and is used by two queries
+    neighbors = None if neighbors is None else set(map(tuple, neighbors))
+
+    pubs = list(_match_pub(spec['streams']['publishes'], comp.publishes))
+    calls = list(_match_call(spec['services']['calls'], comp.calls))
+
+    subscribers = _get_linked_neighbors(session, subscribed, 'format_id',
+            [orm.id for _, orm in pubs], neighbors)
+    providers = _get_linked_neighbors(session, provided, 'pair_id',
+            [orm.id for _, orm in calls], neighbors)
+
     interfaces = dict()
-    for key, orm in _match_pub(spec['streams']['publishes'], comp.publishes):
-        interfaces[key] = [(c.name, c.version) for c in get_subscribers(session, orm, neighbors) if not c is comp]
+    for key, orm in pubs:
+        interfaces[key] = [(c.name, c.version) for c in subscribers.get(orm.id, []) if not c is comp]
 
-    for key, orm in _match_call(spec['services']['calls'], comp.calls):
-        interfaces[key] = [(c.name, c.version) for c in get_providers(session, orm, neighbors) if not c is comp]
+    for key, orm in calls:
+        interfaces[key] = [(c.name, c.version) for c in providers.get(orm.id, []) if not c is comp]
 
     params = get_params_func(spec)
     return params, interfaces
 
+def get_discovery(get_params_func, session, name, version,  neighbors=None):
+    '''Returns the parameters and interface map for a given component and considering its neighbors'''
+    comp = _get_component(session, name, version)
+    return _get_discovery_for_orm(get_params_func, session, comp,
+            json.loads(comp.spec), neighbors)
+
+def _get_docker_params(spec):
+    return {param['name']: param['value'] for param in spec['parameters']}
+
 _get_discovery_for_cdap = partial(get_discovery, normalize_cdap_params)
-_get_discovery_for_docker = partial(get_discovery,
-        lambda spec: {param['name']: param['value'] for param in spec['parameters']})
+_get_discovery_for_docker = partial(get_discovery, _get_docker_params)
 
 
 def _get_discovery_for_dmaap(get_component_spec_func, name, version):
@@ -419,23 +596,74 @@ def _get_discovery_for_dmaap(get_component_spec_func, name, version):
     return mr_keys, dr_keys
 
 
-def _filter_latest(orms):
-    '''Filters and yields only (name, version, *) orm tuples with the highest version'''
-    get_first_key_func = lambda x: x[0]
-    # itertools.groupby requires the input to be sorted
-    sorted_orms = sorted(orms, key=get_first_key_func)
-    for _, g in itertools.groupby(sorted_orms, get_first_key_func):
-        yield max(g, key=lambda x: x[1])
+# Everything needed to deploy a component. See resolve_for_run.
+RunBundle = namedtuple('RunBundle', ['name', 'version', 'component_type', 'spec',
+    'image', 'docker_config', 'jar', 'cdap_config', 'params', 'interface_map',
+    'dmaap_config_keys'])
 
 
-def list_components(session, user, only_published, subscribes=None, publishes=None,
-        provides=None, calls=None, latest=True):
-    """Get list of components
+def _resolve_orm_for_run(session, comp, spec, neighbors=None):
+    '''Returns the RunBundle of a component ORM and its parsed spec'''
+    image = docker_config = jar = cdap_config = None
 
-    Returns:
-    --------
-    List of component orms as dicts
-    """
+    if comp.component_type == 'docker':
+        get_params_func = _get_docker_params
+        image = _get_docker_image_from_spec(spec)
+        docker_config = apply_defaults_docker_config(spec["auxilary"])
+    else:
+        get_params_func = normalize_cdap_params
+        jar = _get_cdap_jar_from_spec(spec)
+        cdap_config = spec["auxilary"]
+
+    params, interface_map = _get_discovery_for_orm(get_params_func, session,
+            comp, spec, neighbors)
+    dmaap_config_keys = _get_discovery_for_dmaap(lambda name, version: spec,
+            comp.name, comp.version)
+
+    return RunBundle(comp.name, comp.version, comp.component_type, spec, image,
+            docker_config, jar, cdap_config, params, interface_map, dmaap_config_keys)
+
+
+def resolve_for_run(session, name, version, neighbors=None):
+    '''Returns the RunBundle of a given component considering its neighbors'''
+    comp = _get_component(session, name, version)
+    return _resolve_orm_for_run(session, comp, comp.get_spec_as_dict(), neighbors)
+
+
+def _filter_latest(query, cls):
+    '''Narrows a Component or Format query down to the highest version per name
+
+    Done in the database by joining against the max version_key per name of
+    the same filtered query.
+    '''
+    latest = query.with_entities(cls.name.label("name"),
+            func.max(cls.version_key).label("version_key")) \
+                    .group_by(cls.name).order_by(None).subquery()
+    return query.join(latest, and_(cls.name==latest.c.name,
+        cls.version_key==latest.c.version_key))
+
+
+# Rows fetched per round trip when streaming listings
+_YIELD_PER = 500
+
+# Fields of the records yielded by iter_components and iter_formats. The specs
+# are left out to keep streaming cheap.
+COMPONENT_RECORD_FIELDS = ("name", "version", "component_type", "description",
+        "owner", "when_added", "when_published", "when_revoked", "modified")
+FORMAT_RECORD_FIELDS = ("name", "version", "description", "owner", "when_added",
+        "when_published", "when_revoked", "modified")
+
+
+def _iter_records(query, cls, fields, batch_size):
+    '''Yields the fields of each row of a query as dicts fetching batch_size rows at a time'''
+    query = query.with_entities(*[ getattr(cls, field) for field in fields ])
+    for row in query.yield_per(batch_size):
+        yield dict(zip(fields, row))
+
+
+def _query_components(session, user, only_published, subscribes=None, publishes=None,
+        provides=None, calls=None, latest=True):
+    """Builds the query of components that match the filters"""
     filters = list()
     if subscribes:
         filters.extend(Component.subscribes.contains(get_format(session, n, v)) for n, v in subscribes)
@@ -457,21 +685,40 @@ def list_components(session, user, only_published, subscribes=None, publishes=No
     if only_published:
         query = query.filter(Component.when_published!=None)
 
-    orms = ((orm.name, orm.version, orm.component_type, orm) for orm in query)
-
     if latest:
-        orms = _filter_latest(orms)
+        query = _filter_latest(query, Component)
 
-    return [ orm.__dict__ for _, _, _, orm in orms ]
+    return query
 
 
-def _list_formats(session, user, only_published, latest=True):
-    """Get list of data formats
+def list_components(session, user, only_published, subscribes=None, publishes=None,
+        provides=None, calls=None, latest=True):
+    """Get list of components
 
-    Returns
+    Returns:
+    --------
+    List of component orms as dicts
+    """
+    query = _query_components(session, user, only_published, subscribes, publishes,
+            provides, calls, latest)
+    return [ orm.__dict__ for orm in query ]
+
+
+def iter_components(session, user, only_published, subscribes=None, publishes=None,
+        provides=None, calls=None, latest=True, batch_size=_YIELD_PER):
+    """Streams components from the database
+
+    Yields:
     -------
-    List of data format orms as dicts
+    Dicts of COMPONENT_RECORD_FIELDS
     """
+    query = _query_components(session, user, only_published, subscribes, publishes,
+            provides, calls, latest)
+    return _iter_records(query, Component, COMPONENT_RECORD_FIELDS, batch_size)
+
+
+def _query_formats(session, user, only_published, latest=True):
+    """Builds the query of data formats that match the filters"""
     query = session.query(Format).order_by(Format.modified.desc())
 
     if user:
@@ -479,11 +726,134 @@ def _list_formats(session, user, only_published, latest=True):
     if only_published:
         query = query.filter(Format.when_published!=None)
 
-    orms = [ (orm.name, orm.version, orm) for orm in query ]
-
     if latest:
-        orms = _filter_latest(orms)
-    return [ orm.__dict__ for _, _, orm in orms ]
+        query = _filter_latest(query, Format)
+
+    return query
+
+
+def _list_formats(session, user, only_published, latest=True):
+    """Get list of data formats
+
+    Returns
+    -------
+    List of data format orms as dicts
+    """
+    return [ orm.__dict__ for orm in _query_formats(session, user, only_published, latest) ]
+
+
+def iter_formats(session, user, only_published, latest=True, batch_size=_YIELD_PER):
+    """Streams data formats from the database
+
+    Yields
+    ------
+    Dicts of FORMAT_RECORD_FIELDS
+    """
+    query = _query_formats(session, user, only_published, latest)
+    return _iter_records(query, Format, FORMAT_RECORD_FIELDS, batch_size)
+
+
+CATALOG_STATUSES = ("published", "staged", "revoked")
+
+# Order of the kinds of records in a catalog listing
+_CATALOG_KINDS = (("component", Component, COMPONENT_RECORD_FIELDS),
+        ("data_format", Format, FORMAT_RECORD_FIELDS))
+
+
+def _filter_listing(query, cls, owner=None, name_prefix=None, status=None, since=None):
+    """Narrows a Component or Format query by the catalog listing filters"""
+    if owner:
+        query = query.filter(cls.owner==owner)
+    if name_prefix:
+        query = query.filter(cls.name.startswith(name_prefix, autoescape=True))
+    if status == "revoked":
+        query = query.filter(cls.when_revoked!=None)
+    elif status == "published":
+        query = query.filter(cls.when_published!=None, cls.when_revoked==None)
+    elif status == "staged":
+        query = query.filter(cls.when_published==None, cls.when_revoked==None)
+    elif status is not None:
+        raise CatalogError("Unknown status '{0}'. Expected one of {1}".format(status,
+            ", ".join(CATALOG_STATUSES)))
+    if since:
+        query = query.filter(cls.modified>=since)
+    return query
+
+
+def make_page_token(key):
+    """Returns the opaque continuation token of a catalog listing key"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def parse_page_token(token):
+    """Returns the catalog listing key of a continuation token"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+        kind, name, version_key, id_ = key
+    except (ValueError, TypeError, UnicodeError):
+        raise CatalogError("Invalid continuation token '{0}'".format(token))
+
+    if kind not in [ k for k, _, _ in _CATALOG_KINDS ]:
+        raise CatalogError("Invalid continuation token '{0}'".format(token))
+
+    return kind, name, version_key, id_
+
+
+def iter_catalog(session, only_published, latest=True, owner=None, name_prefix=None,
+        status=None, since=None, after=None, batch_size=_YIELD_PER):
+    """Streams components then data formats ordered by name and version
+
+    Filtering and ordering are done in the database. Listings are resumed with
+    a keyset, i.e. the rows after a given (kind, name, version_key, id), which
+    unlike an offset costs the same no matter how deep the page is.
+
+    Args
+    ----
+    after: Key of the last record already seen as returned by parse_page_token.
+        The filters must be the same as the ones of the listing it came from.
+
+    Yields
+    ------
+    Dicts of COMPONENT_RECORD_FIELDS or FORMAT_RECORD_FIELDS plus "kind" and
+    "key" which is the key to pass to make_page_token
+    """
+    kinds = [ kind for kind, _, _ in _CATALOG_KINDS ]
+
+    for kind, cls, fields in _CATALOG_KINDS:
+        if after and kinds.index(after[0]) > kinds.index(kind):
+            continue
+
+        query = _filter_listing(session.query(cls), cls, owner, name_prefix,
+                status, since)
+        if only_published:
+            query = query.filter(cls.when_published!=None)
+        if latest:
+            query = _filter_latest(query, cls)
+        if after and after[0] == kind:
+            _, name, version_key, id_ = after
+            query = query.filter(or_(cls.name>name,
+                and_(cls.name==name, cls.version_key>version_key),
+                and_(cls.name==name, cls.version_key==version_key, cls.id>id_)))
+        query = query.order_by(cls.name, cls.version_key, cls.id)
+
+        for record in _iter_records(query, cls, fields + ("version_key", "id"), batch_size):
+            record["key"] = (kind, record["name"], record.pop("version_key"), record.pop("id"))
+            record["kind"] = kind
+            yield record
+
+
+def take_page(records, limit):
+    """Takes up to limit records off of an iter_catalog listing
+
+    Returns
+    -------
+    Tuple of the list of records and the continuation token of the next page or
+    None when there are no more records
+    """
+    page = list(itertools.islice(records, limit + 1))
+    if len(page) > limit:
+        return page[:limit], make_page_token(page[limit - 1]["key"])
+    return page, None
 
 
 def build_config_keys_map(spec):
@@ -541,6 +911,58 @@ class MockCatalog(object):
             else:
                 raise CatalogError("Unknown component type: {0}".format(component_type))
 
+    def add_bulk(self, user, formats=[], components=[], update=False):
+        '''Validates and adds data formats and components in a single transaction
+
+        Data formats are added before the components so that components can
+        refer to data formats of the same batch. Either every entry gets added
+        or none does.
+
+        Args
+        ----
+        formats: List of (label, spec) tuples of data formats. label is used for
+            reporting e.g. the file path.
+        components: List of (label, spec) tuples of components
+
+        Returns
+        -------
+        List of (label, error) tuples in the order the entries were processed
+        where error is None upon success
+        '''
+        entries = [ ("format", label, spec) for label, spec in formats ] \
+                + [ ("component", label, spec) for label, spec in components ]
+
+        def validate_component_full(spec):
+            validate_component(spec)
+            if self.enforce_image and spec["self"]["component_type"] == "docker":
+                _verify_docker_image(spec)
+
+        validate_funcs = { "format": [validate_format],
+                "component": [validate_component_full] }
+        errors = _validate_bulk(validate_funcs, entries)
+
+        with SessionTransaction(self.engine) as session:
+            get_format_func = _make_get_format_cached(session)
+
+            for kind, label, spec in entries:
+                if (kind, label) in errors:
+                    continue
+
+                savepoint = session.begin_nested()
+                try:
+                    _build_bulk_entry(session, user, update, get_format_func,
+                            kind, spec)
+                    savepoint.commit()
+                except Exception as e:
+                    savepoint.rollback()
+                    errors[(kind, label)] = str(_dup_e) \
+                            if _is_duplicate(str(self.engine.url), e) else str(e)
+
+            if errors:
+                session.rollback()
+
+        return [ (label, errors.get((kind, label))) for kind, label, _ in entries ]
+
     def get_docker_image(self, name, version):
         '''Returns the docker image name associated with this component'''
         with SessionTransaction(self.engine) as session:
@@ -580,6 +1002,12 @@ class MockCatalog(object):
             cdap_config = spec["auxilary"]
             return _get_cdap_jar_from_spec(spec), cdap_config, spec
 
+    def list_component_keys(self, names):
+        '''Returns the (name, version) of the components named like any of names
+        with dashes and dots treated alike'''
+        with SessionTransaction(self.engine) as session:
+            return list_component_keys(session, names)
+
     def get_component_type(self, name, version):
         '''Returns the component type associated with this component'''
         with SessionTransaction(self.engine) as session:
@@ -635,6 +1063,14 @@ class MockCatalog(object):
         - Tuple of lists of "config_key" the first for message router the second
           for data router known as "dmaap_map"
         '''
+        bundle = self.resolve_spec_for_run(user, target_spec, neighbors)
+        return bundle.params, bundle.interface_map, bundle.dmaap_config_keys
+
+    def resolve_spec_for_run(self, user, target_spec, neighbors=None):
+        '''Returns the RunBundle of a specification that may not be in the catalog
+
+        See get_discovery_from_spec. The catalog is left unchanged.
+        '''
         validate_component(target_spec)
 
         with SessionTransaction(self.engine) as session:
@@ -643,37 +1079,37 @@ class MockCatalog(object):
             # 2. In order to make ORM-specific queries, I need the entire ORM
             # in SQLAlchemy meaning I cannot do arbitrary DataFormatPair queries
             # without Component.
-            name = target_spec["self"]["name"]
-            version = target_spec["self"]["version"]
-
             try:
                 # Build a component with update to True first because you may
                 # want to run this for an existing component
-                build_generic_component(session, user, target_spec, True)
+                comp = build_generic_component(session, user, target_spec, True)
             except MissingEntry:
                 # Since it doesn't exist already, build a new component
-                build_generic_component(session, user, target_spec, False)
+                comp = build_generic_component(session, user, target_spec, False)
 
             # This is needed so that subsequent queries will "see" the component
             session.flush()
 
-            ctype = target_spec["self"]["component_type"]
-
-            if ctype == "cdap":
-                params, interface_map = _get_discovery_for_cdap(session, name,
-                        version, neighbors)
-            elif ctype == "docker":
-                params, interface_map = _get_discovery_for_docker(session, name,
-                        version, neighbors)
+            # Use the target spec as the source rather than the stored spec
+            bundle = _resolve_orm_for_run(session, comp, target_spec, neighbors)
 
             # Don't want to commit these changes so rollback.
             session.rollback()
 
-            # Use the target spec as the source to compile the config keys from
-            dmaap_config_keys = _get_discovery_for_dmaap(
-                    lambda name, version: target_spec, name, version)
+            return bundle
 
-            return params, interface_map, dmaap_config_keys
+    def resolve_for_run(self, name, version, neighbors=None):
+        '''Returns everything needed to run a component from a single session
+
+        Returns
+        -------
+        RunBundle namedtuple of name, version, component_type, spec, image,
+        docker_config, jar, cdap_config, params, interface_map and
+        dmaap_config_keys. The docker or the cdap fields are None depending
+        upon the component type.
+        '''
+        with SessionTransaction(self.engine) as session:
+            return resolve_for_run(session, name, version, neighbors)
 
     def verify_component(self, name, version):
         '''Returns the component's name and version if it exists and raises an exception otherwise'''
@@ -697,6 +1133,56 @@ class MockCatalog(object):
         with SessionTransaction(self.engine) as session:
             return _list_formats(session, user, only_published, latest)
 
+    def iter_components(self, subscribes=None, publishes=None, provides=None,
+            calls=None, latest=True, user=None, only_published=False):
+        '''Yields the components which match the specified filter sequences as they are read'''
+        with SessionTransaction(self.engine) as session:
+            for record in iter_components(session, user, only_published, subscribes,
+                    publishes, provides, calls, latest):
+                yield record
+
+    def iter_formats(self, latest=True, user=None, only_published=False):
+        """Yields data formats as they are read
+
+        Yields
+        ------
+        Dicts of FORMAT_RECORD_FIELDS
+        """
+        with SessionTransaction(self.engine) as session:
+            for record in iter_formats(session, user, only_published, latest):
+                yield record
+
+    def iter_catalog(self, latest=True, only_published=False, owner=None, name_prefix=None,
+            status=None, since=None, token=None):
+        """Yields components then data formats ordered by name and version as they are read
+
+        Resumes after the last record of a previous page when given its
+        continuation token.
+
+        Yields
+        ------
+        Dicts of the record fields plus "kind" and "key"
+        """
+        after = parse_page_token(token) if token else None
+        with SessionTransaction(self.engine) as session:
+            for record in iter_catalog(session, only_published, latest, owner, name_prefix,
+                    status, since, after):
+                yield record
+
+    def list_catalog_page(self, limit, latest=True, only_published=False, owner=None,
+            name_prefix=None, status=None, since=None, token=None):
+        """Get a page of at most limit components and data formats
+
+        Returns
+        -------
+        Tuple of the list of records as yielded by iter_catalog and the
+        continuation token of the next page or None on the last page
+        """
+        after = parse_page_token(token) if token else None
+        with SessionTransaction(self.engine) as session:
+            return take_page(iter_catalog(session, only_published, latest, owner, name_prefix,
+                status, since, after), limit)
+
     def get_format(self, name, version):
         """Get data format
 
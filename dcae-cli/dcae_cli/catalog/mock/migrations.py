@@ -0,0 +1,189 @@
+# ============LICENSE_START=======================================================
+# org.onap.dcae
+# ================================================================================
+# Copyright (c) 2018 AT&T Intellectual Property. All rights reserved.
+# ================================================================================
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============LICENSE_END=========================================================
+#
+# ECOMP is a trademark and service mark of AT&T Intellectual Property.
+
+# -*- coding: utf-8 -*-
+"""
+Provides in-place upgrades of existing catalog databases
+
+metadata.create_all only creates missing tables. Changes to tables that already
+exist are applied here by an ordered list of revisions. Each revision inspects
+the database and only does what is missing so running it again is harmless.
+
+The schema_version table records how many revisions have been applied so that
+an up to date catalog can be recognized with a single query.
+"""
+import contextlib
+
+from sqlalchemy import inspect, text, select, UniqueConstraint
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+from dcae_cli.catalog.mock.tables import Base, Component, Format, SchemaVersion, \
+        make_version_key
+from dcae_cli.util import pref_lock
+from dcae_cli.util.logger import get_logger
+
+
+logger = get_logger('Migrations')
+
+
+def _create_missing_indexes(conn, table):
+    existing = set(index["name"] for index in inspect(conn).get_indexes(table.name))
+    for index in table.indexes:
+        if index.name not in existing:
+            logger.info("Creating index {0}".format(index.name))
+            index.create(conn)
+
+
+def _backfill_version_keys(conn, table):
+    '''Sets version_key of the rows whose key is not the current make_version_key'''
+    rows = conn.execute(select(table.c.id, table.c.version, table.c.version_key)).fetchall()
+    for id_, version, version_key in rows:
+        if version_key != make_version_key(version):
+            conn.execute(table.update().where(table.c.id == id_) \
+                    .values(version_key=make_version_key(version)))
+
+
+def _add_version_key(conn):
+    '''Adds and backfills the sortable version_key column'''
+    for table in (Component.__table__, Format.__table__):
+        columns = [ column["name"] for column in inspect(conn).get_columns(table.name) ]
+
+        if "version_key" not in columns:
+            logger.info("Adding column {0}.version_key".format(table.name))
+            conn.execute(text("ALTER TABLE {0} ADD COLUMN version_key VARCHAR NOT NULL DEFAULT ''".format(table.name)))
+            _backfill_version_keys(conn, table)
+
+        _create_missing_indexes(conn, table)
+
+
+def _has_unique(conn, table, column_names):
+    inspector = inspect(conn)
+    uniques = inspector.get_unique_constraints(table.name) \
+            + [ index for index in inspector.get_indexes(table.name) if index["unique"] ]
+    return any(set(unique["column_names"]) == set(column_names) for unique in uniques)
+
+
+def _add_lookup_indexes(conn):
+    '''Adds the (name, version) unique constraints and the lookup indexes
+
+    Constraints can't be added to existing SQLite tables so a missing unique
+    constraint is added as a unique index of the same name which is enforced
+    the same way.
+    '''
+    for table in (Component.__table__, Format.__table__):
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint) \
+                    and not _has_unique(conn, table, constraint.columns.keys()):
+                logger.info("Creating unique index {0}".format(constraint.name))
+                conn.execute(text("CREATE UNIQUE INDEX {0} ON {1} ({2})".format(constraint.name,
+                    table.name, ", ".join(constraint.columns.keys()))))
+
+    for table in Base.metadata.sorted_tables:
+        if inspect(conn).has_table(table.name):
+            _create_missing_indexes(conn, table)
+
+
+def _add_listing_indexes(conn):
+    '''Adds the modified indexes used to filter catalog listings by date'''
+    for table in (Component.__table__, Format.__table__):
+        _create_missing_indexes(conn, table)
+
+
+def _rekey_versions(conn):
+    '''Recomputes version_key so that pre-releases and non x.y.z versions sort first'''
+    for table in (Component.__table__, Format.__table__):
+        _backfill_version_keys(conn, table)
+
+
+REVISIONS = [_add_version_key, _add_lookup_indexes, _add_listing_indexes, _rekey_versions]
+
+SCHEMA_VERSION = len(REVISIONS)
+
+
+def get_schema_version(engine):
+    '''Returns the recorded schema version or None when the marker is missing
+
+    A missing database or schema_version table is treated the same as a missing
+    marker.
+    '''
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(SchemaVersion.version)).scalar()
+    except DBAPIError:
+        return None
+
+
+def is_current(engine):
+    '''Returns True if the catalog schema needs no creation or upgrade'''
+    version = get_schema_version(engine)
+    return version is not None and version >= SCHEMA_VERSION
+
+
+# Key of the Postgres advisory lock held while upgrading
+_UPGRADE_LOCK_KEY = 0x64636165
+
+
+@contextlib.contextmanager
+def _upgrade_lock(engine):
+    '''Serializes upgrades of a SQLite catalog file across processes. See pref_lock'''
+    url = engine.url
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        with pref_lock(url.database):
+            yield
+    else:
+        yield
+
+
+def _read_schema_version(conn):
+    if not inspect(conn).has_table(SchemaVersion.__tablename__):
+        return None
+    return conn.execute(select(SchemaVersion.version)).scalar()
+
+
+def upgrade(engine, metadata=Base.metadata):
+    '''Creates the missing tables, applies the outstanding revisions and updates
+    the marker in a single transaction
+
+    Processes creating or upgrading the same catalog at the same time wait on a
+    lock, SQLite through its file and Postgres through an advisory lock, and
+    then find the catalog already up to date. Elsewhere the loser of the race
+    fails to insert the marker and re-checks instead.
+    '''
+    try:
+        with _upgrade_lock(engine), engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"),
+                        {"key": _UPGRADE_LOCK_KEY})
+
+            # Read again under the lock
+            version = _read_schema_version(conn) or 0
+            if version >= SCHEMA_VERSION:
+                return
+
+            metadata.create_all(conn)
+
+            for revision in REVISIONS[version:]:
+                revision(conn)
+
+            conn.execute(SchemaVersion.__table__.delete())
+            conn.execute(SchemaVersion.__table__.insert().values(version=SCHEMA_VERSION))
+    except IntegrityError:
+        if not is_current(engine):
+            raise
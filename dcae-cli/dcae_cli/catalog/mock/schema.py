@@ -26,11 +26,12 @@ import json
 from functools import partial, reduce
 
 import six
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
 import requests
 
-from dcae_cli.util import reraise_with_msg, fetch_file_from_web
+from dcae_cli.util import reraise_with_msg
 from dcae_cli.util import config as cli_config
+from dcae_cli.util import schema_cache, validators
 from dcae_cli.util.exc import DcaeException
 from dcae_cli.util.logger import get_logger
 
@@ -65,16 +66,50 @@ log = get_logger('Schema')
 class FetchSchemaError(RuntimeError):
     pass
 
-def _fetch_schema(schema_path):
+def _fetch_schema_text(schema_path):
     try:
         server_url = cli_config.get_server_url()
-        return fetch_file_from_web(server_url, schema_path)
+        return schema_cache.fetch_schema(server_url, schema_path,
+                cli_config.get_schema_cache_ttl(),
+                offline=cli_config.get_schema_cache_offline())
     except requests.HTTPError as e:
         raise FetchSchemaError("HTTP error from fetching schema", e)
     except Exception as e:
         raise FetchSchemaError("Unexpected error from fetching schema", e)
 
 
+def _parse_schema(text):
+    try:
+        return json.loads(text)
+    except Exception as e:
+        raise FetchSchemaError("Unexpected error from fetching schema", e)
+
+
+def _fetch_schema(schema_path):
+    return _parse_schema(_fetch_schema_text(schema_path))
+
+
+# schema path -> (schema text, schema dict)
+_parsed_schemas = {}
+
+
+def _get_schema(schema_path):
+    '''Returns the fetched schema, parsing it only when its text changed
+
+    The same dict is returned for the same text so that validators can reuse
+    what they derived from it. It must not be changed by callers.
+    '''
+    text = _fetch_schema_text(schema_path)
+    cached = _parsed_schemas.get(schema_path)
+
+    if cached is not None and cached[0] == text:
+        return cached[1]
+
+    schema = _parse_schema(text)
+    _parsed_schemas[schema_path] = (text, schema)
+    return schema
+
+
 def _safe_dict(obj):
     '''Returns a dict from a dict or json string'''
     if isinstance(obj, str):
@@ -101,13 +136,13 @@ def _validate(fetch_schema_func, schema_path, spec):
     '''
     try:
         schema = fetch_schema_func(schema_path)
-        validate(_safe_dict(spec), schema)
+        validators.validate(_safe_dict(spec), schema_path, schema)
     except ValidationError as e:
         reraise_with_msg(e, as_dcae=True)
     except FetchSchemaError as e:
         reraise_with_msg(e, as_dcae=True)
 
-_validate_using_nexus = partial(_validate, _fetch_schema)
+_validate_using_nexus = partial(_validate, _get_schema)
 
 
 def apply_defaults(properties_definition, properties):
@@ -22,13 +22,15 @@
 '''
 Provides a local mock catalog
 '''
+import re
 import uuid
 import json
 from datetime import datetime
 
-from sqlalchemy import UniqueConstraint, Table, Column, String, DateTime, ForeignKey, Boolean, Enum, Text
+from sqlalchemy import UniqueConstraint, Index, Table, Column, String, DateTime, ForeignKey, Boolean, Enum, Text, \
+        Integer
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.schema import PrimaryKeyConstraint
 
 
@@ -39,28 +41,28 @@ Base = declarative_base()
 
 published = Table('published', Base.metadata,
     Column('component_id', String, ForeignKey('components.id', ondelete='CASCADE'), nullable=False),
-    Column('format_id', String, ForeignKey('formats.id', ondelete='CASCADE'), nullable=False),
+    Column('format_id', String, ForeignKey('formats.id', ondelete='CASCADE'), nullable=False, index=True),
     PrimaryKeyConstraint('component_id', 'format_id')
 )
 
 
 subscribed = Table('subscribed', Base.metadata,
     Column('component_id', String, ForeignKey('components.id', ondelete='CASCADE'), nullable=False),
-    Column('format_id', String, ForeignKey('formats.id', ondelete='CASCADE'), nullable=False),
+    Column('format_id', String, ForeignKey('formats.id', ondelete='CASCADE'), nullable=False, index=True),
     PrimaryKeyConstraint('component_id', 'format_id')
 )
 
 
 provided = Table('provided', Base.metadata,
     Column('component_id', String, ForeignKey('components.id', ondelete='CASCADE'), nullable=False),
-    Column('pair_id', String, ForeignKey('format_pairs.id', ondelete='CASCADE'), nullable=False),
+    Column('pair_id', String, ForeignKey('format_pairs.id', ondelete='CASCADE'), nullable=False, index=True),
     PrimaryKeyConstraint('component_id', 'pair_id')
 )
 
 
 called = Table('called', Base.metadata,
     Column('component_id', String, ForeignKey('components.id', ondelete='CASCADE'), nullable=False),
-    Column('pair_id', String, ForeignKey('format_pairs.id', ondelete='CASCADE'), nullable=False),
+    Column('pair_id', String, ForeignKey('format_pairs.id', ondelete='CASCADE'), nullable=False, index=True),
     PrimaryKeyConstraint('component_id', 'pair_id')
 )
 
@@ -69,12 +71,32 @@ def generate_uuid():
     return str(uuid.uuid4())
 
 
+_version_re = re.compile(r"^(\d+)\.(\d+)\.(\d+|\*)(.*)$")
+
+def make_version_key(version):
+    '''Returns a string that sorts versions semantically e.g. 1.10.0 after 1.9.0
+
+    Each of major, minor and patch is zero-padded so that the database can order
+    and max() on the key. A release gets a "~" suffix, which sorts after any
+    pre-release suffix, so that 1.0.0-rc1 comes before 1.0.0. Build metadata
+    after "+" is kept but ranks like the release. Versions that don't look like
+    x.y.z get their own prefix and sort before all others.
+    '''
+    match = _version_re.match(version or "")
+    if match is None:
+        return "0" + (version or "")
+    major, minor, patch, rest = match.groups()
+    if not rest or rest.startswith("+"):
+        rest = "~" + rest
+    return "1" + ".".join(part.zfill(10) for part in (major, minor, patch)) + rest
+
+
 class Component(Base):
     __tablename__ = 'components'
     id = Column(String, primary_key=True, default=generate_uuid)
     created = Column(DateTime, default=datetime_now, nullable=False)
-    modified = Column(DateTime, default=datetime_now, onupdate=datetime_now, nullable=False)
-    owner = Column(String, nullable=False)
+    modified = Column(DateTime, default=datetime_now, onupdate=datetime_now, nullable=False, index=True)
+    owner = Column(String, nullable=False, index=True)
     # To be used for tracking and debugging
     cli_version = Column(String, nullable=False)
     schema_path = Column(String, nullable=False)
@@ -82,11 +104,13 @@ class Component(Base):
     name = Column(String(), nullable=False)
     component_type = Column(Enum('docker', 'cdap', name='component_types'), nullable=False)
     version = Column(String(), nullable=False)
+    # Derived from version. Used to find the latest version in the database.
+    version_key = Column(String(), nullable=False)
     description = Column(Text(), nullable=False)
     spec = Column(Text(), nullable=False)
 
     when_added = Column(DateTime, default=datetime_now, nullable=True)
-    when_published = Column(DateTime, default=None, nullable=True)
+    when_published = Column(DateTime, default=None, nullable=True, index=True)
     when_revoked = Column(DateTime, default=None, nullable=True)
 
     publishes = relationship('Format', secondary=published)
@@ -94,11 +118,16 @@ class Component(Base):
     provides = relationship('FormatPair', secondary=provided)
     calls = relationship('FormatPair', secondary=called)
 
-    __tableargs__ = (UniqueConstraint(name, version), )
+    __table_args__ = (UniqueConstraint(name, version, name='uq_components_name_version'), )
 
     def __repr__(self):
         return '<{:}>'.format((self.__class__.__name__, self.id, self.name, self.version))
 
+    @validates('version')
+    def _set_version_key(self, key, version):
+        self.version_key = make_version_key(version)
+        return version
+
     def is_published(self):
         return self.when_published is not None
 
@@ -106,34 +135,49 @@ class Component(Base):
         return json.loads(self.spec)
 
 
+# Supports finding the latest version of a component
+Index('ix_components_name_version_key', Component.name, Component.version_key)
+
+
 class Format(Base):
     __tablename__ = 'formats'
     id = Column(String, primary_key=True, default=generate_uuid)
     created = Column(DateTime, default=datetime_now, nullable=False)
-    modified = Column(DateTime, default=datetime_now, onupdate=datetime_now, nullable=False)
-    owner = Column(String, nullable=False)
+    modified = Column(DateTime, default=datetime_now, onupdate=datetime_now, nullable=False, index=True)
+    owner = Column(String, nullable=False, index=True)
     # To be used for tracking and debugging
     cli_version = Column(String, nullable=False)
     schema_path = Column(String, nullable=False)
 
     name = Column(String(), nullable=False)
     version = Column(String(), nullable=False)
+    # Derived from version. Used to find the latest version in the database.
+    version_key = Column(String(), nullable=False)
     description = Column(Text(), nullable=True)
     spec = Column(Text(), nullable=False)
 
     when_added = Column(DateTime, default=datetime_now, nullable=True)
-    when_published = Column(DateTime, default=None, nullable=True)
+    when_published = Column(DateTime, default=None, nullable=True, index=True)
     when_revoked = Column(DateTime, default=None, nullable=True)
 
-    __tableargs__ = (UniqueConstraint(name, version), )
+    __table_args__ = (UniqueConstraint(name, version, name='uq_formats_name_version'), )
 
     def __repr__(self):
         return '<{:}>'.format((self.__class__.__name__, self.id, self.name, self.version))
 
+    @validates('version')
+    def _set_version_key(self, key, version):
+        self.version_key = make_version_key(version)
+        return version
+
     def is_published(self):
         return self.when_published is not None
 
 
+# Supports finding the latest version of a data format
+Index('ix_formats_name_version_key', Format.name, Format.version_key)
+
+
 class FormatPair(Base):
     __tablename__ = 'format_pairs'
     id = Column(String, primary_key=True, default=generate_uuid)
@@ -147,3 +191,10 @@ class FormatPair(Base):
 
     def __repr__(self):
         return '<{:}>'.format((self.__class__.__name__, self.id, self.req, self.resp))
+
+
+class SchemaVersion(Base):
+    '''Marks the revision the catalog schema has been upgraded to. See migrations'''
+    __tablename__ = 'schema_version'
+    version = Column(Integer, primary_key=True)
+    when_upgraded = Column(DateTime, default=datetime_now, nullable=False)
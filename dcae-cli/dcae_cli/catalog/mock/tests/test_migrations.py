@@ -0,0 +1,147 @@
+# ============LICENSE_START=======================================================
+# org.onap.dcae
+# ================================================================================
+# Copyright (c) 2018 AT&T Intellectual Property. All rights reserved.
+# ================================================================================
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============LICENSE_END=========================================================
+#
+# ECOMP is a trademark and service mark of AT&T Intellectual Property.
+
+# -*- coding: utf-8 -*-
+'''
+Tests the in-place upgrades of catalog databases
+'''
+import threading
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from dcae_cli.catalog.mock import migrations
+from dcae_cli.catalog.mock.tables import make_version_key
+
+
+# formats table as created before version_key was added
+_old_formats = \
+'''CREATE TABLE formats (
+    id VARCHAR NOT NULL, created DATETIME NOT NULL, modified DATETIME NOT NULL,
+    owner VARCHAR NOT NULL, cli_version VARCHAR NOT NULL, schema_path VARCHAR NOT NULL,
+    name VARCHAR NOT NULL, version VARCHAR NOT NULL, description TEXT, spec TEXT NOT NULL,
+    when_added DATETIME, when_published DATETIME, when_revoked DATETIME,
+    PRIMARY KEY (id), UNIQUE (name, version))'''
+
+_old_components = _old_formats.replace("formats", "components") \
+        .replace("description TEXT", "component_type VARCHAR(6) NOT NULL, description TEXT")
+
+
+def test_upgrade(mock_db_url):
+    engine = create_engine(mock_db_url)
+
+    with engine.begin() as conn:
+        conn.execute(text(_old_formats))
+        conn.execute(text(_old_components))
+        conn.execute(text("INSERT INTO formats VALUES ('1', '2018-01-01', '2018-01-01', "
+            "'bob', '2.0.0', 'path', 'std.format_one', '1.10.0', '', '{}', NULL, NULL, NULL)"))
+
+    assert not migrations.is_current(engine)
+    migrations.upgrade(engine)
+    assert migrations.get_schema_version(engine) == migrations.SCHEMA_VERSION
+    assert migrations.is_current(engine)
+    # Running again is harmless
+    migrations.upgrade(engine)
+
+    inspector = inspect(engine)
+    assert "version_key" in [ c["name"] for c in inspector.get_columns("components") ]
+    assert "ix_formats_name_version_key" in [ i["name"] for i in inspector.get_indexes("formats") ]
+
+    with engine.connect() as conn:
+        version_key = conn.execute(text("SELECT version_key FROM formats")).scalar()
+    assert version_key == make_version_key("1.10.0")
+
+
+def test_upgrade_adds_lookup_indexes(mock_db_url):
+    engine = create_engine(mock_db_url)
+
+    # Catalogs created without the intended (name, version) unique constraint
+    with engine.begin() as conn:
+        conn.execute(text(_old_formats.replace(", UNIQUE (name, version)", "")))
+        conn.execute(text(_old_components.replace(", UNIQUE (name, version)", "")))
+
+    migrations.upgrade(engine)
+    migrations.upgrade(engine)
+
+    indexes = dict((i["name"], i) for i in inspect(engine).get_indexes("formats"))
+    assert indexes["uq_formats_name_version"]["unique"]
+    assert "ix_formats_owner" in indexes
+    assert "ix_formats_when_published" in indexes
+    assert "ix_formats_modified" in indexes
+
+    insert = text("INSERT INTO formats VALUES (:id, '2018-01-01', '2018-01-01', 'bob', "
+            "'2.0.0', 'path', 'std.format_one', '1.0.0', '', '{}', NULL, NULL, NULL, '')")
+
+    with engine.begin() as conn:
+        conn.execute(insert, {"id": "1"})
+
+    with pytest.raises(IntegrityError):
+        with engine.begin() as conn:
+            conn.execute(insert, {"id": "2"})
+
+
+def test_upgrade_rekeys_versions(mock_db_url):
+    engine = create_engine(mock_db_url)
+    migrations.upgrade(engine)
+
+    # Catalog at revision 3 with keys made before pre-releases sorted first
+    with engine.begin() as conn:
+        for id_, version, version_key in [("1", "1.0.0", "0000000001.0000000000.0000000000"),
+                ("2", "1.0.0-rc1", "0000000001.0000000000.0000000000-rc1")]:
+            conn.execute(text("INSERT INTO formats (id, created, modified, owner, "
+                "cli_version, schema_path, name, version, version_key, spec) VALUES (:id, "
+                "'2018-01-01', '2018-01-01', 'bob', '2.0.0', 'path', 'std.format_one', "
+                ":version, :version_key, '{}')"),
+                {"id": id_, "version": version, "version_key": version_key})
+        conn.execute(text("UPDATE schema_version SET version = 3"))
+
+    migrations.upgrade(engine)
+
+    with engine.connect() as conn:
+        latest = conn.execute(text("SELECT version FROM formats ORDER BY version_key DESC")).scalar()
+    assert latest == "1.0.0"
+
+
+def test_concurrent_upgrades(mock_db_url):
+    '''Tests that catalogs created by many processes at once are upgraded once'''
+    engines = [ create_engine(mock_db_url) for _ in range(4) ]
+    start = threading.Event()
+    errors = []
+
+    def upgrade(engine):
+        start.wait()
+        try:
+            migrations.upgrade(engine)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [ threading.Thread(target=upgrade, args=(engine, )) for engine in engines ]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert migrations.is_current(engines[0])
+
+    with engines[0].connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM schema_version")).scalar() == 1
@@ -25,6 +25,7 @@ Tests the mock catalog
 import json
 from copy import deepcopy
 from functools import partial
+from datetime import datetime, timedelta
 
 import pytest
 
@@ -32,6 +33,7 @@ from sqlalchemy.exc import IntegrityError
 
 from dcae_cli.catalog.mock.catalog import MockCatalog, MissingEntry, DuplicateEntry, _get_unique_format_things
 from dcae_cli.catalog.mock import catalog
+from dcae_cli.catalog.mock.tables import Base, make_version_key
 
 
 _c1_spec = {'self': {'name': 'std.comp_one',
@@ -359,6 +361,44 @@ def test_format_basic(mock_cli_config, mock_db_url, catalog=None):
     assert spec['self']['description'] == new_descr
 
 
+def test_add_bulk(mock_cli_config, mock_db_url):
+    '''Tests adding data formats and components in a single transaction'''
+    mc = MockCatalog(db_name='dcae_cli.test.db', purge_existing=True,
+            enforce_image=False, db_url=mock_db_url)
+
+    user = "test_add_bulk"
+    formats = [("df1", deepcopy(_df1_spec)), ("df2", deepcopy(_df2_spec))]
+    components = [("c1", deepcopy(_c1_spec)), ("c2", deepcopy(_c2_spec))]
+
+    # One bad entry means nothing gets added
+    bad_spec = deepcopy(_c2v2_spec)
+    del bad_spec["self"]["name"]
+
+    results = mc.add_bulk(user, formats, components + [("bad", bad_spec)])
+    assert [ label for label, error in results if error ] == ["bad"]
+    assert mc.list_formats() == []
+    assert mc.list_components() == []
+
+    # Components resolve the data formats of the same batch
+    results = mc.add_bulk(user, formats, components)
+    assert all(error is None for _, error in results)
+    assert sorted(c["name"] for c in mc.list_components()) == ["std.comp_one", "std.comp_two"]
+    assert len(mc.list_formats()) == 2
+
+    # Duplicates get reported per entry
+    results = mc.add_bulk(user, [], components)
+    assert all("exists" in error for _, error in results)
+
+    results = mc.add_bulk(user, [], components, update=True)
+    assert all(error is None for _, error in results)
+
+    # Errors are kept apart for a label used by both a data format and a component
+    results = mc.add_bulk(user, [("same.json", deepcopy(_df1_spec))],
+            [("same.json", bad_spec)], update=True)
+    assert results[0] == ("same.json", None)
+    assert results[1][0] == "same.json" and results[1][1] is not None
+
+
 def test_discovery(mock_cli_config, mock_db_url, catalog=None):
     '''Tests creation of discovery objects'''
     if catalog is None:
@@ -381,6 +421,40 @@ def test_discovery(mock_cli_config, mock_db_url, catalog=None):
     assert params == {'bar': 2, 'foo': 1}
     assert interfaces == {'call1': [('std.comp_two', '1.0.0')], 'pub1': [('std.comp_two', '1.0.0')]}
 
+    # Only running neighbors are considered
+    neighbors = [('std.comp_two', '1.0.0'), ('std.comp_two', '1.0.0'), ('std.comp_three', '2.0.0')]
+    _, interfaces = mc.get_discovery_for_docker(c1_spec['self']['name'],
+            c1_spec['self']['version'], neighbors)
+    assert interfaces == {'call1': [('std.comp_two', '1.0.0')], 'pub1': [('std.comp_two', '1.0.0')]}
+
+    # Neighbors can be a one-shot iterator like the keys of an instance map
+    instance_map = dict((n, ["some-instance"]) for n in neighbors)
+    _, interfaces = mc.get_discovery_for_docker(c1_spec['self']['name'],
+            c1_spec['self']['version'], iter(instance_map))
+    assert interfaces == {'call1': [('std.comp_two', '1.0.0')], 'pub1': [('std.comp_two', '1.0.0')]}
+
+    bundle = mc.resolve_for_run(c1_spec['self']['name'], None, iter(instance_map))
+    assert bundle.interface_map == {'call1': [('std.comp_two', '1.0.0')], 'pub1': [('std.comp_two', '1.0.0')]}
+
+    _, interfaces = mc.get_discovery_for_docker(c1_spec['self']['name'],
+            c1_spec['self']['version'], [('std.comp_three', '2.0.0')])
+    assert interfaces == {'call1': [], 'pub1': []}
+
+    _, interfaces = mc.get_discovery_for_docker(c1_spec['self']['name'],
+            c1_spec['self']['version'], [])
+    assert interfaces == {'call1': [], 'pub1': []}
+
+    # All pieces needed for a run come back together
+    bundle = mc.resolve_for_run(c1_spec['self']['name'], None, neighbors)
+    assert (bundle.name, bundle.version, bundle.component_type) == _spec_tuple(c1_spec)
+    assert bundle.spec == c1_spec
+    assert bundle.image == mc.get_docker_image(c1_spec['self']['name'], c1_spec['self']['version'])
+    assert bundle.docker_config == mc.get_docker_config(c1_spec['self']['name'], c1_spec['self']['version'])
+    assert bundle.jar is None and bundle.cdap_config is None
+    assert bundle.params == {'bar': 2, 'foo': 1}
+    assert bundle.interface_map == {'call1': [('std.comp_two', '1.0.0')], 'pub1': [('std.comp_two', '1.0.0')]}
+    assert bundle.dmaap_config_keys == mc.get_discovery_for_dmaap(c1_spec['self']['name'], c1_spec['self']['version'])
+
 
 def _spec_tuple(dd):
     '''Returns a (name, version, component type) tuple from a given component spec dict'''
@@ -693,12 +767,115 @@ def test_get_unique_format_things():
     assert sorted(expected) == sorted(get_unique_fake_format(entries))
 
 
-def test_filter_latest():
-    orms = [('std.empty.get', '1.0.0'), ('std.unknown', '1.0.0'),
-            ('std.unknown', '1.0.1'), ('std.empty.get', '1.0.1')]
+def test_make_version_key():
+    assert make_version_key("1.10.0") > make_version_key("1.9.0")
+    assert make_version_key("10.0.0") > make_version_key("9.99.99")
+    assert make_version_key("1.0.1") > make_version_key("1.0.0")
+    assert make_version_key("1.0.0") == make_version_key("1.0.0")
+    # Pre-releases come before the release
+    assert make_version_key("1.0.0-rc1") < make_version_key("1.0.0")
+    assert make_version_key("1.0.0-rc1") > make_version_key("0.9.9")
+    assert make_version_key("1.0.0-alpha") < make_version_key("1.0.0-beta")
+    assert make_version_key("1.0.0+build5") > make_version_key("1.0.0-rc1")
+    # Non x.y.z versions never interleave with the others
+    assert make_version_key("not-a-version") != "not-a-version"
+    assert make_version_key("not-a-version") < make_version_key("0.0.0")
+    assert make_version_key("2") < make_version_key("0.0.1")
+    assert make_version_key("b") > make_version_key("a")
+
+
+def test_latest_is_semantic(mock_cli_config, mock_db_url):
+    '''Tests that latest compares versions numerically and not as strings'''
+    mc = MockCatalog(db_name='dcae_cli.test.db', purge_existing=True,
+            enforce_image=False, db_url=mock_db_url)
+
+    user = "test_latest_is_semantic"
+
+    for version in ["1.9.0", "1.10.0", "1.2.0"]:
+        df_spec = deepcopy(_df1_spec)
+        df_spec["self"]["version"] = version
+        mc.add_format(df_spec, user)
+
+    assert mc.get_format_spec("std.format_one", None)["self"]["version"] == "1.10.0"
+    assert [ df["version"] for df in mc.list_formats() ] == ["1.10.0"]
+    assert len(mc.list_formats(latest=False)) == 3
+
+
+def test_catalog_pages(mock_cli_config, mock_db_url):
+    '''Tests paging through and filtering the catalog listing'''
+    mc = MockCatalog(db_name='dcae_cli.test.db', purge_existing=True,
+            enforce_image=False, db_url=mock_db_url)
 
-    assert list(catalog._filter_latest(orms)) == [('std.empty.get', '1.0.1'), \
-            ('std.unknown', '1.0.1')]
+    mc.add_format(deepcopy(_df1_spec), "alice")
+    mc.add_format(deepcopy(_df2_spec), "bob")
+    mc.add_format(deepcopy(_df2v2_spec), "bob")
+    for version in ["1.9.0", "1.10.0"]:
+        df_spec = deepcopy(_df1_spec)
+        df_spec["self"]["version"] = version
+        mc.add_format(df_spec, "alice")
+    mc.add_component("alice", deepcopy(_c1_spec))
+    mc.publish_format("bob", "std.format_two", "1.5.0")
+
+    def keys(records):
+        return [ (r["kind"], r["name"], r["version"]) for r in records ]
+
+    everything = keys(mc.iter_catalog(latest=False))
+    assert everything == [("component", "std.comp_one", "1.0.0"),
+            ("data_format", "std.format_one", "1.0.0"),
+            ("data_format", "std.format_one", "1.9.0"),
+            ("data_format", "std.format_one", "1.10.0"),
+            ("data_format", "std.format_two", "1.5.0"),
+            ("data_format", "std.format_two", "2.0.0")]
+
+    pages, token = [], None
+    while True:
+        records, token = mc.list_catalog_page(2, latest=False, token=token)
+        pages.append(keys(records))
+        if token is None:
+            break
+    assert [ len(page) for page in pages ] == [2, 2, 2]
+    assert sum(pages, []) == everything
+
+    records, token = mc.list_catalog_page(10, latest=False)
+    assert keys(records) == everything and token is None
+
+    assert keys(mc.iter_catalog()) == [("component", "std.comp_one", "1.0.0"),
+            ("data_format", "std.format_one", "1.10.0"),
+            ("data_format", "std.format_two", "2.0.0")]
+    assert keys(mc.iter_catalog(owner="bob")) == [("data_format", "std.format_two", "2.0.0")]
+    assert keys(mc.iter_catalog(name_prefix="std.format_t")) \
+            == [("data_format", "std.format_two", "2.0.0")]
+    # Wildcards in the prefix are taken literally
+    assert keys(mc.iter_catalog(name_prefix="std.format%")) == []
+    # Filters apply before the latest version is picked
+    assert keys(mc.iter_catalog(status="published")) \
+            == [("data_format", "std.format_two", "1.5.0")]
+    assert len(keys(mc.iter_catalog(status="staged", latest=False))) == 5
+    assert keys(mc.iter_catalog(status="revoked")) == []
+    assert keys(mc.iter_catalog(since=datetime.utcnow() + timedelta(days=1))) == []
+    assert len(keys(mc.iter_catalog(since=datetime(2018, 1, 1), latest=False))) == 6
+
+    with pytest.raises(catalog.CatalogError):
+        mc.list_catalog_page(2, token="not-a-token")
+    with pytest.raises(catalog.CatalogError):
+        mc.list_catalog_page(2, token=catalog.make_page_token(("bogus", "a", "b", "c")))
+
+
+def test_create_engine_reuse(mock_cli_config, mock_db_url, monkeypatch):
+    '''Tests that engines are reused and up to date catalogs are not re-created'''
+    engine = catalog.create_engine(Base, purge_existing=True, db_url=mock_db_url)
+    assert catalog.create_engine(Base, db_url=mock_db_url) is engine
+    assert catalog._get_sessionmaker(engine) is catalog._get_sessionmaker(engine)
+
+    # A new process only needs to check the schema version marker
+    catalog._dispose_engine(mock_db_url)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Should not be called")
+
+    monkeypatch.setattr(catalog, "database_exists", fail)
+    monkeypatch.setattr(Base.metadata, "create_all", fail)
+    assert catalog.create_engine(Base, db_url=mock_db_url) is not engine
 
 
 def test_raise_if_duplicate():
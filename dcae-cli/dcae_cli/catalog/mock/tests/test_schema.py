@@ -419,3 +419,17 @@ def test_validate():
 
     with pytest.raises(DcaeException):
         schema._validate(fetch_schema, bad_path, good_instance)
+
+
+def test_get_schema(monkeypatch):
+    texts = { "/some/path": '{"type": "object"}' }
+    monkeypatch.setattr(schema, "_parsed_schemas", {})
+    monkeypatch.setattr(schema, "_fetch_schema_text", lambda path: texts[path])
+
+    # Parsed once while the text stays the same
+    parsed = schema._get_schema("/some/path")
+    assert parsed == { "type": "object" }
+    assert schema._get_schema("/some/path") is parsed
+
+    texts["/some/path"] = '{"type": "string"}'
+    assert schema._get_schema("/some/path") == { "type": "string" }
@@ -22,14 +22,11 @@
 """
 Provides entry-level logic for building the CLI. Commands and heavy-lifting logic should be in their own module.
 """
+import importlib
+
 import click
 
 from dcae_cli import util
-from dcae_cli.commands.catalog import catalog
-from dcae_cli.commands.component import component
-from dcae_cli.commands.data_format import data_format
-from dcae_cli.commands.profiles import profiles
-from dcae_cli.catalog import get_catalog
 from dcae_cli.util.exc import DcaeException
 from dcae_cli.util.logger import get_logger
 from dcae_cli.util import config as conf
@@ -58,7 +55,66 @@ def _reinit_callback(ctx, param, value):
 
 
 
-@click.group()
+# Command groups are imported only when invoked because their modules pull in
+# heavy dependencies like SQLAlchemy and docker. Maps the command name to the
+# module and attribute of the group.
+_lazy_commands = {
+    'catalog': ('dcae_cli.commands.catalog.commands', 'catalog'),
+    'component': ('dcae_cli.commands.component.commands', 'component'),
+    'data_format': ('dcae_cli.commands.data_format.commands', 'data_format'),
+    'profiles': ('dcae_cli.commands.profiles.commands', 'profiles')
+    }
+
+
+class LazyGroup(click.Group):
+    """Group that imports its lazy commands upon first use"""
+
+    def __init__(self, lazy_commands=None, **attrs):
+        super(LazyGroup, self).__init__(**attrs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super(LazyGroup, self).list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module_name, attr = self.lazy_commands[cmd_name]
+            self.add_command(getattr(importlib.import_module(module_name), attr), cmd_name)
+        return super(LazyGroup, self).get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        # Lists the command names without importing the lazy commands. None of
+        # the command groups have a short help.
+        rows = [ (cmd_name, "") for cmd_name in self.list_commands(ctx) ]
+
+        if rows:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
+
+
+class _CliObj(dict):
+    """Context object that builds the catalog the first time it is used
+
+    Commands like `profiles` never touch the catalog so they don't pay for
+    connecting to it.
+    """
+
+    def __missing__(self, key):
+        if key != 'catalog':
+            raise KeyError(key)
+
+        from dcae_cli.catalog import get_catalog
+
+        try:
+            catalog = self['catalog'] = get_catalog(**self['config'])
+        except Exception as e:
+            log.error(e)
+            raise DcaeException("Having issues connecting to the onboarding catalog")
+
+        return catalog
+
+
+@click.group(cls=LazyGroup, lazy_commands=_lazy_commands)
 @click.option('--verbose', '-v', is_flag=True, default=False, help='Prints INFO-level logs to screen.')
 # This is following the same pattern as --version
 # http://click.pocoo.org/5/options/#callbacks-and-eager-options
@@ -68,8 +124,7 @@ def _reinit_callback(ctx, param, value):
 @click.pass_context
 def cli(ctx, verbose):
 
-    if ctx.obj is None:
-        ctx.obj = dict()
+    ctx.obj = _CliObj(ctx.obj or {})
 
     if 'config' not in ctx.obj:
         config = conf.get_config()
@@ -80,21 +135,7 @@ def cli(ctx, verbose):
                 _reinit_cli()
 
         ctx.obj['config'] = config
-    else:
-        config = ctx.obj['config']
-
-    if 'catalog' not in ctx.obj:
-        try:
-            ctx.obj['catalog'] = get_catalog(**config)
-        except Exception as e:
-            log.error(e)
-            raise DcaeException("Having issues connecting to the onboarding catalog")
 
     if verbose:
         util.logger.set_verbose()
 
-
-cli.add_command(catalog)
-cli.add_command(component)
-cli.add_command(data_format)
-cli.add_command(profiles)
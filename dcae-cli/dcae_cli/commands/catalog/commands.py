@@ -21,6 +21,8 @@
 """
 Queries onboarding catalog
 """
+from datetime import datetime
+
 import click
 
 from dcae_cli.commands import util
@@ -31,22 +33,61 @@ def catalog():
     pass
 
 
+_SINCE_FORMATS = ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S")
+
+
+def _parse_since(ctx, param, value):
+    if value is None:
+        return None
+    for format_ in _SINCE_FORMATS:
+        try:
+            return datetime.strptime(value, format_)
+        except ValueError:
+            pass
+    raise click.BadParameter("'{0}' must be YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS".format(value))
+
+
 @catalog.command(name="list")
 @click.option("--expanded", is_flag=True, default=False, help="Display the expanded view - show all versions and all statuses")
-#TODO: @click.argument('query')
+@click.option("--limit", type=click.IntRange(min=1), default=None, help="Maximum number of resources to list. Prints a continuation token when there are more.")
+@click.option("--token", default=None, help="Continuation token of the previous page. Pass the same filters as the previous page.")
+@click.option("--owner", default=None, help="Only list resources owned by this user")
+@click.option("--name-prefix", default=None, help="Only list resources whose name starts with this prefix")
+@click.option("--status", type=click.Choice(["published", "staged", "revoked"]), default=None, help="Only list resources with this status")
+@click.option("--since", default=None, callback=_parse_since, help="Only list resources modified at or after this UTC date, YYYY-MM-DD[THH:MM:SS]")
+@util.output_option
 @click.pass_obj
-def action_list(obj, expanded):
+def action_list(obj, expanded, limit, token, owner, name_prefix, status, since, output):
     """Lists resources in the onboarding catalog"""
     # Query both components and data formats. Display both sets.
 
-    user, catalog = obj['config']['user'], obj['catalog']
+    catalog = obj['catalog']
 
     only_latest = not expanded
-    only_published = not expanded
+    # An explicit status replaces the default of only listing published resources
+    only_published = not expanded and status is None
 
-    # TODO: Probably want to implement pagination
-    comps = catalog.list_components(latest=only_latest, only_published=only_published)
-    dfs = catalog.list_formats(latest=only_latest, only_published=only_published)
+    filters = dict(latest=only_latest, only_published=only_published, owner=owner,
+            name_prefix=name_prefix, status=status, since=since, token=token)
+
+    if limit is None:
+        records, next_token = catalog.iter_catalog(**filters), None
+    else:
+        records, next_token = catalog.list_catalog_page(limit, **filters)
+
+    def echo_next_token():
+        if next_token:
+            click.echo("More results. Continue with --token {0}".format(next_token),
+                    err=(output != 'table'))
+
+    if output != 'table':
+        records = ( dict(record, status=util.get_status_string(record)) for record in records )
+        util.stream_records(records, ("kind", "name", "version", "component_type",
+            "description", "owner", "status", "when_published"), output)
+        echo_next_token()
+        return
+
+    records = list(records)
 
     def format_record_component(obj):
         when_published = obj["when_published"].date() \
@@ -56,7 +97,7 @@ def action_list(obj, expanded):
                 util.format_description(obj["description"]), obj["owner"],
                 util.get_status_string(obj), when_published)
 
-    comps = [ format_record_component(comp) for comp in comps ]
+    comps = [ format_record_component(r) for r in records if r["kind"] == "component" ]
 
     click.echo("")
     click.echo("Components:")
@@ -71,13 +112,17 @@ def action_list(obj, expanded):
                 util.format_description(obj["description"]), obj["owner"],
                 util.get_status_string(obj), when_published)
 
-    dfs = [ format_record_format(df) for df in dfs ]
+    dfs = [ format_record_format(r) for r in records if r["kind"] == "data_format" ]
 
     click.echo("")
     click.echo("Data formats:")
     click.echo(util.create_table(('Name', 'Version', 'Description', 'Owner', 'Status',
         'Published'), dfs))
 
+    if next_token:
+        click.echo("")
+    echo_next_token()
+
 
 @catalog.command(name="show")
 @click.argument("resource", metavar="name:version")
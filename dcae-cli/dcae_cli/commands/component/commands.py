@@ -31,15 +31,17 @@ import os
 from discovery_client import resolve_name
 
 from dcae_cli.util import profiles, load_json, dmaap, inputs, policy
-from dcae_cli.util.run import run_component, dev_component
+from dcae_cli.util.run import run_component, dev_component, prefetch_images
+from dcae_cli.util.run_set import run_component_set
 from dcae_cli.util import discovery as dis
 from dcae_cli.util import docker_util as du
 from dcae_cli.util.discovery import DiscoveryNoDownstreamComponentError
-from dcae_cli.util.undeploy import undeploy_component
+from dcae_cli.util.undeploy import undeploy_component, undeploy_components
 from dcae_cli.util.exc import DcaeException
 
 from dcae_cli.commands import util
-from dcae_cli.commands.util import parse_input, parse_input_pair, create_table
+from dcae_cli.commands.util import parse_input, parse_input_pair, create_table, \
+        expand_spec_paths, load_specs, report_bulk_add
 
 from dcae_cli.catalog.exc import MissingEntry
 
@@ -49,6 +51,26 @@ def component():
     pass
 
 
+def _stream_components(user, catalog, output, deployed, **filters):
+    '''Streams the user's components with their deployed instances as records'''
+    snap = dis.snapshot(user, profiles.get_profile().consul_host)
+    fields = ['name', 'version', 'component_type', 'description', 'status',
+            'modified', 'deployed']
+
+    if deployed:
+        fields += ['healthy_instances', 'defective_instances']
+
+    def to_record(comp):
+        healthy, defective = dis.lookup_snapshot(snap, comp["name"], comp["version"])
+        return dict(comp, status=util.get_status_string(comp),
+                deployed=len(healthy) + len(defective),
+                healthy_instances=" ".join(healthy),
+                defective_instances=" ".join(defective))
+
+    records = ( to_record(comp) for comp in catalog.iter_components(user=user, **filters) )
+    util.stream_records(records, fields, output)
+
+
 @component.command(name='list')
 @click.option('--latest', is_flag=True, default=True, help='Only list the latest version of components which match the filter criteria')
 @click.option('--subscribes', '-sub', multiple=True, help='Only list components which subscribe to FORMAT')
@@ -56,8 +78,9 @@ def component():
 @click.option('--provides', '-pro', multiple=True, type=(str, str), help='Only list components which provide services REQ_FORMAT RESP_FORMAT')
 @click.option('--calls', '-cal', multiple=True, type=(str, str), help='Only list components which call services REQ_FORMAT RESP_FORMAT')
 @click.option('--deployed', is_flag=True, default=False, help='Display the deployed view. Shows details of deployed instances.')
+@util.output_option
 @click.pass_obj
-def list_component(obj, latest, subscribes, publishes, provides, calls, deployed):
+def list_component(obj, latest, subscribes, publishes, provides, calls, deployed, output):
     '''Lists components in the public catalog. Uses flags to filter results.'''
     subs = list(map(parse_input, subscribes)) if subscribes else None
     pubs = list(map(parse_input, publishes)) if publishes else None
@@ -65,6 +88,11 @@ def list_component(obj, latest, subscribes, publishes, provides, calls, deployed
     cals = list(map(parse_input_pair, calls)) if calls else None
 
     user, catalog = obj['config']['user'], obj['catalog']
+
+    if output != 'table':
+        _stream_components(user, catalog, output, deployed, subscribes=subs,
+                publishes=pubs, provides=provs, calls=cals, latest=latest)
+        return
     # TODO: How about components that you don't own but you have deployed?
     comps = catalog.list_components(subs, pubs, provs, cals, latest, user=user)
 
@@ -83,6 +111,9 @@ def list_component(obj, latest, subscribes, publishes, provides, calls, deployed
         else:
             return None
 
+    # All deployed instances are fetched and classified once for all components
+    snap = dis.snapshot(user, consul_host)
+
     def get_instances_as_rows(comp):
         """Get all deployed running instances of a component plus details about
         those instances and return as a list of rows"""
@@ -90,12 +121,11 @@ def list_component(obj, latest, subscribes, publishes, provides, calls, deployed
         cver = comp["version"]
         ctype = comp["component_type"]
 
-        instances = dis.get_healthy_instances(user, cname, cver)
+        instances, instances_defective = dis.lookup_snapshot(snap, cname, cver)
         instances_status = ["Healthy"]*len(instances)
         instances_conns = [ format_resolve_results(resolve_name(consul_host, instance)) \
                 for instance in instances ]
 
-        instances_defective = dis.get_defective_instances(user, cname, cver)
         instances_status += ["Defective"]*len(instances_defective)
         instances_conns += [""]*len(instances_defective)
 
@@ -250,14 +280,107 @@ def run(obj, external_ip, additional_user, attached, force, dmaap_file, componen
         message = "Component requires inputs. Please look at the use of --inputs-file and make sure the format is correct"
         raise DcaeException(message)
 
+_help_manifest = """
+Path to a json file that lists the components to run together:
+
+  {
+    "components": [
+      {"component": <name:version>, "dmaap_file": <path>, "inputs_file": <path>},
+      ...
+    ]
+  }
+
+"dmaap_file" and "inputs_file" are optional and relative to the manifest. See "run" for their formats.
+"""
+
+def _parse_run_set_manifest(manifest_file):
+    try:
+        manifest = load_json(manifest_file)
+        entries = manifest["components"]
+    except Exception as e:
+        message = "Problems with parsing the manifest file. Check to make sure that it is a valid json and is in the expected format."
+        raise DcaeException(message)
+
+    base_dir = os.path.dirname(manifest_file)
+
+    def parse_entry(entry):
+        cname, cver = parse_input(entry["component"])
+        dmaap_file, inputs_file = entry.get("dmaap_file"), entry.get("inputs_file")
+        dmaap_map = _parse_dmaap_file(os.path.join(base_dir, dmaap_file)) if dmaap_file else {}
+        inputs_map = _parse_inputs_file(os.path.join(base_dir, inputs_file)) if inputs_file else {}
+        return cname, cver, dmaap_map, inputs_map
+
+    return [ parse_entry(entry) for entry in entries ]
+
+
+@component.command(name='run-set')
+@click.option('--additional-user', default=None, help='Additional user to grab instances from.')
+@click.option('--force', is_flag=True, help='Force components to run without valid downstream dependencies')
+@click.option('--max-workers', default=4, type=click.IntRange(1, None), help='Maximum number of components deployed at the same time')
+@click.argument('manifest', type=click.Path(resolve_path=True, exists=True, dir_okay=False))
+@click.pass_obj
+def run_set(obj, additional_user, force, max_workers, manifest):
+    '''Runs the components of MANIFEST, downstream components first, and rolls back upon failure'''
+    user, catalog = obj['config']['user'], obj['catalog']
+    entries = _parse_run_set_manifest(manifest)
+
+    try:
+        deployed, failures = run_component_set(user, catalog, entries,
+                additional_user=additional_user, force=force, max_workers=max_workers)
+    except inputs.InputsValidationError as e:
+        click.echo("ERROR: There is a problem. {0}".format(e))
+        click.echo("")
+        message = "Component requires inputs. Please look at the use of inputs_file in the manifest and make sure the format is correct"
+        raise DcaeException(message)
+
+    status = "Rolled back" if failures else "Deployed"
+    rows = [ (":".join(key), instance, status) for key, instance in deployed ]
+    rows += [ (":".join(key), "", "FAILED: {0}".format(e)) for key, e in sorted(failures.items()) ]
+    click.echo(create_table(('Component', 'Instance', 'Result'), rows))
+
+    if failures:
+        raise DcaeException("{0} components failed to deploy. Everything deployed has been rolled back.".format(len(failures)))
+
+
 @component.command()
-@click.argument('component')
+@click.argument('components', nargs=-1, required=True, metavar='COMPONENT...')
+@click.option('--max-workers', default=4, type=click.IntRange(1, None), help='Maximum number of images pulled at the same time')
 @click.pass_obj
-def undeploy(obj,  component):
-    '''Undeploy latest (or specific) COMPONENT version. You may optionally specify version via COMPONENT:VERSION'''
-    cname, cver = parse_input(component)
+def prefetch(obj, components, max_workers):
+    '''Pulls the images of docker COMPONENTs onto the docker host ahead of running them'''
+    catalog = obj['catalog']
+    keys = [ catalog.verify_component(*parse_input(component)) for component in components ]
+    failed = prefetch_images(catalog, keys, max_workers=max_workers)
+
+    if failed:
+        raise DcaeException("Could not pull images: {0}".format(", ".join(failed)))
+
+
+@component.command()
+@click.argument('component', required=False)
+@click.option('--all', 'undeploy_all', is_flag=True, help='Undeploy all of your deployed components')
+@click.option('--match', default=None, metavar='GLOB', help='Undeploy deployed components whose name or name:version matches GLOB')
+@click.option('--defective-only', is_flag=True, help='Only undeploy instances that are not healthy')
+@click.pass_obj
+def undeploy(obj, component, undeploy_all, match, defective_only):
+    '''Undeploy latest (or specific) COMPONENT version. You may optionally specify version via COMPONENT:VERSION
+
+    Use --all or --match instead of COMPONENT to undeploy many deployed components in one pass'''
+    if sum([bool(component), undeploy_all, bool(match)]) != 1:
+        raise DcaeException("Provide exactly one of COMPONENT, --all or --match")
+
     user, catalog = obj['config']['user'], obj['catalog']
-    undeploy_component(user, cname, cver, catalog)
+
+    if component:
+        cname, cver = parse_input(component)
+        if not defective_only:
+            undeploy_component(user, cname, cver, catalog)
+            return
+        cname, cver = catalog.verify_component(cname, cver)
+        # Bulk undeploys match on catalog names
+        match = "{0}:{1}".format(cname, cver)
+
+    undeploy_components(user, catalog, match=match, defective_only=defective_only)
 
 
 @component.command()
@@ -331,6 +454,28 @@ def add(obj, update, specification):
     catalog.add_component(user, spec, update)
 
 
+@component.command(name='add-bulk')
+@click.option('--update', is_flag=True, help='Updates locally added components and data formats if they have not already been published')
+@click.option('--formats', multiple=True, help='Directory, glob or file of data format specifications to add along with the components')
+@click.argument('specifications', nargs=-1, required=True)
+@click.pass_obj
+def add_bulk(obj, update, formats, specifications):
+    """Add Components from directories, globs or files to local onboarding catalog in a single transaction"""
+    user, catalog = obj['config']['user'], obj['catalog']
+
+    dfs, df_errors = load_specs(expand_spec_paths(formats))
+    comps, comp_errors = load_specs(expand_spec_paths(specifications))
+
+    if not comps and not comp_errors:
+        raise DcaeException("No component specification files found")
+
+    # Nothing should be added when a file can't even be loaded
+    load_errors = dict(df_errors)
+    load_errors.update(comp_errors)
+    results = [] if load_errors else catalog.add_bulk(user, dfs, comps, update)
+    report_bulk_add(results, load_errors)
+
+
 @component.command()
 @click.option('--policy-file', type=click.Path(resolve_path=True, exists=True, dir_okay=False), help=_help_policy_file)
 @click.argument('component')
@@ -374,13 +519,14 @@ def reconfig(obj, policy_file, component):
         click.echo("")
         return
 
-    kvUpdated = dis.policy_update(policy_change_file, dis.default_consul_host())
+    policies = dis.sync_policies(policy_change_file, dis.default_consul_host())
 
-    if kvUpdated:
+    if policies is not None:
         active_profile = profiles.get_profile()
         docker_logins  = dis.get_docker_logins()
 
-        command = dis.build_policy_command(policy_reconfig_path, policy_change_file, dis.default_consul_host())
+        command = dis.build_policy_command(policy_reconfig_path, policy_change_file,
+                dis.default_consul_host(), policies)
 
         #  Run the Policy Reconfig script
         client = du.get_docker_client(active_profile, docker_logins)
@@ -38,7 +38,8 @@ from dcae_cli.util import load_json
 from dcae_cli.util.logger import get_logger
 
 from dcae_cli.commands import util
-from dcae_cli.commands.util import create_table, parse_input
+from dcae_cli.commands.util import create_table, parse_input, expand_spec_paths, \
+        load_specs, report_bulk_add
 
 from dcae_cli.catalog.exc import MissingEntry
 from dcae_cli.catalog.exc import DcaeException
@@ -63,12 +64,37 @@ def add(obj, update, specification):
     catalog.add_format(spec, user, update)
 
 
+@data_format.command(name='add-bulk')
+@click.option('--update', is_flag=True, help='Updates locally added data formats if they have not already been published')
+@click.argument('specifications', nargs=-1, required=True)
+@click.pass_obj
+def add_bulk(obj, update, specifications):
+    '''Tracks Format file Specifications from directories, globs or files locally in a single transaction'''
+    user, catalog = obj['config']['user'], obj['catalog']
+    dfs, load_errors = load_specs(expand_spec_paths(specifications))
+
+    if not dfs and not load_errors:
+        raise DcaeException("No data format specification files found")
+
+    results = [] if load_errors else catalog.add_bulk(user, dfs, update=update)
+    report_bulk_add(results, load_errors)
+
+
 @data_format.command(name='list')
 @click.option('--latest', is_flag=True, help='Only list the latest version of data formats')
+@util.output_option
 @click.pass_obj
-def list_format(obj, latest):
+def list_format(obj, latest, output):
     """Lists all your Data Formats"""
     user, catalog = obj['config']['user'], obj['catalog']
+
+    if output != 'table':
+        records = ( dict(df, status=util.get_status_string(df))
+                for df in catalog.iter_formats(latest, user=user) )
+        util.stream_records(records, ('name', 'version', 'description', 'status',
+            'modified'), output)
+        return
+
     dfs = catalog.list_formats(latest, user=user)
 
     def format_record(df):
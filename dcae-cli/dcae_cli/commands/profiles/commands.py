@@ -28,7 +28,7 @@ import click
 
 from dcae_cli.util.exc import DcaeException
 from dcae_cli.util.profiles import (get_profiles, activate_profile, get_active_name, update_profile,
-                                    delete_profile, create_profile)
+                                    delete_profile, create_profile, DOCKER_HOST_IP)
 
 
 @click.group()
@@ -73,11 +73,20 @@ def create(name):
 
 @profiles.command(name='set')
 @click.argument('name')
-@click.argument('key')
-@click.argument('value')
-def update(name, key, value):
+@click.argument('key', required=False)
+@click.argument('value', required=False)
+@click.option('--docker-host-ip', default=None,
+        help='IP address of the docker host which is then never resolved. Pass "" to resolve it again.')
+def update(name, key, value, docker_host_ip):
     '''Updates profile (name) for specific Key/Value'''
-    update_profile(name, **{key: value})
+    params = {}
+    if key is not None:
+        if value is None:
+            raise DcaeException("Missing value for key '{}'.".format(key))
+        params[key] = value
+    if docker_host_ip is not None:
+        params[DOCKER_HOST_IP] = docker_host_ip
+    update_profile(name, **params)
 
 
 @profiles.command()
@@ -0,0 +1,96 @@
+# ============LICENSE_START=======================================================
+# org.onap.dcae
+# ================================================================================
+# Copyright (c) 2017-2018 AT&T Intellectual Property. All rights reserved.
+# ================================================================================
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============LICENSE_END=========================================================
+#
+# ECOMP is a trademark and service mark of AT&T Intellectual Property.
+
+# -*- coding: utf-8 -*-
+'''
+Tests catalog CLI commands
+'''
+import os
+import json
+from copy import deepcopy
+
+import pytest
+from click.testing import CliRunner
+
+from dcae_cli.cli import cli
+from dcae_cli.catalog import MockCatalog
+
+
+TEST_DIR = os.path.dirname(__file__)
+
+
+def test_catalog_list_pages(mock_cli_config, mock_db_url):
+    mc = MockCatalog(purge_existing=True, db_name='dcae_cli.test.db',
+            enforce_image=False, db_url=mock_db_url)
+    obj = {'catalog': mc, 'config': {'user': 'test-user'}}
+
+    with open(os.path.join(TEST_DIR, 'mocked_components', 'model', 'int-class.format.json')) as f:
+        df_spec = json.load(f)
+    df_name = df_spec['self']['name']
+
+    for version in ["1.0.0", "1.1.0", "1.2.0"]:
+        spec = deepcopy(df_spec)
+        spec['self']['version'] = version
+        mc.add_format(spec, 'alice' if version == "1.0.0" else 'bob')
+
+    runner = CliRunner()
+
+    def invoke(cmd):
+        result = runner.invoke(cli, cmd, obj=obj)
+        assert result.exit_code == 0, result.output
+        return result.output.splitlines()
+
+    # Follow continuation tokens until the last page
+    versions, token = [], None
+    while True:
+        cmd = 'catalog list --expanded --limit 2 --output jsonl'.split()
+        lines = invoke(cmd + (['--token', token] if token else []))
+        versions.extend(json.loads(line)['version'] for line in lines if line.startswith('{'))
+        token = lines[-1].split()[-1] if lines[-1].startswith('More results') else None
+        if token is None:
+            break
+    assert versions == ["1.0.0", "1.1.0", "1.2.0"]
+
+    output = invoke('catalog list --expanded --limit 1'.split())
+    assert output[-1].startswith('More results. Continue with --token ')
+
+    def listed(args):
+        cmd = 'catalog list --output jsonl'.split() + args.split()
+        return [ json.loads(line)['version'] for line in invoke(cmd) ]
+
+    assert listed('') == []
+    assert listed('--status staged') == ["1.2.0"]
+    assert listed('--status staged --owner alice') == ["1.0.0"]
+    assert listed('--status staged --name-prefix asimov. --expanded') == ["1.0.0", "1.1.0", "1.2.0"]
+    assert listed('--status staged --name-prefix other.') == []
+    assert listed('--status staged --since 2999-01-01') == []
+    assert listed('--status staged --since 2018-01-01T00:00:00') == ["1.2.0"]
+
+    result = runner.invoke(cli, 'catalog list --since yesterday'.split(), obj=obj)
+    assert result.exit_code == 2
+
+    result = runner.invoke(cli, 'catalog list --token bogus'.split(), obj=obj)
+    assert result.exit_code == 1
+    assert 'Invalid continuation token' in result.output
+
+
+if __name__ == '__main__':
+    '''Test area'''
+    pytest.main([__file__, ])
@@ -104,6 +104,192 @@ def test_comp_docker(mock_cli_config, mock_db_url, obj=None):
     assert comp_model_spec == json.loads(spec_str)
 
 
+def test_comp_add_bulk(mock_cli_config, mock_db_url):
+
+    obj = {'catalog': MockCatalog(purge_existing=True, db_name='dcae_cli.test.db',
+        enforce_image=False, db_url=mock_db_url),
+           'config': {'user': 'test-user'}}
+
+    mocked_dir = os.path.join(TEST_DIR, 'mocked_components')
+    comps = os.path.join(mocked_dir, '*', '*.comp.json')
+    dfs = os.path.join(mocked_dir, '*', '*.format.json')
+
+    runner = CliRunner()
+
+    # the components can't be added without their data formats
+    cmd = ["component", "add-bulk", comps]
+    result = runner.invoke(cli, cmd, obj=obj)
+    assert result.exit_code == 1
+    assert "Nothing was added" in result.output
+
+    cmd = ["component", "add-bulk", "--formats", dfs, comps]
+    result = runner.invoke(cli, cmd, obj=obj)
+    assert result.exit_code == 0
+
+    comp_viz_name = _get_spec(os.path.join(mocked_dir, 'viz', 'line-viz.comp.json'))['self']['name']
+    cmd = "component show {:}".format(comp_viz_name).split()
+    assert runner.invoke(cli, cmd, obj=obj).exit_code == 0
+
+
+def test_comp_run_set(mock_cli_config, mock_db_url, tmpdir, monkeypatch):
+
+    obj = {'catalog': MockCatalog(purge_existing=True, db_name='dcae_cli.test.db',
+        enforce_image=False, db_url=mock_db_url),
+           'config': {'user': 'test-user'}}
+
+    mocked_dir = os.path.join(TEST_DIR, 'mocked_components')
+    runner = CliRunner()
+
+    cmd = ["component", "add-bulk", "--formats", os.path.join(mocked_dir, '*', '*.format.json'),
+            os.path.join(mocked_dir, '*', '*.comp.json')]
+    assert runner.invoke(cli, cmd, obj=obj).exit_code == 0
+
+    from dcae_cli.util import run_set
+    deployed = []
+
+    def run_component_fake(user, cname, cver, catalog, additional_user, attached,
+            force, dmaap_map, inputs_map):
+        deployed.append((cname, inputs_map))
+        return "test-user.abc.{0}".format(cname)
+
+    monkeypatch.setattr(run_set, "run_component", run_component_fake)
+    monkeypatch.setattr(run_set.dis, "is_healthy", lambda host, instance: True)
+    prefetched = []
+    monkeypatch.setattr(run_set, "prefetch_images",
+            lambda catalog, keys, max_workers: prefetched.extend(keys) or [])
+
+    tmpdir.join("inputs.json").write(json.dumps({"foo": 1}))
+    manifest = tmpdir.join("manifest.json")
+    manifest.write(json.dumps({"components": [
+        {"component": "std.vnf.kpi_collector"},
+        {"component": "asimov.anomaly_classifier:1.0.0", "inputs_file": "inputs.json"},
+        {"component": "asimov.viz.line_plot"}]}))
+
+    cmd = ["component", "run-set", "--max-workers", "2", str(manifest)]
+    result = runner.invoke(cli, cmd, obj=obj)
+    assert result.exit_code == 0
+
+    # Downstream components are deployed first
+    assert deployed == [("asimov.viz.line_plot", {}), ("asimov.anomaly_classifier", {"foo": 1}),
+            ("std.vnf.kpi_collector", {})]
+
+    assert sorted(prefetched) == [("asimov.anomaly_classifier", "1.0.0"),
+            ("asimov.viz.line_plot", "1.0.0"), ("std.vnf.kpi_collector", "1.0.0")]
+
+    manifest.write("not json")
+    result = runner.invoke(cli, ["component", "run-set", str(manifest)], obj=obj)
+    assert result.exit_code == 1
+    assert "manifest" in result.output
+
+
+def test_comp_list_output(mock_cli_config, mock_db_url, monkeypatch):
+
+    obj = {'catalog': MockCatalog(purge_existing=True, db_name='dcae_cli.test.db',
+        enforce_image=False, db_url=mock_db_url),
+           'config': {'user': 'test-user'}}
+
+    mocked_dir = os.path.join(TEST_DIR, 'mocked_components')
+    runner = CliRunner()
+
+    cmd = ["component", "add-bulk", "--formats", os.path.join(mocked_dir, '*', '*.format.json'),
+            os.path.join(mocked_dir, '*', '*.comp.json')]
+    assert runner.invoke(cli, cmd, obj=obj).exit_code == 0
+
+    from dcae_cli.commands.component import commands
+    snap = { ("asimov.viz.line_plot", "1.0.0"): { "healthy": ["a"], "defective": ["b"] } }
+    monkeypatch.setattr(commands.dis, "snapshot", lambda user, consul_host: snap)
+
+    cmd = "component list --deployed --output jsonl".split()
+    result = runner.invoke(cli, cmd, obj=obj)
+    assert result.exit_code == 0
+    records = dict((r["name"], r) for r in map(json.loads, result.output.splitlines()))
+
+    assert "std.vnf.kpi_collector" in records
+    assert records["asimov.viz.line_plot"]["deployed"] == 2
+    assert records["asimov.viz.line_plot"]["healthy_instances"] == "a"
+    assert records["asimov.viz.line_plot"]["status"] == "staged"
+    assert records["std.vnf.kpi_collector"]["deployed"] == 0
+
+
+def test_comp_undeploy_bulk(mock_cli_config, mock_db_url, monkeypatch):
+
+    obj = {'catalog': MockCatalog(purge_existing=True, db_name='dcae_cli.test.db',
+        enforce_image=False, db_url=mock_db_url),
+           'config': {'user': 'test-user'}}
+
+    mocked_dir = os.path.join(TEST_DIR, 'mocked_components')
+    runner = CliRunner()
+
+    cmd = ["component", "add-bulk", "--formats", os.path.join(mocked_dir, '*', '*.format.json'),
+            os.path.join(mocked_dir, '*', '*.comp.json')]
+    assert runner.invoke(cli, cmd, obj=obj).exit_code == 0
+
+    from dcae_cli.commands.component import commands
+    calls = []
+
+    def undeploy_components_fake(user, catalog, match=None, defective_only=False):
+        calls.append((match, defective_only))
+
+    monkeypatch.setattr(commands, "undeploy_components", undeploy_components_fake)
+
+    assert runner.invoke(cli, ["component", "undeploy", "--all"], obj=obj).exit_code == 0
+    assert runner.invoke(cli, ["component", "undeploy", "--match", "asimov.*",
+        "--defective-only"], obj=obj).exit_code == 0
+    assert runner.invoke(cli, ["component", "undeploy", "asimov.viz.line_plot",
+        "--defective-only"], obj=obj).exit_code == 0
+
+    assert calls == [(None, False), ("asimov.*", True), ("asimov.viz.line_plot:1.0.0", True)]
+
+    for cmd in (["component", "undeploy"], ["component", "undeploy", "--all", "--match", "x"],
+            ["component", "undeploy", "asimov.viz.line_plot", "--all"]):
+        assert runner.invoke(cli, cmd, obj=obj).exit_code == 1
+    assert len(calls) == 3
+
+
+def test_comp_undeploy_dashed_name(mock_cli_config, mock_db_url, monkeypatch):
+    catalog = MockCatalog(purge_existing=True, db_name='dcae_cli.test.db',
+        enforce_image=False, db_url=mock_db_url)
+    obj = {'catalog': catalog, 'config': {'user': 'test-user'}}
+
+    mocked_dir = os.path.join(TEST_DIR, 'mocked_components')
+    runner = CliRunner()
+
+    cmd = ["component", "add-bulk", "--formats", os.path.join(mocked_dir, '*', '*.format.json'),
+            os.path.join(mocked_dir, '*', '*.comp.json')]
+    assert runner.invoke(cli, cmd, obj=obj).exit_code == 0
+
+    with open(os.path.join(mocked_dir, 'viz', 'line-viz.comp.json')) as f:
+        spec = json.load(f)
+    spec['self']['name'] = 'asimov.viz.line-plot'
+    catalog.add_component('test-user', spec)
+
+    from dcae_cli.util import undeploy, docker_util, profiles
+    undeployed = []
+
+    def undeploy_component_fake(client, image, instance):
+        undeployed.append(instance)
+        return True
+
+    # Instance names only keep dots so the snapshot has the dotted name
+    monkeypatch.setattr(undeploy, "snapshot", lambda user: {
+        ("asimov.viz.line.plot", "1.0.0"): { "healthy": ["healthy-instance"],
+            "defective": ["defective-instance"] } })
+    monkeypatch.setattr(undeploy, "remove_config", lambda instance: True)
+    monkeypatch.setattr(profiles, "get_profile", lambda: None)
+    monkeypatch.setattr(docker_util, "get_docker_client", lambda profile: None)
+    monkeypatch.setattr(docker_util, "undeploy_component", undeploy_component_fake)
+
+    cmd = ["component", "undeploy", "asimov.viz.line-plot", "--defective-only"]
+    result = runner.invoke(cli, cmd, obj=obj)
+    assert result.exit_code == 0, result.output
+    assert undeployed == ["defective-instance"]
+
+    del undeployed[:]
+    cmd = ["component", "undeploy", "--match", "*line-plot"]
+    assert runner.invoke(cli, cmd, obj=obj).exit_code == 0
+    assert sorted(undeployed) == ["defective-instance", "healthy-instance"]
+
+
 @pytest.mark.skip(reason="This is not a pure unit test. Need a way to setup dependencies and trigger in the appropriate stages of testing.")
 def test_comp_cdap(obj=None):
     """
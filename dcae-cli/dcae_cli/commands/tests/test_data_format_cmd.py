@@ -71,6 +71,29 @@ def test_basic(mock_cli_config, mock_db_url, tmpdir):
     df_name = df_spec['self']['name']
     assert df_name in runner.invoke(cli, cmd, obj=obj).output
 
+    # machine readable list output
+    cmd = 'data_format list --output json'.split()
+    records = json.loads(runner.invoke(cli, cmd, obj=obj).output)
+    assert [ (r['name'], r['status']) for r in records ] == [(df_name, 'staged')]
+
+    cmd = 'data_format list --output jsonl'.split()
+    lines = runner.invoke(cli, cmd, obj=obj).output.splitlines()
+    assert [ json.loads(line)['name'] for line in lines ] == [df_name]
+
+    cmd = 'data_format list --output csv'.split()
+    lines = runner.invoke(cli, cmd, obj=obj).output.splitlines()
+    assert lines[0] == "name,version,description,status,modified"
+    assert lines[1].startswith("{0},{1},".format(df_name, df_spec['self']['version']))
+    assert len(lines) == 2
+
+    cmd = 'catalog list --expanded --output jsonl'.split()
+    lines = runner.invoke(cli, cmd, obj=obj).output.splitlines()
+    assert [ (json.loads(line)['kind'], json.loads(line)['name']) for line in lines ] \
+            == [('data_format', df_name)]
+
+    cmd = 'catalog list --output json'.split()
+    assert json.loads(runner.invoke(cli, cmd, obj=obj).output) == []
+
 
     # light test of component info
     cmd = "data_format show {:}".format(df_name).split()
@@ -117,6 +140,27 @@ def test_basic(mock_cli_config, mock_db_url, tmpdir):
     assert actual == expected
 
 
+def test_list_output_non_ascii(mock_cli_config, mock_db_url):
+    mc = MockCatalog(purge_existing=True, db_name='dcae_cli.test.db',
+            enforce_image=False, db_url=mock_db_url)
+    obj = {'catalog': mc, 'config': {'user': 'test-user'}}
+
+    spec_file = os.path.join(TEST_DIR, 'mocked_components', 'model', 'int-class.format.json')
+    df_spec = _get_spec(spec_file)
+    df_spec['self']['description'] = u'Donn\xe9es m\xe9t\xe9o \u2603'
+    mc.add_format(df_spec, 'test-user')
+
+    runner = CliRunner()
+
+    for output in ('csv', 'jsonl'):
+        result = runner.invoke(cli, ['data_format', 'list', '--output', output], obj=obj)
+        assert result.exit_code == 0, result.output
+        assert len(result.output.splitlines()) == (2 if output == 'csv' else 1)
+
+    result = runner.invoke(cli, 'data_format list --output csv'.split(), obj=obj)
+    assert u'Donn\xe9es m\xe9t\xe9o \u2603' in result.output
+
+
 if __name__ == '__main__':
     '''Test area'''
     pytest.main([__file__, ])
@@ -78,6 +78,18 @@ def test_basic(monkeypatch, tmpdir, mock_db_url):
     result = runner.invoke(cli, cmd)
     assert result.output == '   fake-solutioning\n*  foo\n'
 
+    cmd = 'profiles set foo --docker-host-ip 10.0.0.1'.split()
+    assert runner.invoke(cli, cmd).exit_code == 0
+    assert profiles.get_docker_host_ip() == "10.0.0.1"
+    assert profiles.get_profile().docker_host == ""
+
+    cmd = ['profiles', 'set', 'foo', '--docker-host-ip', '']
+    assert runner.invoke(cli, cmd).exit_code == 0
+    assert profiles.get_docker_host_ip() is None
+
+    cmd = 'profiles set foo docker_host'.split()
+    assert runner.invoke(cli, cmd).exit_code == 1
+
 
 if __name__ == '__main__':
     '''Test area'''
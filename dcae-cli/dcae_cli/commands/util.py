@@ -22,11 +22,19 @@
 """
 Provides utilities for commands
 """
+import os
+import csv
 import json
+import glob
+import datetime
 import textwrap
+from collections import OrderedDict
+
+import six
+import click
 from terminaltables import AsciiTable
 
-from dcae_cli.util import DcaeException
+from dcae_cli.util import DcaeException, load_json
 
 
 def parse_input(input_):
@@ -47,6 +55,49 @@ def parse_input_pair(req, resp):
     return parse_input(req), parse_input(resp)
 
 
+def expand_spec_paths(paths):
+    '''Returns the sorted unique json file paths found in directories, globs and files'''
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                found.update(os.path.join(root, f) for f in files if f.endswith('.json'))
+        else:
+            found.update(p for p in glob.glob(path) if os.path.isfile(p))
+    return sorted(found)
+
+
+def load_specs(paths):
+    '''Loads json spec files
+
+    Returns
+    -------
+    Tuple of a list of (path, spec) tuples and a dict of path to error message
+    for the files that could not be loaded
+    '''
+    specs, errors = [], {}
+    for path in paths:
+        try:
+            specs.append((path, load_json(path)))
+        except (DcaeException, IOError, OSError) as e:
+            errors[path] = str(e)
+    return specs, errors
+
+
+def report_bulk_add(results, load_errors):
+    '''Displays the per file results of a bulk add and raises if anything failed'''
+    results = sorted(six.iteritems(load_errors)) + results
+    rows = [ (path, "ok" if error is None else error) for path, error in results ]
+    click.echo(create_table(('File', 'Result'), rows))
+
+    num_failed = len([ error for _, error in results if error is not None ])
+
+    if num_failed:
+        raise DcaeException("Nothing was added. {0} files failed.".format(num_failed))
+
+    click.echo("Added {0} files".format(len(results)))
+
+
 def create_table(header, entries):
     '''Returns an ASCII table string'''
     data = [header, ]
@@ -57,6 +108,62 @@ def create_table(header, entries):
     return AsciiTable(data).table
 
 
+OUTPUT_FORMATS = ('table', 'json', 'jsonl', 'csv')
+
+output_option = click.option('--output', '-o', type=click.Choice(OUTPUT_FORMATS),
+        default='table', help='Output format. json, jsonl and csv are streamed as rows are read.')
+
+
+def _format_value(value):
+    '''Returns a json and csv friendly value'''
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def stream_records(records, fields, output):
+    '''Writes records one at a time in a machine readable format
+
+    Nothing is buffered so memory use doesn't grow with the number of records.
+
+    Args
+    ----
+    records: Iterable of dicts
+    fields: Sequence of the keys of each record to write, in order
+    output: One of json, jsonl or csv
+    '''
+    def select(record):
+        return [ (field, _format_value(record.get(field))) for field in fields ]
+
+    if output == 'jsonl':
+        for record in records:
+            click.echo(json.dumps(OrderedDict(select(record))))
+    elif output == 'json':
+        click.echo("[", nl=False)
+        for i, record in enumerate(records):
+            click.echo("{0}\n{1}".format("," if i else "", json.dumps(OrderedDict(select(record)))),
+                    nl=False)
+        click.echo("\n]")
+    elif output == 'csv':
+        def to_line(row):
+            buf = six.StringIO()
+            if six.PY2:
+                # The Python 2 csv module only handles byte strings
+                row = [ cell.encode("utf-8") if isinstance(cell, six.text_type) else cell
+                        for cell in row ]
+                csv.writer(buf, lineterminator='\n').writerow(row)
+                return buf.getvalue().decode("utf-8")
+            csv.writer(buf, lineterminator='\n').writerow(row)
+            return buf.getvalue()
+
+        click.echo(to_line(fields), nl=False)
+        for record in records:
+            click.echo(to_line([ "" if value is None else value for _, value in select(record) ]),
+                    nl=False)
+    else:
+        raise DcaeException("Unsupported output format: {0}".format(output))
+
+
 # Utility methods used to format records for displaying
 
 def get_status_string(record):
@@ -20,11 +20,67 @@
 
 # -*- coding: utf-8 -*-
 '''Provides CLI-level tests'''
+import os
+import sys
+import json
+import time
+import subprocess
+
+import pytest
 from click.testing import CliRunner
 
 from dcae_cli.cli import cli
 
 
+# Seconds that a cli invocation may take from process start to exit. Generous
+# because test machines vary. Override with DCAE_CLI_STARTUP_THRESHOLD.
+STARTUP_THRESHOLD = float(os.environ.get("DCAE_CLI_STARTUP_THRESHOLD", 3.0))
+
+# Modules that commands like `--help` and `profiles list` must not import
+HEAVY_MODULES = ["sqlalchemy", "sqlalchemy_utils", "docker", "dockering", "consul",
+        "requests", "jsonschema", "genson", "terminaltables", "discovery_client"]
+
+_STARTUP_SCRIPT = '''
+import sys, json
+from dcae_cli.cli import cli
+try:
+    cli(sys.argv[1:], prog_name="dcae_cli")
+except SystemExit:
+    pass
+sys.stderr.write(json.dumps(sorted(sys.modules)))
+'''
+
+
+def _time_startup(args, env):
+    start = time.time()
+    proc = subprocess.Popen([sys.executable, "-c", _STARTUP_SCRIPT] + args, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = proc.communicate()
+    elapsed = time.time() - start
+    assert proc.returncode == 0, err
+    return elapsed, out.decode("utf-8"), set(json.loads(err.decode("utf-8")))
+
+
+@pytest.mark.parametrize("args", [["--help"], ["profiles", "list"]])
+def test_startup(tmpdir, args):
+    app_dir = tmpdir.mkdir("dcae-cli")
+    app_dir.join("config.json").write(json.dumps({ "user": "bob",
+        "active_profile": "default", "cli_version": "2.0.0",
+        "db_url": "sqlite:///{0}".format(app_dir.join("never-created.db")) }))
+    app_dir.join("profiles.json").write(json.dumps({ "default": {
+        "consul_host": "consul", "cdap_broker": "cdap_broker",
+        "config_binding_service": "config_binding_service",
+        "docker_host": "docker_host:2376" }}))
+
+    env = dict(os.environ, XDG_CONFIG_HOME=str(tmpdir))
+    elapsed, output, modules = _time_startup(args, env)
+
+    assert output
+    assert [ m for m in HEAVY_MODULES if m in modules ] == []
+    # The catalog is only built for commands that use it
+    assert not app_dir.join("never-created.db").exists()
+    assert elapsed < STARTUP_THRESHOLD, "dcae_cli {0} took {1:.2f}s".format(
+            " ".join(args), elapsed)
 
 
 if __name__ == '__main__':
@@ -23,20 +23,30 @@
 Provides reusable utilites
 """
 import os
+import copy
 import json
 import sys
 import errno
+import tempfile
+import threading
 import contextlib
-import requests
 
 import six
 import click
 
 from dcae_cli.util.exc import DcaeException, FileNotFoundError
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 
 APP_NAME = 'dcae-cli'
 
+# Python 2 has no os.replace. os.rename also replaces atomically on POSIX.
+_replace = getattr(os, 'replace', os.rename)
+
 
 def get_app_dir():
     '''Returns the absolute directory path for dcae cli aux files'''
@@ -55,11 +65,60 @@ def makedirs(path, exist_ok=True):
                 raise
 
 
+# Preference files are read many times per invocation e.g. the config for every
+# config getter. Parsed files are kept here keyed by absolute path along with
+# the file's stat signature so that changes by other processes are picked up.
+_pref_cache = dict()
+_pref_cache_lock = threading.Lock()
+
+
+def _get_pref_signature(path):
+    '''Returns a tuple that changes whenever the file is rewritten'''
+    st = os.stat(path)
+    return getattr(st, 'st_mtime_ns', st.st_mtime), st.st_size, st.st_ino
+
+
+def _read_pref(path):
+    '''Returns the parsed preference file using the cache when it is unchanged'''
+    path = os.path.abspath(path)
+
+    try:
+        signature = _get_pref_signature(path)
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            raise FileNotFoundError(path)
+        raise
+
+    with _pref_cache_lock:
+        cached = _pref_cache.get(path)
+
+    if cached is None or cached[0] != signature:
+        with open(path) as file:
+            cached = (signature, json.load(file))
+        with _pref_cache_lock:
+            _pref_cache[path] = cached
+
+    # Callers are free to modify what they get back
+    return copy.deepcopy(cached[1])
+
+
+# Preference directories whose lock is held by the current thread
+_held_locks = threading.local()
+
+
+def invalidate_pref(path=None):
+    '''Drops the cached preference file at `path` or all of them when `path` is None'''
+    with _pref_cache_lock:
+        if path is None:
+            _pref_cache.clear()
+        else:
+            _pref_cache.pop(os.path.abspath(path), None)
+
+
 def get_pref(path, init_func=None):
     '''Returns a general preference dict. Uses `init_func` to create a new one if the file does not exist.'''
     try:
-        with open(path) as file:
-            pref = json.load(file)
+        pref = _read_pref(path)
     except FileNotFoundError:
         pref = init_func() if init_func is not None else dict()
         write_pref(pref, path)
@@ -70,20 +129,72 @@ def pref_exists(path):
     return os.path.isfile(path)
 
 
+@contextlib.contextmanager
+def pref_lock(path):
+    '''Holds an exclusive advisory lock for a preference file
+
+    Use around read-modify-write of a preference file so that concurrent
+    invocations sharing an app dir don't lose each other's updates. The lock is
+    taken on the directory holding the file because writes replace the file
+    itself. The lock is reentrant within a thread. Locking is skipped on
+    platforms without fcntl.
+    '''
+    dir_path = os.path.dirname(os.path.abspath(path))
+    held = _held_locks.__dict__.setdefault('paths', set())
+
+    if fcntl is None or dir_path in held:
+        yield
+        return
+
+    makedirs(dir_path, exist_ok=True)
+    fd = os.open(dir_path, os.O_RDONLY)
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        held.add(dir_path)
+        try:
+            yield
+        finally:
+            held.discard(dir_path)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
 def update_pref(path, init_func=None, **kwargs):
     '''Sets specified key-value pairs in a preference file and returns an updated dict'''
-    pref = get_pref(path, init_func)
-    pref.update(kwargs)
-    write_pref(pref, path)
+    with pref_lock(path):
+        # Always start from what is on disk
+        invalidate_pref(path)
+        pref = get_pref(path, init_func)
+        pref.update(kwargs)
+        write_pref(pref, path)
 
     return pref
 
 
 def write_pref(pref, path):
-    '''Writes a preference json file to disk'''
-    makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, 'w') as file:
-        json.dump(pref, file)
+    '''Writes a preference json file to disk
+
+    The file is written next to the target and renamed over it so that readers
+    never see a partially written file.
+    '''
+    dir_path = os.path.dirname(os.path.abspath(path))
+    makedirs(dir_path, exist_ok=True)
+    invalidate_pref(path)
+
+    fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix=".{0}.".format(os.path.basename(path)))
+    try:
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        with os.fdopen(fd, 'w') as file:
+            json.dump(pref, file)
+            file.flush()
+            os.fsync(file.fileno())
+        _replace(tmp_path, path)
+    except:
+        os.remove(tmp_path)
+        raise
 
 
 def reraise_with_msg(e, msg=None, cls=None, as_dcae=False):
@@ -111,6 +222,9 @@ def fetch_file_from_web(server_url, path, transform_func=json.loads):
 
     The default behavior is to transform the response to a json.
     """
+    # Imported here to keep requests off the cli startup path
+    import requests
+
     artifact_url = "{0}/{1}".format(server_url, path)
     r = requests.get(artifact_url)
     r.raise_for_status()
@@ -24,12 +24,15 @@ Provides utilities for cdap components
 """
 import logging
 import json
+import time
+import threading
 import requests
 import six
 
 from dcae_cli.util.logger import get_logger
 from dcae_cli.util.exc import DcaeException
-from dcae_cli.util import discovery
+from dcae_cli.util.config import get_broker_url_cache_ttl
+from dcae_cli.util import discovery, resolver
 
 _logger = get_logger('cdap-utils')
 _logger.setLevel(logging.DEBUG)
@@ -101,14 +104,76 @@ def _merge_spec_config_into_broker_put(jar, config, spec, params, templated_conf
 
     return BrokerPut
 
+#Broker interactions share one pooled http session so connections are kept alive between calls
+_session = None
+_session_lock = threading.Lock()
+_POOL_SIZE = 16
+
+#profile -> (broker url, time looked up)
+_broker_urls = {}
+_broker_urls_lock = threading.Lock()
+
+def _get_session():
+    """
+    Gets the http session shared by all broker and consul calls
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=_POOL_SIZE, pool_maxsize=_POOL_SIZE)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
 def _get_broker_url_from_profile(profile):
     """
     Gets the broker URL from profile
     """
     #Functions named so well you don't need docstrings. (C) tombo 2017
-    res = requests.get("http://{0}:8500/v1/catalog/service/{1}".format(profile.consul_host, profile.cdap_broker)).json()
+    def lookup():
+        consul_ip = resolver.resolve(profile.consul_host)[0]
+        return _get_session().get("http://{0}:8500/v1/catalog/service/{1}".format(consul_ip, profile.cdap_broker)).json()
+
+    try:
+        res = lookup()
+    except requests.ConnectionError:
+        #the cached address may be stale so resolve again and retry once
+        resolver.invalidate(profile.consul_host)
+        res = lookup()
     return "http://{ip}:{port}".format(ip=res[0]["ServiceAddress"], port=res[0]["ServicePort"])
 
+def _get_broker_url(profile, now_func=time.time):
+    """
+    Gets the broker URL from the cache, looking it up in consul once it is older than the ttl
+    """
+    now = now_func()
+    with _broker_urls_lock:
+        cached = _broker_urls.get(profile)
+    if cached and now - cached[1] < get_broker_url_cache_ttl():
+        return cached[0]
+
+    broker_url = _get_broker_url_from_profile(profile)
+    with _broker_urls_lock:
+        _broker_urls[profile] = (broker_url, now)
+    return broker_url
+
+def _invalidate_broker_url(profile):
+    with _broker_urls_lock:
+        _broker_urls.pop(profile, None)
+
+def _broker_request(profile, method, path, **kwargs):
+    """
+    Sends a request to the broker using the shared session
+
+    The broker may have moved when it can't be reached so the cached URL is dropped and the request is tried once more
+    """
+    try:
+        return _get_session().request(method, "{0}{1}".format(_get_broker_url(profile), path), **kwargs)
+    except requests.ConnectionError:
+        _invalidate_broker_url(profile)
+        return _get_session().request(method, "{0}{1}".format(_get_broker_url(profile), path), **kwargs)
+
 #PUBLIC 
 def run_component(catalog, params, instance_name, profile, jar, config, spec, templated_conf):
     """
@@ -117,8 +182,6 @@ def run_component(catalog, params, instance_name, profile, jar, config, spec, te
     By the time this function is called, the instance_name and instance_name:rel have already been pushed into consul by this parent function
     instance_name will be overwritten by the broker and the rels key will be used by the broker to call the CBS
     """
-    broker_url = _get_broker_url_from_profile(profile)
-
     #register with the broker
     broker_put = _merge_spec_config_into_broker_put(jar, config, spec, params, templated_conf)
     
@@ -132,7 +195,7 @@ def run_component(catalog, params, instance_name, profile, jar, config, spec, te
     _logger.info("Your program_preferences are being sent as")
     _logger.info(json.dumps(broker_put["program_preferences"]))
 
-    response = requests.put("{brokerurl}/application/{appname}".format(brokerurl=broker_url, appname=instance_name),
+    response = _broker_request(profile, "PUT", "/application/{appname}".format(appname=instance_name),
                             json = broker_put, 
                             headers = {'content-type':'application/json'})
     
@@ -147,7 +210,7 @@ def run_component(catalog, params, instance_name, profile, jar, config, spec, te
     if deploy_success:
         #TODO: not sure what this error handling looks like, should never happen that a deploy succeeds but this get fails
         #Get the cluster URL to tell the user to go check their application
-        response = requests.get(broker_url)
+        response = _broker_request(profile, "GET", "")
         response.raise_for_status() #bomb if not 2xx
         cdap_cluster = response.json()["managed cdap url"]
 
@@ -156,7 +219,7 @@ def run_component(catalog, params, instance_name, profile, jar, config, spec, te
         #TODO: This only fetches AppConfig, add AppPreferences
         ns = "default" if "namespace" not in broker_put else broker_put["namespace"]
         mapped_appname = ''.join(e for e in instance_name if e.isalnum()) 
-        r = requests.get("{0}/v3/namespaces/{1}/apps/{2}".format(cdap_cluster, ns, mapped_appname)).json()
+        r = _get_session().get("{0}/v3/namespaces/{1}/apps/{2}".format(cdap_cluster, ns, mapped_appname)).json()
         config = r["configuration"]
 
         _logger.info("Deployment Complete!")
@@ -192,10 +255,8 @@ def undeploy_component(profile, instance_name):
     """
     Undeploys  a CDAP Component, which in CDAP terms means stop and delete
     """
-    broker_url = _get_broker_url_from_profile(profile) 
-
     #call the delete
-    response = requests.delete("{brokerurl}/application/{appname}".format(brokerurl=broker_url, appname=instance_name))
+    response = _broker_request(profile, "DELETE", "/application/{appname}".format(appname=instance_name))
     try: 
         response.raise_for_status() #bomb if not 2xx
         _logger.info("Undeploy complete.")
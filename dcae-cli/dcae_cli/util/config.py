@@ -29,7 +29,8 @@ import six
 
 from dcae_cli import util
 from dcae_cli import _version
-from dcae_cli.util import get_app_dir, get_pref, update_pref, write_pref, pref_exists
+from dcae_cli.util import get_app_dir, get_pref, update_pref, write_pref, pref_exists, \
+        pref_lock
 
 
 class ConfigurationInitError(RuntimeError):
@@ -133,6 +134,46 @@ def get_path_data_format():
 def get_active_profile():
     return get_config().get("active_profile", None)
 
+def get_schema_cache_ttl():
+    """Returns the number of seconds a cached json schema is used before it is
+    revalidated against the remote server"""
+    return get_config().get("schema_cache_ttl", 86400)
+
+def get_schema_cache_offline():
+    """Returns True when json schemas must only be sourced from the local cache"""
+    return get_config().get("schema_cache_offline", False)
+
+def get_health_wait_timeout():
+    """Returns the number of seconds to wait for a deployed component to become
+    healthy. 0 means wait forever."""
+    return get_config().get("health_wait_timeout", 300)
+
+def get_resolver_cache_ttl():
+    """Returns the number of seconds a resolved host name is used before it is
+    resolved again"""
+    return get_config().get("resolver_cache_ttl", 300)
+
+def get_broker_url_cache_ttl():
+    """Returns the number of seconds the CDAP broker url looked up from Consul
+    is used before it is looked up again"""
+    return get_config().get("broker_url_cache_ttl", 60)
+
+def get_undeploy_settings():
+    """Returns the settings used when undeploying component instances
+
+    For example {"max_workers": 8, "timeout": 120, "retries": 1} where timeout
+    is in seconds per step. Missing settings use the defaults of undeploy._handler.
+    """
+    return get_config().get("undeploy", {})
+
+def get_db_pool_settings():
+    """Returns the keyword arguments used to tune the catalog connection pool
+
+    For example {"pool_size": 5, "max_overflow": 10, "pool_recycle": 1800,
+    "pool_pre_ping": true}. Only applied to server backed catalogs e.g. Postgres.
+    """
+    return get_config().get("db_pool", {})
+
 
 def update_config(**kwargs):
     '''Updates and returns the configuration dictionary'''
@@ -143,13 +184,14 @@ def _reinit_config(init_func):
     new_config = init_func()
     config_path = get_config_path()
 
-    if  pref_exists(config_path):
-        existing_config = get_config()
-        # Make sure to clobber existing values and not other way
-        existing_config.update(new_config)
-        new_config = existing_config
+    with pref_lock(config_path):
+        if  pref_exists(config_path):
+            existing_config = get_config()
+            # Make sure to clobber existing values and not other way
+            existing_config.update(new_config)
+            new_config = existing_config
 
-    write_pref(new_config, config_path)
+        write_pref(new_config, config_path)
     return new_config
 
 def reinit_config():
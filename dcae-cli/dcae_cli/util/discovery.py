@@ -24,12 +24,16 @@ Provides Consul helper functions
 """
 import re
 import json
+import math
+import time
+import base64
 import contextlib
 from collections import defaultdict
 from itertools import chain
 from functools import partial
 from datetime import datetime
 from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
 
 import six
 from copy import deepcopy
@@ -53,6 +57,13 @@ logger = get_logger('Discovery')
 _inst_re = re.compile(r"^(?P<user>[^.]*).(?P<hash>[^.]*).(?P<ver>\d+-\d+-\d+).(?P<comp>.*)$")
 
 
+# Upper bound of concurrent Consul calls when checking instances individually
+_HEALTH_WORKERS = 8
+
+# Longest single Consul blocking query when waiting for health
+_MAX_BLOCK_SECS = 60
+
+
 class DiscoveryError(DcaeException):
     pass
 
@@ -105,7 +116,10 @@ def _is_healthy_pure(get_health_func, instance):
     True if instance has been found and is healthy else False
     """
     index, resp = get_health_func(instance)
+    return _is_passing(resp)
 
+def _is_passing(resp):
+    """True if any registration in a health.service response has all checks passing"""
     if resp:
         def is_passing(instance):
             return all([check["Status"] == "passing" for check in instance["Checks"]])
@@ -130,6 +144,132 @@ def is_healthy(consul_host, instance):
     cons = Consul(consul_host)
     return _is_healthy_pure(cons.health.service, instance)
 
+def is_not_healthy(consul_host, instance):
+    """Negation of is_healthy"""
+    return not is_healthy(consul_host, instance)
+
+def _wait_until_healthy_pure(get_health_func, instance, timeout, now_func=time.time,
+        max_block=_MAX_BLOCK_SECS):
+    """Waits for a component instance to become healthy
+
+    Pure function edition
+
+    Uses Consul blocking queries so that each request returns as soon as the
+    health of the instance changes rather than polling on an interval.
+
+    Args
+    ----
+    get_health_func: func(string, index=, wait=) -> (index, complex object)
+        Consul's health.service
+    instance: (string) fully qualified name of component instance
+    timeout: (number) seconds to wait overall. 0 means wait forever.
+
+    Returns
+    -------
+    True if instance became healthy before the timeout else False
+    """
+    deadline = now_func() + timeout
+    index = None
+
+    while True:
+        wait = max_block
+        if timeout > 0:
+            remaining = deadline - now_func()
+            if remaining <= 0:
+                return False
+            wait = min(wait, int(math.ceil(remaining)))
+
+        new_index, resp = get_health_func(instance, index=index,
+                wait="{0}s".format(wait))
+
+        if _is_passing(resp):
+            return True
+
+        # Consul asks clients to reset when the index goes backwards
+        index = new_index if index is None or int(new_index) >= int(index) else None
+
+def wait_until_healthy(consul_host, instance, timeout):
+    """Waits for a component instance to become healthy. See _wait_until_healthy_pure"""
+    cons = Consul(consul_host)
+    return _wait_until_healthy_pure(cons.health.service, instance, timeout)
+
+def _get_health_index_pure(get_checks_func):
+    """Evaluates the health of every registered service from a single listing of checks
+
+    Pure function edition
+
+    Uses the same rule as _is_healthy_pure: a service is healthy if any of its
+    registrations has all its service checks and all its node checks passing.
+
+    Args
+    ----
+    get_checks_func: func() -> (don't care, list of dicts)
+        Returns every health check like Consul's /v1/health/state/any
+
+    Returns
+    -------
+    Dict of service name to boolean. Services without checks are missing.
+    """
+    _, checks = get_checks_func()
+    checks = checks or []
+
+    nodes_passing = defaultdict(lambda: True)
+    registrations = defaultdict(lambda: True)
+
+    for check in checks:
+        passing = check["Status"] == "passing"
+        if check["ServiceName"]:
+            key = (check["ServiceName"], check["Node"], check["ServiceID"])
+            registrations[key] = registrations[key] and passing
+        else:
+            nodes_passing[check["Node"]] = nodes_passing[check["Node"]] and passing
+
+    health = dict()
+    for (name, node, _), passing in six.iteritems(registrations):
+        health[name] = health.get(name, False) or (passing and nodes_passing[node])
+    return health
+
+def _get_instances_health_pure(get_checks_func, is_healthy_func, instances,
+        max_workers=_HEALTH_WORKERS):
+    """Checks the health of many component instances at once
+
+    Pure function edition
+
+    Health is taken from one listing of all checks. Instances that have no
+    checks in the listing e.g. registered without checks or never registered
+    are checked individually on a bounded thread pool.
+
+    Args
+    ----
+    get_checks_func: func() -> (don't care, list of dicts)
+    is_healthy_func: func(string) -> boolean
+    instances: list of fully qualified names of component instances
+
+    Returns
+    -------
+    Dict of instance name to boolean
+    """
+    index = _get_health_index_pure(get_checks_func)
+    health = dict((instance, index[instance]) for instance in instances
+            if instance in index)
+
+    remaining = [ instance for instance in instances if instance not in health ]
+    if remaining:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            health.update(zip(remaining, executor.map(is_healthy_func, remaining)))
+    return health
+
+def get_instances_health(consul_host, instances):
+    """Checks the health of many component instances with one shared Consul client
+
+    Returns
+    -------
+    Dict of instance name to boolean
+    """
+    cons = Consul(consul_host)
+    return _get_instances_health_pure(partial(cons.health.state, "any"),
+            partial(_is_healthy_pure, cons.health.service), instances)
+
 def _get_instances_from_kv(get_from_kv_func, user):
     """Get component instances from kv store
 
@@ -236,6 +376,22 @@ def _make_instances_map(instances):
     return mapping
 
 
+def _filter_instances(filter_instances_func, consul_host, instances):
+    """Filters instances
+
+    is_healthy and is_not_healthy are answered in bulk by get_instances_health.
+    Any other filter is applied on a bounded thread pool.
+    """
+    if filter_instances_func in (is_healthy, is_not_healthy):
+        health = get_instances_health(consul_host, instances)
+        wanted = filter_instances_func is is_healthy
+        return [ instance for instance in instances if health[instance] == wanted ]
+
+    with ThreadPoolExecutor(max_workers=_HEALTH_WORKERS) as executor:
+        keeps = list(executor.map(partial(filter_instances_func, consul_host), instances))
+    return [ instance for instance, keep in zip(instances, keeps) if keep ]
+
+
 def get_user_instances(user, consul_host=None, filter_instances_func=is_healthy):
     '''Get a user's instance map
 
@@ -249,8 +405,8 @@ def get_user_instances(user, consul_host=None, filter_instances_func=is_healthy)
     Dict whose keys are component (name,version) tuples and values are list of component instance names
     '''
     consul_host = _choose_consul_host(consul_host)
-    filter_func = partial(filter_instances_func, consul_host)
-    instances = list(filter(filter_func, _get_instances(consul_host, user)))
+    instances = _filter_instances(filter_instances_func, consul_host,
+            _get_instances(consul_host, user))
 
     return _make_instances_map(instances)
 
@@ -302,13 +458,58 @@ def get_defective_instances(user, cname, cver, consul_host=None):
     -------
     List of strings where the strings are fully qualified instance names
     """
-    def is_not_healthy(consul_host, component):
-        return not is_healthy(consul_host, component)
-
     consul_host = _choose_consul_host(consul_host)
     return _get_component_instances(is_not_healthy, user, cname, cver, consul_host)
 
 
+def _make_snapshot(instances, health):
+    """Classify instances by component and health
+
+    Args
+    ----
+    instances: list of fully qualified instance names
+    health: dict of instance name to boolean
+
+    Returns
+    -------
+    Dict whose keys are component (name, version) tuples and values are dicts
+    of "healthy" and "defective" to sorted lists of instance names
+    """
+    snap = dict()
+    for key, names in six.iteritems(_make_instances_map(instances)):
+        entry = snap[key] = { "healthy": [], "defective": [] }
+        for name in sorted(names):
+            entry["healthy" if health[name] else "defective"].append(name)
+    return snap
+
+def snapshot(user, consul_host=None):
+    """Get all of a user's deployed instances classified as healthy or defective
+
+    Consul's kv store, catalog and health are each read once no matter how many
+    components are looked up afterwards with lookup_snapshot.
+
+    Returns
+    -------
+    Dict whose keys are component (name, version) tuples and values are dicts
+    of "healthy" and "defective" to lists of instance names
+    """
+    consul_host = _choose_consul_host(consul_host)
+    instances = _get_instances(consul_host, user)
+    return _make_snapshot(instances, get_instances_health(consul_host, instances))
+
+def lookup_snapshot(snap, cname, cver):
+    """Get the healthy and defective instances of a component from a snapshot
+
+    Returns
+    -------
+    Tuple of the list of healthy and the list of defective instance names
+    """
+    # Instance names always map back to dotted component names. See
+    # _get_component_instances.
+    entry = snap.get((replace_dots(cname, reverse=True), cver), {})
+    return list(entry.get("healthy", [])), list(entry.get("defective", []))
+
+
 def lookup_instance(consul_host, name):
     """Query Consul for service details"""
     cons = Consul(consul_host)
@@ -512,12 +713,58 @@ def get_docker_logins(host=None):
         return []
 
 
+# Consul rejects transactions with more operations than this
+_TXN_MAX_OPS = 64
+
+def _kv_op(verb, key, value=None):
+    """Builds a KV operation for Consul's transaction endpoint"""
+    op = { "Verb": verb, "Key": key }
+    if value is not None:
+        op["Value"] = base64.b64encode(value.encode("utf-8")).decode("utf-8")
+    return { "KV": op }
+
+def _kv_txn_pure(put_txn_func, operations, max_ops=_TXN_MAX_OPS):
+    """Applies KV operations using Consul transactions
+
+    Pure function edition
+
+    Operations are split into chunks of at most max_ops. Each chunk is applied
+    all-or-nothing by Consul and chunks are applied in order until one fails.
+
+    Args
+    ----
+    put_txn_func: func(list of operations) -> dict
+        Look at unittests in test_discovery to see examples
+    operations: list of operations built by _kv_op
+
+    Returns
+    -------
+    True when all operations have been applied else False
+    """
+    for start in range(0, len(operations), max_ops):
+        result = put_txn_func(operations[start:start+max_ops])
+
+        if not result or result.get("Errors"):
+            errors = result.get("Errors") if result else None
+            logger.error("Consul transaction failed: {0}".format(errors))
+            return False
+
+    return True
+
+def kv_txn(cons, operations):
+    """Applies KV operations using Consul transactions. See _kv_txn_pure"""
+    return _kv_txn_pure(cons.txn.put, operations)
+
+
 def push_config(conf_key, conf, rels_key, rels, dmaap_key, dmaap_map, host=None):
-    '''Uploads the config and rels to Consul'''
+    '''Uploads the config and rels to Consul in a single transaction'''
     host = _choose_consul_host(host)
     cons = Consul(host)
-    for k, v in ((conf_key, conf), (rels_key, rels), (dmaap_key, dmaap_map)):
-        cons.kv.put(k, json.dumps(v))
+    operations = [ _kv_op("set", k, json.dumps(v))
+            for k, v in ((conf_key, conf), (rels_key, rels), (dmaap_key, dmaap_map)) ]
+
+    if not kv_txn(cons, operations):
+        raise DiscoveryError("Failed to push the config of {0} to Consul".format(conf_key))
 
     logger.info("* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *")
     logger.info("* If you run a 'component reconfig' command, you must first execute the following")
@@ -534,10 +781,8 @@ def remove_config(config_key, host=None):
     """
     host = _choose_consul_host(host)
     cons = Consul(host)
-    #  "recurse=True" deletes the SERVICE_NAME KV and all other KVs with suffixes (:rel, :dmaap, :policies)
-    results = cons.kv.delete(config_key, recurse=True)
-
-    return results
+    #  "delete-tree" deletes the SERVICE_NAME KV and all other KVs with suffixes (:rel, :dmaap, :policies)
+    return kv_txn(cons, [_kv_op("delete-tree", config_key)])
 
 
 def _group_config(config, config_key_map):
@@ -614,98 +859,94 @@ def config_context(user, cname, cver, params, interface_map, instance_map,
                 remove_config(conf_key, host)
 
 
-def policy_update(policy_change_file, consul_host):
+def _get_policy_folders():
+    """ Return the Consul policy items folder and event key of the component in SERVICE_NAME """
+    service_name = os.environ["SERVICE_NAME"]
+    return service_name + ":policies/items/", service_name + ":policies/event"
 
-    #  Determine if it is an 'updated_policies' or 'removed_policies' change, or if user included ALL policies
-    policies = True if "policies"         in policy_change_file.keys() else False
-    updated  = True if "updated_policies" in policy_change_file.keys() else False
-    removed  = True if "removed_policies" in policy_change_file.keys() else False
 
-    cons          = Consul(consul_host)
-    service_name  = os.environ["SERVICE_NAME"]
-    policy_folder = service_name + ":policies/items/"
-    event_folder  = service_name + ":policies/event"
+def _read_policies(cons, policy_folder):
+    """ Read all policies under the policy folder with one recursive read.
+        Return a dict of Consul key to policy """
 
-    if policies:
-        #  User specified ALL "policies" in the Policy File.  Ignore "updated_policies"/"removed_policies"
-        logger.warning("The 'policies' specified in the 'policy-file' will replace all policies in Consul.")
-        allPolicies = policy_change_file['policies']
-        if not update_all_policies(cons, policy_folder, allPolicies):
-            return False
+    _, items = cons.kv.get(policy_folder, recurse=True)
+    return dict((item['Key'], json.loads(item['Value'].decode("utf-8")))
+            for item in items or [] if item['Value'])
 
-    else:
-        #  If 'removed_policies', delete the Policy from the Component KV pair
-        if removed:
-            policyDeletes = policy_change_file['removed_policies']
-            if not remove_policies(cons, policy_folder, policyDeletes):
-                return False
 
-        #  If 'updated_policies', update the Component KV pair
-        if updated:
-            policyUpdates = policy_change_file['updated_policies']
-            if not update_specified_policies(cons, policy_folder, policyUpdates):
-                return False
+def _diff_policies(policy_folder, current, policy_change_file):
+    """ Apply the policy-file to the current policies.
+        Return (desired policies as a dict of Consul key to policy, list of Consul
+        transaction operations that turn current into desired) or None if any
+        Policy ID cannot be extracted """
 
-    return create_policy_event(cons, event_folder, policy_folder)
+    def keyed(policies):
+        keys = [ extract_policy_id(policy_folder, policy) for policy in policies ]
+        return None if not all(keys) else dict(zip(keys, policies))
 
+    if "policies" in policy_change_file:
+        #  User specified ALL "policies" in the Policy File.  Ignore "updated_policies"/"removed_policies"
+        desired = keyed(policy_change_file['policies'])
+        if desired is None:
+            return None
+    else:
+        removed = keyed(policy_change_file.get('removed_policies', []))
+        updated = keyed(policy_change_file.get('updated_policies', []))
+        if removed is None or updated is None:
+            return None
 
-def create_policy_event(cons, event_folder, policy_folder):
-    """ Create a Policy 'event' KV pair in Consol """
+        desired = dict((k, v) for k, v in six.iteritems(current) if k not in removed)
+        desired.update(updated)
 
-    timestamp      = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-    update_id      = str(uuid4())
-    policies       = cons.kv.get(policy_folder, recurse=True)
-    policies_count = str(policies).count("'Key':")
+    operations = [ _kv_op("delete", key) for key in sorted(current) if key not in desired ]
+    operations += [ _kv_op("set", key, json.dumps(desired[key])) for key in sorted(desired)
+            if current.get(key) != desired[key] ]
 
-    event = '{"action": "gathered", "timestamp": "' + timestamp + '", "update_id": "' + update_id + '", "policies_count": ' + str(policies_count) + '}'
-    if not cons.kv.put(event_folder, event):
-        logger.error("Policy 'Event' creation of ({:}) in Consul failed".format(event_folder))
-        return False
+    return desired, operations
 
-    return True
 
+def _make_policy_event(policies_count):
+    """ Create the body of the Policy 'event' KV pair """
+    return json.dumps({ "action": "gathered",
+        "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "update_id": str(uuid4()), "policies_count": policies_count })
 
-def update_all_policies(cons, policy_folder, allPolicies):
-    """ Delete all policies from Consul, then add the policies the user specified in the 'policies' section of the policy-file """
 
-    if not cons.kv.delete(policy_folder, recurse=True):    #  Deletes all Policies under the /policies/items folder
-        logger.error("Policy delete of ({:}) in Consul failed".format(policy_folder))
-        return False
+def sync_policies(policy_change_file, consul_host):
+    """ Sync the component's policies in Consul with the policy-file
 
-    if not update_specified_policies(cons, policy_folder, allPolicies):
-        return False
+        The policies are read once, diffed against the policy-file and only the
+        differences plus the Policy 'event' are written in a single transaction
+        (chunked for large policy sets).
 
-    return True
+        Return the resulting list of policies or None upon failure """
 
-def update_specified_policies(cons, policy_folder, policyUpdates):
-    """ Replace the policies the user specified in the 'updated_policies' (or 'policies') section of the policy-file """
+    cons = Consul(consul_host)
+    policy_folder, event_folder = _get_policy_folders()
 
-    for policy in policyUpdates:
-        policy_folder_id = extract_policy_id(policy_folder, policy)
-        if policy_folder_id:
-            policyBody = json.dumps(policy)
-            if not cons.kv.put(policy_folder_id, policyBody):
-                logger.error("Policy update of ({:}) in Consul failed".format(policy_folder_id))
-                return False
-        else:
-            return False
+    if "policies" in policy_change_file:
+        logger.warning("The 'policies' specified in the 'policy-file' will replace all policies in Consul.")
 
-    return True
+    current = _read_policies(cons, policy_folder)
+    diff = _diff_policies(policy_folder, current, policy_change_file)
+    if diff is None:
+        return None
 
+    desired, operations = diff
+    #  The event goes last so that it is written after all the policy changes
+    operations.append(_kv_op("set", event_folder, _make_policy_event(len(desired))))
 
-def remove_policies(cons, policy_folder, policyDeletes):
-    """ Delete the policies that the user specified in the 'removed_policies' section of the policy-file """
+    if not kv_txn(cons, operations):
+        logger.error("Policy sync of ({:}) in Consul failed".format(policy_folder))
+        return None
 
-    for policy in policyDeletes:
-        policy_folder_id = extract_policy_id(policy_folder, policy)
-        if policy_folder_id:
-            if not cons.kv.delete(policy_folder_id):
-                logger.error("Policy delete of ({:}) in Consul failed".format(policy_folder_id))
-                return False
-        else:
-            return False
+    return [ desired[key] for key in sorted(desired) ]
+
+
+def policy_update(policy_change_file, consul_host):
+    """ Update the component's policies in Consul. See sync_policies """
+    return sync_policies(policy_change_file, consul_host) is not None
 
-    return True
 
 def extract_policy_id(policy_folder, policy):
     """ Extract the Policy ID from the policyName.
@@ -726,13 +967,11 @@ def extract_policy_id(policy_folder, policy):
         return
 
 
-def build_policy_command(policy_reconfig_path, policy_change_file, consul_host):
-        """ Build command to execute the Policy Reconfig script in the Docker container """
+def build_policy_command(policy_reconfig_path, policy_change_file, consul_host, policies=None):
+        """ Build command to execute the Policy Reconfig script in the Docker container
 
-        #  Determine if it is an 'updated_policies' and/or 'removed_policies' change, or if user included ALL policies
-        all_policies = True if "policies"         in policy_change_file.keys() else False
-        updated      = True if "updated_policies" in policy_change_file.keys() else False
-        removed      = True if "removed_policies" in policy_change_file.keys() else False
+            policies: ALL policies of the component e.g. as returned by
+            sync_policies. Read from Consul when not given. """
 
         #  Create the Reconfig Script command (3 parts: Command and 2 ARGs)
         command = []
@@ -740,38 +979,20 @@ def build_policy_command(policy_reconfig_path, policy_change_file, consul_host):
         command.append("policies")
 
         #  Create a Dictionary of 'updated', 'removed', and 'ALL' policies
-
-        #  'updated' policies - policies come from the --policy-file
-        if updated:
-            updated_policies = policy_change_file['updated_policies']
-        else: updated_policies = []
-
-        policies = {}
-        policies["updated_policies"] = updated_policies
-
-        #  'removed' policies - policies come from the --policy-file
-        if removed:
-            removed_policies = policy_change_file['removed_policies']
-        else: removed_policies = []
-
-        policies["removed_policies"] = removed_policies
+        #  'updated' and 'removed' policies - policies come from the --policy-file
+        policies_arg = {}
+        policies_arg["updated_policies"] = policy_change_file.get('updated_policies', [])
+        policies_arg["removed_policies"] = policy_change_file.get('removed_policies', [])
 
         #  ALL 'policies' - policies come from Consul
-        cons          = Consul(consul_host)
-        service_name  = os.environ["SERVICE_NAME"]
-        policy_folder = service_name + ":policies/items/"
-
-        id, consul_policies = cons.kv.get(policy_folder, recurse=True)
-
-        policy_values = []
-        if consul_policies:
-            for policy in consul_policies:
-                policy_value = json.loads(policy['Value'])
-                policy_values.append(policy_value)
+        if policies is None:
+            policy_folder, _ = _get_policy_folders()
+            current = _read_policies(Consul(consul_host), policy_folder)
+            policies = [ current[key] for key in sorted(current) ]
 
-        policies["policies"] = policy_values
+        policies_arg["policies"] = policies
 
         #  Add the policies to the Docker "command" as a JSON string
-        command.append(json.dumps(policies))
+        command.append(json.dumps(policies_arg))
 
         return command
@@ -23,14 +23,16 @@ Functions for DMaaP integration
 """
 import six
 import logging
-from jsonschema import validate, ValidationError
-from dcae_cli.util import reraise_with_msg
+from jsonschema import ValidationError
+from dcae_cli.util import reraise_with_msg, validators
 from dcae_cli.util.logger import get_logger
 from dcae_cli.catalog.mock.schema import apply_defaults
 
 
 logger = get_logger('Dmaap')
 
+_SCHEMA_PATH = "dcae_cli/dmaap"
+
 _SCHEMA = {
       "$schema": "http://json-schema.org/draft-04/schema#",
       "title": "Schema for dmaap inputs",
@@ -236,7 +238,7 @@ def validate_dmaap_map_schema(dmaap_map):
     """Validate the dmaap map schema"""
     for k, v in six.iteritems(dmaap_map):
         try:
-            validate(v, _SCHEMA)
+            validators.validate(v, _SCHEMA_PATH, _SCHEMA)
         except ValidationError as e:
             logger.error("DMaaP validation issue with \"{k}\"".format(k=k))
             logger.error(_validation_msg)
@@ -250,11 +252,11 @@ def _find_matching_definition(instance):
     """Find and return matching definition given an instance"""
     for subsection in ["message_router", "data_router_publisher",
             "data_router_subscriber"]:
-        try:
-            validate(instance, _SCHEMA["definitions"][subsection])
-            return _SCHEMA["definitions"][subsection]
-        except ValidationError:
-            pass
+        definition = _SCHEMA["definitions"][subsection]
+        path = "{0}#/definitions/{1}".format(_SCHEMA_PATH, subsection)
+
+        if validators.get_validator(path, definition).is_valid(instance):
+            return definition
 
     # You should never get here but just in case..
     logger.error("No matching definition: {0}".format(instance))
@@ -23,12 +23,16 @@
 Provides utilities for Docker components
 """
 import socket
+import threading
 from sys import platform
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 import docker
 import six
 
 import dockering as doc
+from dcae_cli.util import profiles, resolver
 from dcae_cli.util.logger import get_logger
 from dcae_cli.util.exc import DcaeException
 
@@ -73,27 +77,246 @@ def build_envs(profile, docker_config, instance_name):
 # TODO: Consolidate these two docker client methods. Need ability to invoke local
 # vs remote Docker engine
 
+# Docker clients are created once per process and shared. Each new client costs
+# a connection, a ping and possibly logins so reuse makes a difference when
+# running or undeploying many components.
+_clients = dict()
+_clients_lock = threading.Lock()
+
+# Index of local images used by image_exists as a fast path. Loaded with a
+# single images() call. Names that miss it are matched by the daemon.
+_image_index = None
+_image_index_lock = threading.Lock()
+
+
+def _make_client_key(docker_host, logins):
+    """Returns a hashable key for a docker host and a set of logins"""
+    return docker_host, frozenset(tuple(sorted(login.items())) for login in logins)
+
+
 def get_docker_client(profile, logins=[]):
-    hostname, port = profile.docker_host.split(":")
-    try:
-        client = doc.create_client(hostname, port, logins=logins)
-        client.ping()
+    key = _make_client_key(profile.docker_host, logins)
+
+    with _clients_lock:
+        if key in _clients:
+            return _clients[key]
+
+        hostname, port = profile.docker_host.split(":")
+        try:
+            client = doc.create_client(hostname, port, logins=logins)
+            client.ping()
+        except:
+            raise DockerError('Could not connect to the Docker daemon. Is it running?')
+
+        _clients[key] = client
         return client
-    except:
-        raise DockerError('Could not connect to the Docker daemon. Is it running?')
+
+
+def _get_local_client():
+    """Returns the shared client for the Docker engine set in the environment"""
+    key = _make_client_key(None, [])
+
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = docker.APIClient(version="auto", **docker.utils.kwargs_from_env())
+        return _clients[key]
+
+
+def _build_image_index(images):
+    """Builds the set of names an image can be referred to by
+
+    Args
+    ----
+    images: List of image dicts as returned by docker's images()
+
+    Returns
+    -------
+    Set of image ids, repository names, repository:tag names and digests
+    """
+    index = set()
+
+    for image in images:
+        index.add(image["Id"])
+        for tag in image.get("RepoTags") or []:
+            index.add(tag)
+            index.add(tag.rsplit(":", 1)[0])
+        for digest in image.get("RepoDigests") or []:
+            index.add(digest)
+
+    return index
 
 
 def image_exists(image):
-    '''Returns True if the image exists locally'''
-    client = docker.APIClient(version="auto", **docker.utils.kwargs_from_env())
-    return True if client.images(image) else False
+    '''Returns True if the image exists locally
+
+    The index of local images is only a fast path. Names that aren't in it,
+    like docker.io/library/foo:tag or short ids, are left to the daemon to
+    match.
+    '''
+    global _image_index
+
+    with _image_index_lock:
+        if _image_index is None:
+            _image_index = _build_image_index(_get_local_client().images())
+        if image in _image_index:
+            return True
+
+    if _get_local_client().images(image):
+        with _image_index_lock:
+            if _image_index is not None:
+                _image_index.add(image)
+        return True
+
+    return False
+
+
+def clear_docker_caches():
+    """Forgets all shared Docker clients and the local image index"""
+    global _image_index
+
+    with _clients_lock:
+        _clients.clear()
+    with _image_index_lock:
+        _image_index = None
+
+
+# Default number of images pulled at the same time
+_PULL_WORKERS = 4
+
+# Pull statuses that are reported per layer. The other statuses like
+# "Downloading" are progress updates.
+_LAYER_STATUSES = ("Pulling fs layer", "Waiting", "Download complete",
+        "Pull complete", "Already exists")
+
+
+def _summarize_pull(image, events):
+    """Summarizes the stream of decoded events of an image pull
+
+    Layer status changes are logged as they arrive.
+
+    Returns
+    -------
+    Dict with "pulled" the set of layer ids that were downloaded, "existing" the
+    set of layer ids that were already on the host and "error" the error message
+    or None
+    """
+    summary = { "pulled": set(), "existing": set(), "error": None }
+
+    for event in events:
+        status, layer = event.get("status"), event.get("id")
+
+        if "error" in event:
+            summary["error"] = event["error"]
+        elif status in _LAYER_STATUSES and layer:
+            dlog.info("{0}: {1} {2}".format(image, layer, status))
+            if status == "Pull complete":
+                summary["pulled"].add(layer)
+            elif status == "Already exists":
+                summary["existing"].add(layer)
+        elif status:
+            dlog.debug("{0}: {1} {2}".format(image, layer or "", status))
+
+    return summary
+
+
+def _pull_image(client, image):
+    """Pulls an image onto the docker host unless it is already there
+
+    Returns
+    -------
+    Summary as returned by _summarize_pull. "present" is True when the image
+    was already on the docker host and no pull was done.
+    """
+    try:
+        client.inspect_image(image)
+        return { "pulled": set(), "existing": set(), "error": None, "present": True }
+    except docker.errors.ImageNotFound:
+        pass
+    except Exception as e:
+        return { "pulled": set(), "existing": set(), "error": str(e), "present": False }
+
+    try:
+        summary = _summarize_pull(image, client.pull(image, stream=True, decode=True))
+    except Exception as e:
+        summary = { "pulled": set(), "existing": set(), "error": str(e) }
+
+    summary["present"] = False
+    return summary
+
+
+def _pull_images_pure(pull_func, images, max_workers):
+    """Pulls images concurrently
+
+    Args
+    ----
+    pull_func: func(image) -> summary as returned by _pull_image
+
+    Returns
+    -------
+    Dict of image to summary
+    """
+    images = sorted(set(images))
+
+    if not images:
+        return dict()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(images, executor.map(pull_func, images)))
+
+
+def _report_pulls(summaries):
+    """Logs the result of pulling images
+
+    Layers shared by images are downloaded by the docker host only once so each
+    layer is counted once in the totals.
+
+    Returns
+    -------
+    List of the images that could not be pulled
+    """
+    failed = []
+    downloaded = set()
+
+    for image, summary in sorted(summaries.items()):
+        if summary["error"]:
+            dlog.error("Could not pull {0}: {1}".format(image, summary["error"]))
+            failed.append(image)
+        elif summary["present"]:
+            dlog.info("{0}: already on the docker host".format(image))
+        else:
+            dlog.info("{0}: {1} layers pulled, {2} layers already on the docker host".format(
+                image, len(summary["pulled"]), len(summary["existing"])))
+            downloaded.update(summary["pulled"])
+
+    shared = set()
+    seen = set()
+    for summary in summaries.values():
+        layers = summary["pulled"] | summary["existing"]
+        shared.update(seen & layers)
+        seen.update(layers)
+
+    dlog.info("Pulled {0} images with {1} unique layers downloaded, {2} layers shared between images".format(
+        len(summaries) - len(failed), len(downloaded), len(shared)))
+
+    return failed
+
+
+def pull_images(client, images, max_workers=_PULL_WORKERS):
+    """Pulls the images that are missing on the docker host concurrently
+
+    Returns
+    -------
+    List of the images that could not be pulled
+    """
+    return _report_pulls(_pull_images_pure(partial(_pull_image, client), images,
+        max_workers))
 
 
 def _infer_ip():
     '''Infers the IP address of the host running this tool'''
     if not platform.startswith('linux'):
         raise DockerError('Non-linux environment detected. Use the --external-ip flag when running Docker components.')
-    ip = socket.gethostbyname(socket.gethostname())
+    ip = resolver.resolve(socket.gethostname())[0]
     dlog.info("Docker host external IP address inferred to be {:}. If this is incorrect, use the --external-ip flag.".format(ip))
     return ip
 
@@ -176,7 +399,8 @@ def deploy_component(profile, image, instance_name, docker_config, should_wait=F
     hcp = doc.add_host_config_params_volumes(volumes=volumes, host_config_params=hcp)
     # Thankfully passing in an IP will return back an IP
     dh = profile.docker_host.split(":")[0]
-    _, _, dhips = socket.gethostbyname_ex(dh)
+    dhip = profiles.get_docker_host_ip()
+    dhips = [dhip] if dhip else resolver.resolve(dh)
 
     if dhips:
         hcp = doc.add_host_config_params_dns(dhips[0], hcp)
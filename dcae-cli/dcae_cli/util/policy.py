@@ -22,12 +22,14 @@
 Function for Policy schema validation
 """
 
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
 from dcae_cli.util.logger import get_logger
-from dcae_cli.util import reraise_with_msg
+from dcae_cli.util import reraise_with_msg, validators
 
 logger = get_logger('policy')
 
+_SCHEMA_PATH = "dcae_cli/policy"
+
 _SCHEMA = {
   "$schema": "http://json-schema.org/draft-04/schema#",
   "title": "Schema for policy changes",
@@ -56,7 +58,7 @@ def validate_against_policy_schema(policy_file):
     """Validate the policy file against the schema"""
 
     try:
-        validate(policy_file, _SCHEMA)
+        validators.validate(policy_file, _SCHEMA_PATH, _SCHEMA)
     except ValidationError as e:
         logger.error("Policy file validation issue")
         logger.error(_validation_msg)
@@ -30,7 +30,7 @@ import six
 import click
 
 from dcae_cli import util
-from dcae_cli.util import get_app_dir, get_pref, write_pref
+from dcae_cli.util import get_app_dir, get_pref, write_pref, pref_lock
 from dcae_cli.util import config
 from dcae_cli.util.config import get_config, update_config
 from dcae_cli.util.exc import DcaeException
@@ -50,10 +50,13 @@ CONSUL_HOST = 'consul_host'
 CONFIG_BINDING_SERVICE = 'config_binding_service'
 CDAP_BROKER = 'cdap_broker'
 DOCKER_HOST = 'docker_host'
+# Optional. Explicit IP address of the docker host which skips resolving it.
+DOCKER_HOST_IP = 'docker_host_ip'
 
 # TODO: Should probably lift this strict list of allowed keys and repurpose to be
 # keys that are required.
 _allowed_keys = set([CONSUL_HOST, CONFIG_BINDING_SERVICE, CDAP_BROKER, DOCKER_HOST])
+_optional_keys = set([DOCKER_HOST_IP])
 Profile = namedtuple('Profile', _allowed_keys)
 
 
@@ -111,13 +114,14 @@ def reinit_profiles():
 
     profiles_path = get_profiles_path()
 
-    if  util.pref_exists(profiles_path):
-        existing_profiles = get_profiles(include_active=False)
-        # Make sure to clobber existing values and not other way
-        existing_profiles.update(new_profiles)
-        new_profiles = existing_profiles
+    with pref_lock(profiles_path):
+        if  util.pref_exists(profiles_path):
+            existing_profiles = get_profiles(include_active=False)
+            # Make sure to clobber existing values and not other way
+            existing_profiles.update(new_profiles)
+            new_profiles = existing_profiles
 
-    write_pref(new_profiles, profiles_path)
+        write_pref(new_profiles, profiles_path)
     return new_profiles
 
 
@@ -158,41 +162,54 @@ def get_profile(name=ACTIVE):
         raise DcaeException("Specified profile '{}' does not exist.".format(name))
 
     try:
-        profile = Profile(**profiles[name])
+        profile = Profile(**dict((k, v) for k, v in six.iteritems(profiles[name])
+            if k not in _optional_keys))
     except TypeError as e:
         raise DcaeException("Specified profile '{}' is malformed.".format(name))
 
     return profile
 
 
+def get_docker_host_ip(name=ACTIVE):
+    '''Returns the docker host IP address set for the profile or None if it must be resolved'''
+    profiles = get_profiles()
+
+    if name not in profiles:
+        raise DcaeException("Specified profile '{}' does not exist.".format(name))
+
+    return profiles[name].get(DOCKER_HOST_IP) or None
+
+
 def create_profile(name, **kwargs):
     '''Creates a new profile'''
     _assert_not_reserved(name)
 
-    profiles = get_profiles(user_only=True)
-    if name in profiles:
-        raise DcaeException("Profile '{}' already exists.".format(name))
+    with pref_lock(get_profiles_path()):
+        profiles = get_profiles(user_only=True)
+        if name in profiles:
+            raise DcaeException("Profile '{}' already exists.".format(name))
 
-    profile = _create_stub_profile()
-    profile.update(kwargs)
-    _assert_valid_profile(profile)
+        profile = _create_stub_profile()
+        profile.update(kwargs)
+        _assert_valid_profile(profile)
 
-    profiles[name] = profile
-    _write_profiles(profiles)
+        profiles[name] = profile
+        _write_profiles(profiles)
 
 
 def delete_profile(name):
     '''Deletes a profile'''
     _assert_not_reserved(name)
-    profiles = get_profiles(user_only=True)
-    if name not in profiles:
-        raise DcaeException("Profile '{}' does not exist.".format(name))
-    if name == get_active_name():
-        logger.warning("Profile '{}' is currently active. Activate another profile first."
-                .format(name))
-        return False
-    del profiles[name]
-    _write_profiles(profiles)
+    with pref_lock(get_profiles_path()):
+        profiles = get_profiles(user_only=True)
+        if name not in profiles:
+            raise DcaeException("Profile '{}' does not exist.".format(name))
+        if name == get_active_name():
+            logger.warning("Profile '{}' is currently active. Activate another profile first."
+                    .format(name))
+            return False
+        del profiles[name]
+        _write_profiles(profiles)
     return True
 
 
@@ -201,12 +218,13 @@ def update_profile(name, **kwargs):
     _assert_not_reserved(name)
     _assert_valid_profile(kwargs)
 
-    profiles = get_profiles(user_only=True)
-    if name not in profiles:
-        raise DcaeException("Profile '{}' does not exist.".format(name))
+    with pref_lock(get_profiles_path()):
+        profiles = get_profiles(user_only=True)
+        if name not in profiles:
+            raise DcaeException("Profile '{}' does not exist.".format(name))
 
-    profiles[name].update(kwargs)
-    _write_profiles(profiles)
+        profiles[name].update(kwargs)
+        _write_profiles(profiles)
 
 
 def _assert_valid_profile(params):
@@ -214,9 +232,10 @@ def _assert_valid_profile(params):
     if not params:
         raise DcaeException('No update key-value pairs were provided.')
     keys = set(params.keys())
-    if not _allowed_keys.issuperset(keys):
-        invalid_keys = keys - _allowed_keys
-        raise DcaeException("Invalid keys {} detected. Only keys {} are supported.".format(_fmt_seq(invalid_keys), _fmt_seq(_allowed_keys)))
+    supported_keys = _allowed_keys | _optional_keys
+    if not supported_keys.issuperset(keys):
+        invalid_keys = keys - supported_keys
+        raise DcaeException("Invalid keys {} detected. Only keys {} are supported.".format(_fmt_seq(invalid_keys), _fmt_seq(supported_keys)))
 
 
 def _assert_not_reserved(name):
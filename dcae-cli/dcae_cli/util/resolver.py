@@ -0,0 +1,110 @@
+# ============LICENSE_START=======================================================
+# org.onap.dcae
+# ================================================================================
+# Copyright (c) 2018 AT&T Intellectual Property. All rights reserved.
+# ================================================================================
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============LICENSE_END=========================================================
+#
+# ECOMP is a trademark and service mark of AT&T Intellectual Property.
+
+# -*- coding: utf-8 -*-
+"""
+Provides a cache for resolving host names
+
+A slow resolver adds seconds to every deploy. Resolved addresses are stored per
+profile in the app dir and reused for a ttl so that separate invocations benefit
+too. A cached address that turns out to be stale is dropped with invalidate.
+"""
+import os
+import time
+import socket
+import threading
+
+from dcae_cli.util import get_app_dir, get_pref, write_pref, pref_lock
+from dcae_cli.util import profiles
+from dcae_cli.util.config import get_resolver_cache_ttl
+from dcae_cli.util.logger import get_logger
+
+
+log = get_logger('Resolver')
+
+# Guards the cache file against the threads of a single invocation
+_lock = threading.Lock()
+
+
+def get_cache_path():
+    '''Returns the absolute path to the resolver cache file'''
+    return os.path.join(get_app_dir(), 'resolver.json')
+
+
+def resolve(hostname, profile_name=None, ttl=None, cache_path=None,
+        resolve_func=socket.gethostbyname_ex, now_func=time.time):
+    '''Returns the list of IP addresses of a host name
+
+    The addresses are resolved again once they are older than `ttl` seconds. A
+    stale entry is still used when resolving fails.
+
+    Args
+    ----
+    profile_name: (string) profile the entry is stored under. Default is the
+        active profile.
+    ttl: (int) seconds an entry is used. Default comes from the config.
+    resolve_func: func(hostname) -> (hostname, aliases, ips)
+
+    Returns
+    -------
+    List of IP address strings
+    '''
+    if profile_name is None:
+        profile_name = profiles.get_active_name()
+    if ttl is None:
+        ttl = get_resolver_cache_ttl()
+
+    cache_path = get_cache_path() if cache_path is None else cache_path
+    now = now_func()
+
+    with _lock:
+        entry = get_pref(cache_path).get(profile_name, {}).get(hostname)
+
+    if entry and now - entry['resolved'] < ttl:
+        return list(entry['ips'])
+
+    try:
+        _, _, ips = resolve_func(hostname)
+    except (socket.error, UnicodeError) as e:
+        if not entry:
+            raise
+        log.warning("Could not resolve '{0}'. Using cached addresses: {1}".format(hostname, e))
+        return list(entry['ips'])
+
+    with _lock, pref_lock(cache_path):
+        # Re-read the cache to not clobber entries written in the meantime
+        cache = get_pref(cache_path)
+        cache.setdefault(profile_name, {})[hostname] = { 'ips': ips, 'resolved': now }
+        write_pref(cache, cache_path)
+
+    return list(ips)
+
+
+def invalidate(hostname, profile_name=None, cache_path=None):
+    '''Drops the cached addresses of a host name so that the next resolve refreshes them'''
+    if profile_name is None:
+        profile_name = profiles.get_active_name()
+
+    cache_path = get_cache_path() if cache_path is None else cache_path
+
+    with _lock, pref_lock(cache_path):
+        cache = get_pref(cache_path)
+        if cache.get(profile_name, {}).pop(hostname, None) is not None:
+            write_pref(cache, cache_path)
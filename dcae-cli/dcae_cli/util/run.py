@@ -22,7 +22,6 @@
 """
 Provides utilities for running components
 """
-import time
 import six
 from functools import partial
 import click
@@ -35,15 +34,38 @@ from dcae_cli.util.discovery import get_user_instances, config_context, \
     replace_dots
 import dcae_cli.util.profiles as profiles
 from dcae_cli.util.logger import get_logger
+from dcae_cli.util.config import get_health_wait_timeout
 from dcae_cli.catalog.mock.catalog import build_config_keys_map, \
     get_data_router_subscriber_route
-# This seems to be an abstraction leak
-from dcae_cli.catalog.mock.schema import apply_defaults_docker_config
 
 
 log = get_logger('Run')
 
 
+def prefetch_images(catalog, keys, max_workers=du._PULL_WORKERS):
+    """Pulls the images of docker components onto the docker host concurrently
+
+    Components that aren't docker components are left out.
+
+    Args
+    ----
+    keys: list of component (name, version) tuples
+
+    Returns
+    -------
+    List of the images that could not be pulled
+    """
+    images = [ catalog.get_docker_image(cname, cver) for cname, cver in keys
+            if catalog.get_component_type(cname, cver) == 'docker' ]
+
+    if not images:
+        return []
+
+    log.info("Prefetching images: {0}".format(len(set(images))))
+    client = du.get_docker_client(profiles.get_profile(), dis.get_docker_logins())
+    return du.pull_images(client, images, max_workers=max_workers)
+
+
 def _get_instances(user, additional_user=None):
     instance_map = get_user_instances(user)
 
@@ -102,25 +124,14 @@ def _verify_component(name, max_wait, consul_host):
 
     Args:
     -----
-    max_wait (integer): limit to how may attempts to make which translates to
-        seconds because each sleep is one second. 0 means infinite.
+    max_wait (integer): limit in seconds to how long to wait for the component
+        to become healthy. 0 means infinite.
 
     Return:
     -------
     True if component is healthy else returns False
     """
-    num_attempts = 1
-
-    while True:
-        if dis.is_healthy(consul_host, name):
-            return True
-        else:
-            num_attempts += 1
-
-            if max_wait > 0 and max_wait < num_attempts:
-                return False
-
-            time.sleep(1)
+    return dis.wait_until_healthy(consul_host, name, max_wait)
 
 
 def run_component(user, cname, cver, catalog, additional_user, attached, force,
@@ -136,25 +147,27 @@ def run_component(user, cname, cver, catalog, additional_user, attached, force,
         Used as a manual way to make available this information for the component.
     inputs_map: (dict) config_key to value that is intended to be provided at
         deployment time as an input
+
+    Returns
+    -------
+    The instance name of the deployed component or None when nothing was deployed
     '''
-    cname, cver = catalog.verify_component(cname, cver)
-    ctype = catalog.get_component_type(cname, cver)
     profile = profiles.get_profile()
 
     instance_map = _get_instances(user, additional_user)
     neighbors = six.iterkeys(instance_map)
 
+    # Everything about the component is resolved from the catalog at once
+    bundle = catalog.resolve_for_run(cname, cver, neighbors)
+    cname, cver, ctype = bundle.name, bundle.version, bundle.component_type
+    spec, params, interface_map = bundle.spec, bundle.params, bundle.interface_map
 
-    dmaap_config_keys = catalog.get_discovery_for_dmaap(cname, cver)
-
-    if not dmaap.validate_dmaap_map_entries(dmaap_map, *dmaap_config_keys):
+    if not dmaap.validate_dmaap_map_entries(dmaap_map, *bundle.dmaap_config_keys):
         return
 
     if ctype == 'docker':
-        params, interface_map = catalog.get_discovery_for_docker(cname, cver, neighbors)
         should_wait = attached
 
-        spec = catalog.get_component_spec(cname, cver)
         config_key_map = build_config_keys_map(spec)
         inputs_map = inputs.filter_entries(inputs_map, spec)
 
@@ -164,8 +177,7 @@ def run_component(user, cname, cver, catalog, additional_user, attached, force,
         with config_context(user, cname, cver, params, interface_map,
                 instance_map, config_key_map, dmaap_map=dmaap_map, inputs_map=inputs_map,
                 always_cleanup=should_wait, force_config=force) as (instance_name, _):
-            image = catalog.get_docker_image(cname, cver)
-            docker_config = catalog.get_docker_config(cname, cver)
+            image, docker_config = bundle.image, bundle.docker_config
 
             docker_logins = dis.get_docker_logins()
 
@@ -180,8 +192,7 @@ def run_component(user, cname, cver, catalog, additional_user, attached, force,
                 if result:
                     log.info("Deployed {0}. Verifying..".format(instance_name))
 
-                    # TODO: Be smarter here but for now wait longer i.e. 5min
-                    max_wait = 300 # 300s == 5min
+                    max_wait = get_health_wait_timeout()
 
                     if _verify_component(instance_name, max_wait,
                             dis.default_consul_host()):
@@ -207,17 +218,19 @@ def run_component(user, cname, cver, catalog, additional_user, attached, force,
                 else:
                     raise DcaeException("Failed to deploy docker component")
 
+        return instance_name
+
     elif ctype =='cdap':
-        (jar, config, spec) = catalog.get_cdap(cname, cver)
+        jar, config = bundle.jar, bundle.cdap_config
         config_key_map = build_config_keys_map(spec)
         inputs_map = inputs.filter_entries(inputs_map, spec)
 
-        params, interface_map = catalog.get_discovery_for_cdap(cname, cver, neighbors)
-
         with config_context(user, cname, cver, params, interface_map, instance_map,
                 config_key_map, dmaap_map=dmaap_map, inputs_map=inputs_map, always_cleanup=False,
                 force_config=force) as (instance_name, templated_conf):
             run_cdap_component(catalog, params, instance_name, profile, jar, config, spec, templated_conf)
+
+        return instance_name
     else:
         raise DcaeException("Unsupported component type for run")
 
@@ -252,10 +265,10 @@ def dev_component(user, catalog, specification, additional_user, force, dmaap_ma
     instance_map = _get_instances(user, additional_user)
     neighbors = six.iterkeys(instance_map)
 
-    params, interface_map, dmaap_config_keys = catalog.get_discovery_from_spec(
-            user, specification, neighbors)
+    bundle = catalog.resolve_spec_for_run(user, specification, neighbors)
+    params, interface_map = bundle.params, bundle.interface_map
 
-    if not dmaap.validate_dmaap_map_entries(dmaap_map, *dmaap_config_keys):
+    if not dmaap.validate_dmaap_map_entries(dmaap_map, *bundle.dmaap_config_keys):
         return
 
     cname = specification["self"]["name"]
@@ -272,10 +285,9 @@ def dev_component(user, catalog, specification, additional_user, force, dmaap_ma
 
         click.echo("Ready for component development")
 
-        if specification["self"]["component_type"] == "docker":
+        if bundle.component_type == "docker":
             # The env building is only for docker right now
-            docker_config = apply_defaults_docker_config(specification["auxilary"])
-            envs = du.build_envs(profiles.get_profile(), docker_config, instance_name)
+            envs = du.build_envs(profiles.get_profile(), bundle.docker_config, instance_name)
             envs_message = "\n".join(["export {0}={1}".format(k, v) for k,v in envs.items()])
             envs_filename = "env_{0}".format(profiles.get_active_name())
 
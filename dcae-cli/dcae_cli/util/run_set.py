@@ -0,0 +1,201 @@
+# ============LICENSE_START=======================================================
+# org.onap.dcae
+# ================================================================================
+# Copyright (c) 2018 AT&T Intellectual Property. All rights reserved.
+# ================================================================================
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============LICENSE_END=========================================================
+#
+# ECOMP is a trademark and service mark of AT&T Intellectual Property.
+
+# -*- coding: utf-8 -*-
+"""
+Provides utilities for running a set of components together
+
+Components are deployed in dependency order: a component that publishes to or
+calls another component of the set is only deployed once the other one is up.
+Components that don't depend on each other are deployed in parallel.
+"""
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dcae_cli.util import discovery as dis
+from dcae_cli.util.exc import DcaeException
+from dcae_cli.util.logger import get_logger
+from dcae_cli.util.run import run_component, prefetch_images
+from dcae_cli.util.undeploy import undeploy_instances
+
+
+log = get_logger('RunSet')
+
+
+class RunSetError(DcaeException):
+    pass
+
+
+def build_dependencies(keys, get_interface_map_func):
+    '''Builds the dependency graph of a set of components
+
+    Args
+    ----
+    keys: list of component (name, version) tuples
+    get_interface_map_func: func((name, version), neighbors) -> interface map
+        The interface map of the component when only the given neighbors are
+        running. Look at MockCatalog.resolve_for_run.
+
+    Returns
+    -------
+    Dict of component (name, version) to the set of components of the set that
+    it publishes to or calls
+    '''
+    neighbors = set(keys)
+    deps = dict()
+
+    for key in keys:
+        interface_map = get_interface_map_func(key, neighbors)
+        deps[key] = set(comp for comp in chain.from_iterable(interface_map.values())
+                if comp in neighbors and comp != key)
+
+    _raise_if_cyclic(deps)
+    return deps
+
+
+def _raise_if_cyclic(deps):
+    '''Raises RunSetError if the components can't be ordered'''
+    remaining = dict((key, set(ds)) for key, ds in deps.items())
+
+    while remaining:
+        leaves = [ key for key, ds in remaining.items() if not ds ]
+        if not leaves:
+            cycle = ", ".join(sorted(":".join(key) for key in remaining))
+            raise RunSetError("Components depend on each other in a cycle: {0}".format(cycle))
+
+        for key in leaves:
+            del remaining[key]
+        for ds in remaining.values():
+            ds.difference_update(leaves)
+
+
+def _rollout_pure(deploy_func, undeploy_func, deps, max_workers):
+    '''Deploys components leaves first with independent components in parallel
+
+    Once a deploy fails no new deploys are started. After the deploys already
+    running finish, everything that was deployed is undeployed, dependents
+    before their dependencies.
+
+    Args
+    ----
+    deploy_func: func(key) -> instance name. Raises upon failure.
+    undeploy_func: func(key, instance name)
+    deps: dict of key to set of keys that must be deployed first
+    max_workers: upper bound of concurrent deploys
+
+    Returns
+    -------
+    (deployed, failures) where deployed is a list of (key, instance name) in
+    the order of deployment and failures is a dict of key to exception. When
+    there are failures, deployed lists what has been rolled back.
+    '''
+    pending = dict((key, set(ds)) for key, ds in deps.items())
+    running = dict()
+    deployed = []
+    failures = dict()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            if not failures:
+                for key in sorted(key for key, ds in pending.items() if not ds):
+                    del pending[key]
+                    running[executor.submit(deploy_func, key)] = key
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                key = running.pop(future)
+                try:
+                    deployed.append((key, future.result()))
+                except Exception as e:
+                    failures[key] = e
+                    continue
+
+                for ds in pending.values():
+                    ds.discard(key)
+
+    if failures:
+        for key, instance in reversed(deployed):
+            try:
+                undeploy_func(key, instance)
+            except Exception as e:
+                log.error("Could not roll back {0}: {1}".format(instance, e))
+
+    return deployed, failures
+
+
+def run_component_set(user, catalog, entries, additional_user=None, force=False,
+        max_workers=4):
+    '''Runs a set of components in dependency order and rolls back upon failure
+
+    Args
+    ----
+    entries: list of (name, version, dmaap_map, inputs_map) tuples. The version
+        may be None for the latest.
+
+    Returns
+    -------
+    (deployed, failures) as returned by _rollout_pure keyed by component
+    (name, version)
+    '''
+    resolved = dict()
+    for name, version, dmaap_map, inputs_map in entries:
+        key = catalog.verify_component(name, version)
+        if key in resolved:
+            raise RunSetError("Component {0} is listed more than once".format(":".join(key)))
+        resolved[key] = (dmaap_map, inputs_map)
+
+    def get_interface_map(key, neighbors):
+        return catalog.resolve_for_run(key[0], key[1], neighbors).interface_map
+
+    deps = build_dependencies(list(resolved), get_interface_map)
+
+    # Pull the images up front so that pulls don't wait on health checks of
+    # earlier components. Failed pulls surface again when deploying.
+    failed = prefetch_images(catalog, list(resolved), max_workers=max_workers)
+    if failed:
+        log.warn("Could not prefetch images: {0}".format(", ".join(failed)))
+
+    def deploy(key):
+        cname, cver = key
+        dmaap_map, inputs_map = resolved[key]
+        log.info("Deploying {0}:{1}".format(cname, cver))
+        instance = run_component(user, cname, cver, catalog, additional_user,
+                False, force, dmaap_map, inputs_map)
+
+        if instance is None:
+            raise RunSetError("{0}:{1} was not deployed".format(cname, cver))
+
+        if catalog.get_component_type(cname, cver) == 'docker' \
+                and not dis.is_healthy(dis.default_consul_host(), instance):
+            # Remove it here because it can't be rolled back once this fails
+            undeploy_instances(cname, cver, catalog, [instance])
+            raise RunSetError("{0} never became healthy".format(instance))
+
+        return instance
+
+    def undeploy(key, instance):
+        log.warn("Rolling back {0}".format(instance))
+        undeploy_instances(key[0], key[1], catalog, [instance])
+
+    return _rollout_pure(deploy, undeploy, deps, max_workers)
@@ -0,0 +1,175 @@
+# ============LICENSE_START=======================================================
+# org.onap.dcae
+# ================================================================================
+# Copyright (c) 2018 AT&T Intellectual Property. All rights reserved.
+# ================================================================================
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============LICENSE_END=========================================================
+#
+# ECOMP is a trademark and service mark of AT&T Intellectual Property.
+
+# -*- coding: utf-8 -*-
+"""
+Provides a persistent cache for the json schemas fetched from the remote server
+
+Schema content is stored content-addressed (file name is the sha256 of the
+content) under the app dir. An index maps each schema url to its digest and the
+http validators (ETag, Last-Modified) needed to cheaply revalidate it once the
+ttl has expired.
+"""
+import io
+import os
+import time
+import hashlib
+import tempfile
+
+import requests
+
+from dcae_cli.util import get_app_dir, get_pref, write_pref, makedirs, pref_lock
+from dcae_cli.util.logger import get_logger
+
+
+log = get_logger('SchemaCache')
+
+# Seconds to wait on the remote server before falling back to a cached copy
+_FETCH_TIMEOUT = 10
+
+# Seconds a stale copy is used without contacting the server again after the
+# server could not be reached. Never longer than the ttl.
+_FAILURE_BACKOFF = 300
+
+# url -> schema text. Keeps a single cli invocation from going back to disk, let
+# alone the server, for a schema it already has.
+_memo = {}
+
+
+class SchemaCacheMissError(RuntimeError):
+    pass
+
+
+def get_cache_dir():
+    '''Returns the absolute directory path for the schema cache'''
+    return os.path.join(get_app_dir(), 'schemas')
+
+
+def _get_index_path(cache_dir):
+    return os.path.join(cache_dir, 'index.json')
+
+
+def _get_content_path(cache_dir, digest):
+    return os.path.join(cache_dir, '{0}.json'.format(digest))
+
+
+def _read_content(cache_dir, entry):
+    '''Returns the cached schema text for an index entry or None if missing'''
+    try:
+        with io.open(_get_content_path(cache_dir, entry['digest']), encoding='utf-8') as f:
+            return f.read()
+    except (IOError, OSError, KeyError):
+        return None
+
+
+def _write_content(cache_dir, text):
+    '''Stores the schema text and returns its digest'''
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    path = _get_content_path(cache_dir, digest)
+
+    if not os.path.isfile(path):
+        makedirs(cache_dir, exist_ok=True)
+        # Write then rename so that concurrent invocations never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir)
+        with io.open(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.rename(tmp_path, path)
+
+    return digest
+
+
+def _make_revalidation_headers(entry):
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def fetch_schema(server_url, path, ttl, offline=False, cache_dir=None,
+        get_func=requests.get, now_func=time.time):
+    '''Returns the schema text located at the remote server
+
+    The server is only contacted when the schema is not cached or when the cached
+    copy is older than `ttl` seconds. A stale copy is revalidated using
+    If-None-Match/If-Modified-Since and is still used when the server cannot
+    be reached. After a failed attempt the server is left alone for
+    _FAILURE_BACKOFF seconds.
+
+    Args
+    ----
+    ttl: (int) seconds a cached schema is used without revalidation
+    offline: (boolean) never contact the server when True
+    get_func: func(url, headers, timeout) -> requests.Response
+
+    Returns
+    -------
+    String of the schema json
+    '''
+    url = "{0}/{1}".format(server_url, path)
+
+    if url in _memo:
+        return _memo[url]
+
+    cache_dir = get_cache_dir() if cache_dir is None else cache_dir
+    index_path = _get_index_path(cache_dir)
+    entry = get_pref(index_path).get(url)
+    text = _read_content(cache_dir, entry) if entry else None
+    now = now_func()
+
+    if text is not None and (offline or now - entry['fetched'] < ttl
+            or now - entry.get('failed_at', float('-inf')) < min(ttl, _FAILURE_BACKOFF)):
+        _memo[url] = text
+        return text
+    elif offline:
+        raise SchemaCacheMissError("Schema '{0}' is not cached and offline mode is enabled".format(url))
+
+    headers = _make_revalidation_headers(entry) if text is not None else {}
+
+    try:
+        r = get_func(url, headers=headers, timeout=_FETCH_TIMEOUT)
+
+        if r.status_code == 304 and text is not None:
+            entry = dict(entry, fetched=now)
+        else:
+            r.raise_for_status()
+            text = r.text
+            entry = { 'digest': _write_content(cache_dir, text),
+                    'etag': r.headers.get('ETag'),
+                    'last_modified': r.headers.get('Last-Modified'),
+                    'fetched': now }
+    except requests.RequestException as e:
+        if text is None:
+            raise
+        log.warning("Could not revalidate schema '{0}'. Using cached copy: {1}".format(url, e))
+        # Back off so that other invocations don't wait on the server too
+        entry = dict(entry, failed_at=now)
+    else:
+        entry.pop('failed_at', None)
+
+    # Re-read the index to not clobber entries written by other invocations
+    with pref_lock(index_path):
+        index = get_pref(index_path)
+        index[url] = entry
+        write_pref(index, index_path)
+
+    _memo[url] = text
+    return text
@@ -18,6 +18,9 @@
 #
 # ECOMP is a trademark and service mark of AT&T Intellectual Property.
 
+import requests
+
+from dcae_cli.util import cdap_util
 from dcae_cli.util.cdap_util import _merge_spec_config_into_broker_put,  normalize_cdap_params
 
 
@@ -91,3 +94,50 @@ def test_cdap_util():
         }
 
     assert broker_put == expected
+
+
+def test_broker_url_cache_and_session(monkeypatch):
+    lookups = []
+    sent = []
+    broker_urls = ["http://10.0.0.1:7777", "http://10.0.0.2:7777"]
+
+    def fake_lookup(profile):
+        lookups.append(profile)
+        return broker_urls[len(lookups) - 1]
+
+    class FakeResponse(object):
+        status_code = 200
+        text = ""
+        def raise_for_status(self):
+            pass
+
+    class FakeSession(object):
+        def request(self, method, url, **kwargs):
+            sent.append((method, url))
+            if url.startswith(broker_urls[0]):
+                raise requests.ConnectionError("Broker moved")
+            return FakeResponse()
+
+    monkeypatch.setattr(cdap_util, "_get_broker_url_from_profile", fake_lookup)
+    monkeypatch.setattr(cdap_util, "_get_session", lambda: FakeSession())
+    monkeypatch.setattr(cdap_util, "get_broker_url_cache_ttl", lambda: 60)
+    monkeypatch.setattr(cdap_util, "_broker_urls", {})
+
+    profile = ("consul", "cdap_broker")
+    assert cdap_util._get_broker_url(profile, now_func=lambda: 0) == broker_urls[0]
+    assert cdap_util._get_broker_url(profile, now_func=lambda: 59) == broker_urls[0]
+    assert len(lookups) == 1
+
+    # Start over with an entry that is fresh for the requests below
+    cdap_util._broker_urls.clear()
+    del lookups[:]
+    assert cdap_util._get_broker_url(profile) == broker_urls[0]
+
+    # A connection error drops the cached url and the request is tried again
+    assert cdap_util.undeploy_component(profile, "some-instance")
+    assert sent == [("DELETE", broker_urls[0] + "/application/some-instance"),
+            ("DELETE", broker_urls[1] + "/application/some-instance")]
+    assert len(lookups) == 2
+
+    assert cdap_util.undeploy_component(profile, "another-instance")
+    assert len(lookups) == 2
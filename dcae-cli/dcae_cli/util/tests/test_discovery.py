@@ -23,6 +23,9 @@
 Provides tests for the discovery module
 '''
 import json
+import time
+import base64
+import threading
 from functools import partial
 from copy import deepcopy
 
@@ -303,6 +306,49 @@ def test_is_healthy_pure():
     assert False == dis._is_healthy_pure(lambda name: component_health_nothing, component)
 
 
+def _make_check(node, status, service_name="", service_id=""):
+    return { "Node": node, "CheckID": "check", "Status": status,
+            "ServiceName": service_name, "ServiceID": service_id }
+
+
+def test_get_health_index_pure():
+    checks = [ _make_check("agent-one", "passing"),
+            _make_check("agent-two", "critical"),
+            # Healthy
+            _make_check("agent-one", "passing", "good", "good:1"),
+            # Failing service check
+            _make_check("agent-one", "passing", "bad", "bad:1"),
+            _make_check("agent-one", "critical", "bad", "bad:1"),
+            # Failing node check
+            _make_check("agent-two", "passing", "lost", "lost:1"),
+            # Any one registration passing is enough
+            _make_check("agent-one", "critical", "mixed", "mixed:1"),
+            _make_check("agent-one", "passing", "mixed", "mixed:2") ]
+
+    index = dis._get_health_index_pure(lambda: ("262892", checks))
+    assert index == { "good": True, "bad": False, "lost": False, "mixed": True }
+
+    assert {} == dis._get_health_index_pure(lambda: ("262892", None))
+
+
+def test_get_instances_health_pure():
+    checks = [ _make_check("agent-one", "passing", "good", "good:1"),
+            _make_check("agent-one", "critical", "bad", "bad:1") ]
+    checked = []
+
+    def is_healthy_fake(instance):
+        checked.append(instance)
+        return instance == "unchecked"
+
+    health = dis._get_instances_health_pure(lambda: ("262892", checks),
+            is_healthy_fake, ["good", "bad", "unchecked", "unregistered"])
+
+    assert health == { "good": True, "bad": False, "unchecked": True,
+            "unregistered": False }
+    # Only instances missing from the bulk result are checked individually
+    assert sorted(checked) == ["unchecked", "unregistered"]
+
+
 def test_get_instances_from_kv():
 
     def get_from_kv_fake(result, user, recurse=True):
@@ -442,6 +488,204 @@ def test_choose_consul_host(monkeypatch):
     assert "provided-consul-host" == dis._choose_consul_host("provided-consul-host")
 
 
+def test_make_snapshot():
+    healthy = 'jane.b493b48b-5fdf-4c1d-bd2a-8ce747b918ba.1-0-0.dcae-controller-ves-collector'
+    defective = 'jane.89d82ff6-1482-4c01-8758-db9325aad085.1-0-0.dcae-controller-ves-collector'
+    other = 'jane.2455ec5c-67e6-4d4d-8581-79037c7b5f8e.2-0-0.some-other-comp'
+    health = { healthy: True, defective: False, other: True, 'not-an-instance': False }
+
+    snap = dis._make_snapshot(list(health.keys()), health)
+
+    assert snap == { ('dcae.controller.ves.collector', '1.0.0'):
+                { "healthy": [healthy], "defective": [defective] },
+            ('some.other.comp', '2.0.0'): { "healthy": [other], "defective": [] } }
+
+    # Lookups work with either dots or dashes
+    assert dis.lookup_snapshot(snap, 'dcae-controller-ves-collector', '1.0.0') \
+            == ([healthy], [defective])
+    assert dis.lookup_snapshot(snap, 'dcae.controller.ves.collector', '1.0.0') \
+            == ([healthy], [defective])
+    assert dis.lookup_snapshot(snap, 'dcae.controller.ves.collector', '9.0.0') == ([], [])
+
+
+class FakeConsul(object):
+    """Local fake of the Consul kv and transaction apis"""
+
+    def __init__(self, host=None, kv=None):
+        self.store = dict(kv or {})
+        self.txns = []
+        self.kv = FakeConsul.KV(self)
+        self.txn = FakeConsul.Txn(self)
+
+    class KV(object):
+        def __init__(self, cons):
+            self.cons = cons
+
+        def get(self, key, recurse=False):
+            store = self.cons.store
+            if recurse:
+                items = [ { "Key": k, "Value": v } for k, v in sorted(store.items())
+                        if k.startswith(key) ]
+                return "index", items or None
+            elif key in store:
+                return "index", { "Key": key, "Value": store[key] }
+            return "index", None
+
+        def put(self, key, value):
+            self.cons.store[key] = value.encode("utf-8")
+            return True
+
+    class Txn(object):
+        def __init__(self, cons):
+            self.cons = cons
+
+        def put(self, payload):
+            self.cons.txns.append(payload)
+            if len(payload) > dis._TXN_MAX_OPS:
+                return { "Results": None, "Errors": [ { "What": "too many operations" } ] }
+
+            # All-or-nothing
+            store = dict(self.cons.store)
+            for op in payload:
+                verb, key = op["KV"]["Verb"], op["KV"]["Key"]
+                if verb == "set":
+                    store[key] = base64.b64decode(op["KV"]["Value"])
+                elif verb == "delete":
+                    store.pop(key, None)
+                elif verb == "delete-tree":
+                    store = { k: v for k, v in store.items() if not k.startswith(key) }
+                else:
+                    return { "Results": None, "Errors": [ { "What": "unknown verb" } ] }
+            self.cons.store = store
+            return { "Results": [], "Errors": None }
+
+
+def test_kv_txn_pure():
+    cons = FakeConsul()
+    ops = [ dis._kv_op("set", "key{0}".format(i), "value") for i in range(130) ]
+
+    assert dis._kv_txn_pure(cons.txn.put, ops)
+    assert [ len(txn) for txn in cons.txns ] == [64, 64, 2]
+    assert len(cons.store) == 130
+
+    # Stops at the first failed transaction and leaves it unapplied
+    cons = FakeConsul()
+    ops = [ dis._kv_op("set", "key", "value"), { "KV": { "Verb": "bogus", "Key": "key" } } ]
+    assert not dis._kv_txn_pure(cons.txn.put, ops + ops, max_ops=2)
+    assert len(cons.txns) == 1
+    assert cons.store == {}
+
+
+def test_push_remove_config(monkeypatch):
+    cons = FakeConsul(kv={ "other": b"keep" })
+    monkeypatch.setattr(dis, "Consul", lambda host: cons)
+
+    dis.push_config("bob.abc", { "a": 1 }, "bob.abc:rel", ["x"], "bob.abc:dmaap", {},
+            host="bogus")
+
+    # One round trip for all keys
+    assert len(cons.txns) == 1
+    assert json.loads(cons.kv.get("bob.abc")[1]["Value"].decode("utf-8")) == { "a": 1 }
+    assert json.loads(cons.kv.get("bob.abc:rel")[1]["Value"].decode("utf-8")) == ["x"]
+    assert json.loads(cons.kv.get("bob.abc:dmaap")[1]["Value"].decode("utf-8")) == {}
+
+    assert dis.remove_config("bob.abc", host="bogus")
+    assert cons.store == { "other": b"keep" }
+
+
+def test_sync_policies(monkeypatch):
+    folder = "bob.abc:policies/items/"
+    event = "bob.abc:policies/event"
+    policies = [ { "policyName": "DCAE.Config_{0:03d}.1.xml".format(i), "config": i }
+            for i in range(500) ]
+
+    cons = FakeConsul(kv={ folder + "DCAE.Config_old": b'{"policyName": "DCAE.Config_old.1.xml"}' })
+    monkeypatch.setattr(dis, "Consul", lambda host: cons)
+    monkeypatch.setenv("SERVICE_NAME", "bob.abc")
+
+    # Replace all
+    synced = dis.sync_policies({ "policies": policies }, "bogus")
+    assert synced == policies
+    assert len(cons.store) == 501
+    assert json.loads(cons.store[event].decode("utf-8"))["policies_count"] == 500
+    # 500 sets, 1 delete and the event in transactions of at most 64
+    assert sum(len(txn) for txn in cons.txns) == 502
+    assert cons.txns[-1][-1]["KV"]["Key"] == event
+
+    # Only the differences and the event are written
+    cons.txns = []
+    updated = dict(policies[0], config="new")
+    synced = dis.sync_policies({ "updated_policies": [updated, policies[1]],
+        "removed_policies": [policies[2]] }, "bogus")
+
+    assert len(synced) == 499
+    assert synced[0] == updated
+    assert [ op["KV"]["Verb"] for op in cons.txns[0] ] == ["delete", "set", "set"]
+    assert json.loads(cons.store[event].decode("utf-8"))["policies_count"] == 499
+
+    # Nothing is written for bad policy names
+    cons.txns = []
+    assert dis.sync_policies({ "updated_policies": [{ "policyName": "bad" }] }, "bogus") is None
+    assert cons.txns == []
+
+    # The reconfig command carries all policies without another read
+    command = dis.build_policy_command("/reconfig.sh", { "updated_policies": [updated] },
+            "bogus", synced)
+    assert command[:2] == ["/reconfig.sh", "policies"]
+    assert json.loads(command[2]) == { "updated_policies": [updated],
+            "removed_policies": [], "policies": synced }
+    assert dis.build_policy_command("/reconfig.sh", {}, "bogus") \
+            == dis.build_policy_command("/reconfig.sh", {}, "bogus", synced)
+
+
+class FakeBlockingHealth(object):
+    """Local fake of Consul's health.service with blocking queries"""
+
+    def __init__(self):
+        self.index = 1
+        self.passing = False
+        self.changed = threading.Condition()
+        self.calls = []
+
+    def set_passing(self):
+        with self.changed:
+            self.index += 1
+            self.passing = True
+            self.changed.notify_all()
+
+    def service(self, instance, index=None, wait=None):
+        self.calls.append((index, wait))
+        with self.changed:
+            if index is not None and int(index) == self.index:
+                # Block until a change or the wait runs out
+                self.changed.wait(float(wait.rstrip("s")))
+            checks = [ { "Status": "passing" if self.passing else "critical" } ]
+            return str(self.index), [ { "Checks": checks } ]
+
+
+def test_wait_until_healthy_pure():
+    health = FakeBlockingHealth()
+    threading.Timer(0.2, health.set_passing).start()
+
+    start = time.time()
+    assert dis._wait_until_healthy_pure(health.service, "bob.abc", 0)
+    # Detected when the server notifies and not on some poll interval
+    assert time.time() - start < 5
+    assert health.calls == [ (None, "60s"), ("1", "60s") ]
+
+    # Overall deadline
+    health = FakeBlockingHealth()
+    clock = [0]
+
+    def get_health_fake(instance, index=None, wait=None):
+        clock[0] += int(wait.rstrip("s"))
+        return health.service(instance, index=None, wait=wait)
+
+    assert not dis._wait_until_healthy_pure(get_health_fake, "bob.abc", 90,
+            now_func=lambda: clock[0])
+    assert clock[0] == 90
+
+
 if __name__ == '__main__':
     '''Test area'''
     pytest.main([__file__, ])
@@ -23,6 +23,7 @@
 Provides tests for the docker_util module
 '''
 import pytest
+from functools import partial
 from dcae_cli.util.profiles import Profile, CONSUL_HOST, CONFIG_BINDING_SERVICE, CDAP_BROKER, DOCKER_HOST
 from dcae_cli.util import docker_util as du
 
@@ -60,3 +61,104 @@ def test_convert_profile_to_docker_envs():
     actual = du._convert_profile_to_docker_envs(profile)
 
     assert actual == expected
+
+
+def test_get_docker_client(monkeypatch):
+    du.clear_docker_caches()
+    created = []
+
+    class FakeClient(object):
+        def ping(self):
+            return True
+
+    def fake_create_client(hostname, port, logins=[]):
+        created.append((hostname, port))
+        return FakeClient()
+
+    monkeypatch.setattr(du.doc, "create_client", fake_create_client)
+    profile = Profile(**{ CONSUL_HOST: "consul", CONFIG_BINDING_SERVICE: "config_binding_service",
+        CDAP_BROKER: "cdap_broker", DOCKER_HOST: "some-docker-host:2376" })
+    login = {"registry": "some-registry", "username": "bob", "password": "abc"}
+
+    client = du.get_docker_client(profile)
+    assert du.get_docker_client(profile) is client
+    assert created == [("some-docker-host", "2376")]
+
+    assert du.get_docker_client(profile, [login]) is not client
+    assert du.get_docker_client(profile, [dict(login)]) is du.get_docker_client(profile, [login])
+    assert len(created) == 2
+
+    du.clear_docker_caches()
+
+
+def test_image_exists(monkeypatch):
+    du.clear_docker_caches()
+    images = [{ "Id": "sha256:abc", "RepoTags": ["foo/bar:1.0.0"], "RepoDigests": None }]
+    calls = []
+
+    class FakeClient(object):
+        def images(self, name=None):
+            calls.append(name)
+            if name is None:
+                return list(images)
+            # The daemon resolves more forms of names than the index has
+            name = name.replace("docker.io/", "")
+            return [ i for i in images if name in i["RepoTags"] or i["Id"].startswith(name) ]
+
+    monkeypatch.setattr(du, "_get_local_client", lambda: FakeClient())
+
+    assert du.image_exists("foo/bar:1.0.0")
+    assert du.image_exists("foo/bar")
+    assert du.image_exists("sha256:abc")
+    assert calls == [None]
+
+    # Misses are left to the daemon instead of listing all images again
+    assert du.image_exists("docker.io/foo/bar:1.0.0")
+    assert du.image_exists("sha256:ab")
+    assert not du.image_exists("foo/baz:1.0.0")
+    images.append({ "Id": "sha256:def", "RepoTags": ["foo/baz:1.0.0"] })
+    assert du.image_exists("foo/baz:1.0.0")
+    assert calls == [None, "docker.io/foo/bar:1.0.0", "sha256:ab", "foo/baz:1.0.0",
+            "foo/baz:1.0.0"]
+
+    # Names the daemon matched are remembered
+    assert du.image_exists("foo/baz:1.0.0")
+    assert len(calls) == 5
+
+    du.clear_docker_caches()
+
+
+def test_pull_images():
+    events = {
+        "foo/bar:1.0.0": [{ "status": "Pulling from foo/bar", "id": "1.0.0" },
+            { "status": "Pulling fs layer", "id": "base" },
+            { "status": "Pulling fs layer", "id": "bar" },
+            { "status": "Downloading", "id": "bar", "progress": "[==>  ]" },
+            { "status": "Pull complete", "id": "base" },
+            { "status": "Pull complete", "id": "bar" }],
+        "foo/baz:1.0.0": [{ "status": "Already exists", "id": "base" },
+            { "status": "Pull complete", "id": "baz" }],
+        "foo/bad:1.0.0": [{ "error": "manifest unknown" }]
+        }
+
+    class FakeClient(object):
+        def inspect_image(self, image):
+            if image == "foo/present:1.0.0":
+                return {}
+            raise du.docker.errors.ImageNotFound("Missing")
+
+        def pull(self, image, stream=False, decode=False):
+            return iter(events[image])
+
+    summaries = du._pull_images_pure(partial(du._pull_image, FakeClient()),
+            list(events) + ["foo/present:1.0.0", "foo/bar:1.0.0"], 2)
+
+    assert sorted(summaries) == ["foo/bad:1.0.0", "foo/bar:1.0.0", "foo/baz:1.0.0",
+            "foo/present:1.0.0"]
+    assert summaries["foo/bar:1.0.0"]["pulled"] == set(["base", "bar"])
+    assert summaries["foo/baz:1.0.0"]["existing"] == set(["base"])
+    assert summaries["foo/present:1.0.0"]["present"]
+    assert summaries["foo/bad:1.0.0"]["error"] == "manifest unknown"
+
+    assert du._report_pulls(summaries) == ["foo/bad:1.0.0"]
+    assert du._pull_images_pure(None, [], 2) == {}
@@ -0,0 +1,67 @@
+# ============LICENSE_START=======================================================
+# org.onap.dcae
+# ================================================================================
+# Copyright (c) 2018 AT&T Intellectual Property. All rights reserved.
+# ================================================================================
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============LICENSE_END=========================================================
+#
+# ECOMP is a trademark and service mark of AT&T Intellectual Property.
+
+# -*- coding: utf-8 -*-
+'''
+Provides tests for the resolver module
+'''
+import socket
+
+import pytest
+
+from dcae_cli.util import resolver
+
+
+def test_resolve(tmpdir):
+    cache_path = str(tmpdir.join("resolver.json"))
+    calls = []
+    answers = { "docker-host": ["10.0.0.1"] }
+
+    def fake_resolve(hostname):
+        calls.append(hostname)
+        if hostname not in answers:
+            raise socket.gaierror("Name or service not known")
+        return hostname, [], list(answers[hostname])
+
+    def resolve(hostname, now, profile_name="default"):
+        return resolver.resolve(hostname, profile_name=profile_name, ttl=60,
+                cache_path=cache_path, resolve_func=fake_resolve,
+                now_func=lambda: now)
+
+    assert resolve("docker-host", 0) == ["10.0.0.1"]
+    assert resolve("docker-host", 59) == ["10.0.0.1"]
+    assert len(calls) == 1
+
+    # Entries are kept per profile
+    assert resolve("docker-host", 59, profile_name="other") == ["10.0.0.1"]
+    assert len(calls) == 2
+
+    # Expired entries are resolved again
+    answers["docker-host"] = ["10.0.0.2"]
+    assert resolve("docker-host", 60) == ["10.0.0.2"]
+    assert len(calls) == 3
+
+    # Stale entries are used when resolving fails
+    del answers["docker-host"]
+    assert resolve("docker-host", 200) == ["10.0.0.2"]
+
+    resolver.invalidate("docker-host", profile_name="default", cache_path=cache_path)
+    with pytest.raises(socket.gaierror):
+        resolve("docker-host", 200)
@@ -0,0 +1,104 @@
+# ============LICENSE_START=======================================================
+# org.onap.dcae
+# ================================================================================
+# Copyright (c) 2018 AT&T Intellectual Property. All rights reserved.
+# ================================================================================
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============LICENSE_END=========================================================
+#
+# ECOMP is a trademark and service mark of AT&T Intellectual Property.
+
+# -*- coding: utf-8 -*-
+'''
+Provides tests for the run_set module
+'''
+import time
+import threading
+
+import pytest
+
+from dcae_cli.util import run_set
+from dcae_cli.util.run_set import RunSetError
+
+
+a, b, c, d = ("a", "1.0.0"), ("b", "1.0.0"), ("c", "1.0.0"), ("d", "1.0.0")
+
+
+def test_build_dependencies():
+    # a publishes to b and calls c which publishes to d. d is not in the set.
+    interface_maps = { a: { "pub": [b], "call": [c, d] }, b: {}, c: { "pub": [d] } }
+
+    def get_interface_map(key, neighbors):
+        assert neighbors == set([a, b, c])
+        return interface_maps[key]
+
+    deps = run_set.build_dependencies([a, b, c], get_interface_map)
+    assert deps == { a: set([b, c]), b: set(), c: set() }
+
+    # Cycles can't be ordered
+    interface_maps[b] = { "call": [a] }
+    with pytest.raises(RunSetError):
+        run_set.build_dependencies([a, b, c], get_interface_map)
+
+
+def test_rollout_pure():
+    deps = { a: set([b, c]), b: set([d]), c: set(), d: set() }
+    started = []
+    lock = threading.Lock()
+    # c and d are independent so must be running at the same time
+    running = { c: threading.Event(), d: threading.Event() }
+
+    def deploy(key):
+        with lock:
+            started.append(key)
+        if key in running:
+            running[key].set()
+            other = d if key == c else c
+            assert running[other].wait(5)
+        return "inst-" + key[0]
+
+    undeployed = []
+    deployed, failures = run_set._rollout_pure(deploy,
+            lambda key, inst: undeployed.append(inst), deps, 4)
+
+    assert failures == {}
+    assert undeployed == []
+    assert sorted(started[:2]) == [c, d]
+    assert started[2:] == [b, a]
+
+    # Every component is deployed after its dependencies
+    order = [ key for key, _ in deployed ]
+    assert sorted(order) == [a, b, c, d]
+    assert all(order.index(dep) < order.index(key) for key in deps for dep in deps[key])
+
+
+def test_rollout_pure_rollback():
+    deps = { a: set([b]), b: set([d]), c: set(), d: set() }
+    error = RuntimeError("boom")
+
+    def deploy(key):
+        if key == b:
+            raise error
+        if key == d:
+            # Let c finish first
+            time.sleep(0.1)
+        return "inst-" + key[0]
+
+    undeployed = []
+    deployed, failures = run_set._rollout_pure(deploy,
+            lambda key, inst: undeployed.append(inst), deps, 4)
+
+    assert failures == { b: error }
+    # a is never started and everything deployed is undeployed in reverse
+    assert deployed == [ (c, "inst-c"), (d, "inst-d") ]
+    assert undeployed == ["inst-d", "inst-c"]
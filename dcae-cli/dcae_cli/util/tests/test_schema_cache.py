@@ -0,0 +1,167 @@
+# ============LICENSE_START=======================================================
+# org.onap.dcae
+# ================================================================================
+# Copyright (c) 2018 AT&T Intellectual Property. All rights reserved.
+# ================================================================================
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============LICENSE_END=========================================================
+#
+# ECOMP is a trademark and service mark of AT&T Intellectual Property.
+
+# -*- coding: utf-8 -*-
+'''
+Provides tests for the schema_cache module
+'''
+import json
+from functools import partial
+
+import pytest
+import requests
+
+from dcae_cli.util import schema_cache as sc
+
+
+server_url = "http://some-nexus-in-the-sky.com"
+path = "/some/schema.json"
+schema_text = json.dumps({"type": "object"})
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, text="", headers={}):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError("Simulated {0}".format(self.status_code))
+
+
+@pytest.fixture
+def fresh_memo(monkeypatch):
+    monkeypatch.setattr(sc, "_memo", {})
+
+
+def test_fetch_schema(fresh_memo, tmpdir):
+    cache_dir = str(tmpdir.join("schemas"))
+    calls = []
+
+    def fake_get(response, url, headers=None, timeout=None):
+        calls.append(headers)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    ok = FakeResponse(200, schema_text, {"ETag": "abc"})
+    fetch = partial(sc.fetch_schema, server_url, path, 60, cache_dir=cache_dir)
+
+    # Cold cache goes to the server and stores content-addressed
+    assert fetch(get_func=partial(fake_get, ok), now_func=lambda: 0) == schema_text
+    assert len(calls) == 1
+    assert len(tmpdir.join("schemas").listdir()) == 2
+
+    # Same process never goes back to the server
+    assert fetch(get_func=partial(fake_get, ok), now_func=lambda: 0) == schema_text
+    assert len(calls) == 1
+
+    # New process within the ttl uses the disk copy
+    sc._memo.clear()
+    assert fetch(get_func=partial(fake_get, ok), now_func=lambda: 30) == schema_text
+    assert len(calls) == 1
+
+    # Expired entry gets revalidated
+    sc._memo.clear()
+    not_modified = FakeResponse(304)
+    assert fetch(get_func=partial(fake_get, not_modified), now_func=lambda: 100) == schema_text
+    assert calls[-1] == {"If-None-Match": "abc"}
+
+    # ..which restarts the ttl
+    sc._memo.clear()
+    assert fetch(get_func=partial(fake_get, ok), now_func=lambda: 130) == schema_text
+    assert len(calls) == 2
+
+    # Unreachable server falls back to the stale copy
+    sc._memo.clear()
+    down = requests.ConnectionError("Simulated error")
+    assert fetch(get_func=partial(fake_get, down), now_func=lambda: 1000) == schema_text
+
+    # Changed schema replaces the cached copy
+    sc._memo.clear()
+    new_text = json.dumps({"type": "string"})
+    changed = FakeResponse(200, new_text)
+    assert fetch(get_func=partial(fake_get, changed), now_func=lambda: 2000) == new_text
+
+
+def test_fetch_schema_backoff(fresh_memo, tmpdir):
+    cache_dir = str(tmpdir.join("schemas"))
+    calls = []
+
+    def down_get(url, headers=None, timeout=None):
+        calls.append(url)
+        raise requests.ConnectionError("Simulated error")
+
+    ok = FakeResponse(200, schema_text)
+    fetch = partial(sc.fetch_schema, server_url, path, 60, cache_dir=cache_dir)
+    fetch(get_func=lambda url, headers=None, timeout=None: ok, now_func=lambda: 0)
+
+    # The first invocation past the ttl tries the server
+    sc._memo.clear()
+    assert fetch(get_func=down_get, now_func=lambda: 100) == schema_text
+    assert len(calls) == 1
+
+    # Others serve the stale copy without waiting on the server again
+    sc._memo.clear()
+    assert fetch(get_func=down_get, now_func=lambda: 100 + 59) == schema_text
+    assert len(calls) == 1
+
+    # ..until the back-off, capped by the ttl, is over
+    sc._memo.clear()
+    assert fetch(get_func=down_get, now_func=lambda: 100 + 60) == schema_text
+    assert len(calls) == 2
+
+    # A successful revalidation clears the back-off
+    sc._memo.clear()
+    fetch(get_func=lambda url, headers=None, timeout=None: ok, now_func=lambda: 1000)
+    sc._memo.clear()
+    assert fetch(get_func=down_get, now_func=lambda: 1100) == schema_text
+    assert len(calls) == 3
+
+
+def test_fetch_schema_offline(fresh_memo, tmpdir):
+    cache_dir = str(tmpdir.join("schemas"))
+
+    def fail_get(url, headers=None, timeout=None):
+        raise AssertionError("Should not have contacted the server")
+
+    with pytest.raises(sc.SchemaCacheMissError):
+        sc.fetch_schema(server_url, path, 60, offline=True, cache_dir=cache_dir,
+                get_func=fail_get)
+
+    ok = FakeResponse(200, schema_text)
+    sc.fetch_schema(server_url, path, 60, cache_dir=cache_dir,
+            get_func=lambda url, headers=None, timeout=None: ok, now_func=lambda: 0)
+
+    # Offline ignores the ttl
+    sc._memo.clear()
+    assert sc.fetch_schema(server_url, path, 60, offline=True, cache_dir=cache_dir,
+            get_func=fail_get, now_func=lambda: 1000) == schema_text
+
+
+def test_fetch_schema_error(fresh_memo, tmpdir):
+    cache_dir = str(tmpdir.join("schemas"))
+    not_found = FakeResponse(404)
+
+    with pytest.raises(requests.HTTPError):
+        sc.fetch_schema(server_url, path, 60, cache_dir=cache_dir,
+                get_func=lambda url, headers=None, timeout=None: not_found)
@@ -22,7 +22,12 @@
 '''
 Provides tests for the undeploy module
 '''
-from dcae_cli.util.undeploy import _handler, _handler_report
+import threading
+import time
+
+from dcae_cli.util.undeploy import _handler, _handler_report, select_instances, \
+        _group_by_type, _resolve_names
+from dcae_cli.catalog.exc import MissingEntry
 
 def test_handler():
     instances = set(["some-instance-name", "another-instance-name"])
@@ -60,3 +65,141 @@ def test_handler():
 
     assert len(results) == 0
     assert len(failures) == 0
+
+
+def test_handler_concurrent():
+    instances = ["instance-{0}".format(i) for i in range(4)]
+    started = threading.Event()
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def undeploy_overlapping(instance):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+            if running[0] == len(instances):
+                started.set()
+        # Only succeeds if all instances are being undeployed at the same time
+        result = started.wait(5)
+        with lock:
+            running[0] -= 1
+        return result
+
+    failures, results = _handler([undeploy_overlapping], instances, max_workers=4)
+
+    assert len(failures) == 0
+    assert running[1] == len(instances)
+    assert [r[0] for r in results] == instances
+
+
+def test_handler_retries_and_timeout():
+    attempts = []
+
+    def undeploy_flaky(instance):
+        attempts.append(instance)
+        if len(attempts) == 1:
+            raise RuntimeError("Transient failure")
+        return True
+
+    failures, results = _handler([undeploy_flaky], ["some-instance-name"], retries=1)
+    assert failures == []
+    assert len(attempts) == 2
+
+    del attempts[:]
+    failures, results = _handler([undeploy_flaky], ["some-instance-name"], retries=0)
+    assert results == [("some-instance-name", False)]
+
+    calls = []
+    finished = threading.Event()
+
+    def undeploy_slow(instance):
+        calls.append("remove component")
+        time.sleep(0.5)
+        finished.set()
+        return True
+
+    def remove_config(instance):
+        calls.append("remove config")
+        return True
+
+    timings = {}
+    failures, results = _handler([undeploy_slow, remove_config],
+            ["some-instance-name"], timeout=0.05, retries=1, timings=timings)
+    # The step that timed out is not tried again and the rest are skipped
+    assert results == [("some-instance-name", False, False)]
+    assert list(timings.keys()) == ["some-instance-name"]
+    assert len(timings["some-instance-name"]) == 2
+    assert timings["some-instance-name"][0] < 0.5
+
+    # Not even once the step that timed out returns
+    assert finished.wait(5)
+    time.sleep(0.1)
+    assert calls == ["remove component"]
+
+    _handler_report(failures, results, timings, ["remove component", "remove config"])
+
+
+def test_select_instances():
+    snap = {
+        ("asimov.viz.line_plot", "1.0.0"): { "healthy": ["a"], "defective": ["b"] },
+        ("asimov.anomaly_classifier", "1.0.0"): { "healthy": ["c"], "defective": [] },
+        ("std.vnf.kpi_collector", "1.0.0"): { "healthy": [], "defective": ["d"] }
+        }
+
+    assert select_instances(snap) == {
+        ("asimov.viz.line_plot", "1.0.0"): ["a", "b"],
+        ("asimov.anomaly_classifier", "1.0.0"): ["c"],
+        ("std.vnf.kpi_collector", "1.0.0"): ["d"]
+        }
+    assert select_instances(snap, match="asimov.*") == {
+        ("asimov.viz.line_plot", "1.0.0"): ["a", "b"],
+        ("asimov.anomaly_classifier", "1.0.0"): ["c"]
+        }
+    assert select_instances(snap, match="asimov.*", defective_only=True) == {
+        ("asimov.viz.line_plot", "1.0.0"): ["b"]
+        }
+    assert select_instances(snap, match="std.vnf.kpi_collector:2.*") == {}
+
+
+def test_group_by_type():
+    selected = { ("docker.comp", "1.0.0"): ["a"], ("cdap.comp", "1.0.0"): ["b"],
+            ("other.comp", "1.0.0"): ["c"], ("missing.comp", "1.0.0"): ["d"] }
+
+    def get_type(cname, cver):
+        if cname == "missing.comp":
+            raise MissingEntry("Missing")
+        return cname.split(".")[0]
+
+    assert _group_by_type(get_type, selected) == {
+            "docker": { ("docker.comp", "1.0.0"): ["a"] },
+            "cdap": { ("cdap.comp", "1.0.0"): ["b"] },
+            "other": { ("other.comp", "1.0.0"): ["c"] }
+            }
+
+
+def test_resolve_names():
+    # Snapshot names have dashes turned into dots
+    snap = {
+        ("asimov.line.plot", "1.0.0"): { "healthy": ["a"], "defective": [] },
+        ("asimov.classifier", "1.0.0"): { "healthy": ["b"], "defective": [] },
+        ("not.in.catalog", "1.0.0"): { "healthy": ["c"], "defective": [] }
+        }
+    catalog_keys = [("asimov.line-plot", "1.0.0"), ("asimov.classifier", "1.0.0"),
+            ("asimov.classifier", "2.0.0")]
+
+    resolved = _resolve_names(catalog_keys, snap)
+    assert sorted(resolved.keys()) == [("asimov.classifier", "1.0.0"),
+            ("asimov.line-plot", "1.0.0"), ("not.in.catalog", "1.0.0")]
+
+    # Globs match the catalog name and the type lookup uses it
+    assert select_instances(resolved, match="*-plot") == {
+            ("asimov.line-plot", "1.0.0"): ["a"] }
+
+    def get_type(cname, cver):
+        if (cname, cver) not in catalog_keys:
+            raise MissingEntry("Missing")
+        return "docker"
+
+    assert _group_by_type(get_type, select_instances(resolved)) == {
+            "docker": { ("asimov.line-plot", "1.0.0"): ["a"],
+                ("asimov.classifier", "1.0.0"): ["b"] } }
@@ -0,0 +1,95 @@
+# ============LICENSE_START=======================================================
+# org.onap.dcae
+# ================================================================================
+# Copyright (c) 2018 AT&T Intellectual Property. All rights reserved.
+# ================================================================================
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============LICENSE_END=========================================================
+#
+# ECOMP is a trademark and service mark of AT&T Intellectual Property.
+
+# -*- coding: utf-8 -*-
+'''
+Provides tests for the util module
+'''
+import json
+import multiprocessing
+
+from dcae_cli import util
+from dcae_cli.util import get_pref, write_pref, update_pref
+
+
+def test_get_pref_cache(monkeypatch, tmpdir):
+    path = str(tmpdir.join("pref.json"))
+    write_pref({"a": 1}, path)
+
+    loads = []
+    real_load = json.load
+
+    def counting_load(file):
+        loads.append(file.name)
+        return real_load(file)
+
+    monkeypatch.setattr(util.json, "load", counting_load)
+
+    assert get_pref(path) == {"a": 1}
+    # Modifying the returned dict doesn't touch the cache
+    get_pref(path)["a"] = 2
+    assert get_pref(path) == {"a": 1}
+    assert len(loads) == 1
+
+    # Writes made here and elsewhere are picked up
+    write_pref({"a": 3}, path)
+    assert get_pref(path) == {"a": 3}
+
+    tmpdir.join("pref.json").write(json.dumps({"a": 40}))
+    assert get_pref(path) == {"a": 40}
+
+    assert update_pref(path, b=5) == {"a": 40, "b": 5}
+    assert get_pref(path) == {"a": 40, "b": 5}
+    assert len(loads) == 5
+
+    # Missing files are initialized
+    other_path = str(tmpdir.join("other.json"))
+    assert get_pref(other_path, lambda: {"c": 6}) == {"c": 6}
+    assert get_pref(other_path) == {"c": 6}
+
+
+def _write_many(path, writer, count):
+    for i in range(count):
+        update_pref(path, **{"{0}-{1}".format(writer, i): i})
+        # Readers never see a partially written file
+        get_pref(path)
+
+
+def test_update_pref_parallel_writers(tmpdir):
+    path = str(tmpdir.join("pref.json"))
+    write_pref({}, path)
+    writers, count = 8, 25
+
+    procs = [ multiprocessing.Process(target=_write_many, args=(path, w, count))
+            for w in range(writers) ]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(60)
+
+    assert [ proc.exitcode for proc in procs ] == [0] * writers
+
+    # No update is lost
+    with open(path) as f:
+        pref = json.load(f)
+    assert len(pref) == writers * count
+
+    # Temporary files are cleaned up
+    assert [ p.basename for p in tmpdir.listdir() ] == ["pref.json"]
@@ -0,0 +1,87 @@
+# ============LICENSE_START=======================================================
+# org.onap.dcae
+# ================================================================================
+# Copyright (c) 2018 AT&T Intellectual Property. All rights reserved.
+# ================================================================================
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============LICENSE_END=========================================================
+#
+# ECOMP is a trademark and service mark of AT&T Intellectual Property.
+
+# -*- coding: utf-8 -*-
+'''
+Provides tests for the validators module
+'''
+import pytest
+from jsonschema import ValidationError, SchemaError
+
+from dcae_cli.util import validators
+
+
+fake_schema = {
+        "$schema": "http://json-schema.org/draft-04/schema#",
+        "type": "object",
+        "properties": {
+            "foo": { "type": "string" }
+            },
+        "required": ["foo"]
+        }
+
+
+def test_get_validator(monkeypatch):
+    monkeypatch.setattr(validators, "_registry", {})
+
+    v = validators.get_validator("/some/path", fake_schema)
+    assert validators.get_validator("/some/path", dict(fake_schema)) is v
+
+    # Changed schema under the same path gets rebuilt
+    changed = dict(fake_schema, additionalProperties=False)
+    assert validators.get_validator("/some/path", changed) is not v
+    assert len(validators._registry) == 2
+
+    with pytest.raises(SchemaError):
+        validators.get_validator("/bad/path", { "type": 123 })
+
+
+def test_validate():
+    validators.validate({ "foo": "bar" }, "/some/path", fake_schema)
+
+    with pytest.raises(ValidationError):
+        validators.validate({ "foo": 123 }, "/some/path", fake_schema)
+
+    with pytest.raises(ValidationError):
+        validators.validate({}, "/some/path", fake_schema)
+
+
+def test_hash_schema(monkeypatch):
+    monkeypatch.setattr(validators, "_hashes", {})
+    dumps = []
+    real_dumps = validators.json.dumps
+
+    def fake_dumps(*args, **kwargs):
+        dumps.append(1)
+        return real_dumps(*args, **kwargs)
+
+    monkeypatch.setattr(validators.json, "dumps", fake_dumps)
+
+    # Hashed once per schema object
+    hash_ = validators._hash_schema(fake_schema)
+    assert validators._hash_schema(fake_schema) == hash_
+    assert len(dumps) == 1
+
+    assert validators._hash_schema(dict(fake_schema)) == hash_
+    assert len(dumps) == 2
+
+    for i in range(validators._MAX_HASHES + 1):
+        validators._hash_schema({ "title": str(i) })
+    assert len(validators._hashes) <= validators._MAX_HASHES
@@ -22,24 +22,120 @@
 """
 Provides utilities for undeploying components
 """
+import time
+import threading
+from fnmatch import fnmatch
 from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from six.moves import queue
+
 from dcae_cli.util.exc import DcaeException
 import dcae_cli.util.profiles as profiles
 from dcae_cli.util.cdap_util import undeploy_component as undeploy_cdap_component
-from dcae_cli.util.discovery import get_healthy_instances, get_defective_instances, \
-        remove_config
+from dcae_cli.util.discovery import snapshot, lookup_snapshot, remove_config, replace_dots
 from dcae_cli.util import docker_util as du
 from dcae_cli.util.logger import get_logger
+from dcae_cli.util.config import get_undeploy_settings
+from dcae_cli.catalog.exc import MissingEntry
 
 
 log = get_logger('Undeploy')
 
 
-def _handler(undeploy_funcs, instances):
+# Defaults for undeploying. Can be overridden by config. See get_undeploy_settings.
+_WORKERS = 8
+_STEP_TIMEOUT = 120
+_RETRIES = 1
+
+# Names of the undeploy_instances steps for reporting
+_STEP_NAMES = ["remove component", "remove config"]
+
+
+def _run_steps(undeploy_funcs, instance, retries, events, cancelled, lock):
+    """Runs the undeploy functions of an instance in order, retrying failures
+
+    A function that raises or returns False is tried again up to retries more
+    times, always after the previous attempt has returned. Progress is put on
+    the events queue. Nothing more is started once cancelled is set.
+    """
+    for i, undeploy_func in enumerate(undeploy_funcs):
+        start = time.time()
+        result = False
+
+        for attempt in range(retries + 1):
+            with lock:
+                if cancelled.is_set():
+                    return
+                events.put(("attempt", i))
+
+            try:
+                result = undeploy_func(instance)
+            except Exception as e:
+                log.error("Undeploy step failed for {0}: {1}".format(instance, e))
+                result = False
+
+            if result:
+                break
+
+        events.put(("done", i, result, time.time() - start))
+
+
+def _undeploy_instance(undeploy_funcs, instance, timeout, retries):
+    """Undeploys an instance on its own worker thread
+
+    Each call of an undeploy function gets timeout seconds. A call that times
+    out can't be cancelled so it is left to finish on the worker thread, which
+    is a daemon thread so that it doesn't hold up exiting. The call is not tried
+    again and the remaining functions are not run and reported as failed so
+    that nothing runs twice at once or out of order.
+
+    Returns
+    -------
+    List of (result, seconds) per undeploy function
+    """
+    events = queue.Queue()
+    cancelled = threading.Event()
+    lock = threading.Lock()
+
+    worker = threading.Thread(target=_run_steps, name="undeploy-{0}".format(instance),
+            args=(undeploy_funcs, instance, retries, events, cancelled, lock))
+    worker.daemon = True
+    worker.start()
+
+    steps = []
+    step_start = time.time()
+
+    while len(steps) < len(undeploy_funcs):
+        try:
+            event = events.get(timeout=timeout)
+        except queue.Empty:
+            with lock:
+                if not events.empty():
+                    continue
+                cancelled.set()
+
+            log.error("Undeploy step timed out after {0}s for {1}. Skipping its remaining steps." \
+                    .format(timeout, instance))
+            steps.append((False, time.time() - step_start))
+            steps.extend((False, 0.0) for _ in range(len(undeploy_funcs) - len(steps)))
+            break
+
+        if event[0] == "done":
+            steps.append(event[2:])
+            step_start = time.time()
+
+    return steps
+
+
+def _handler(undeploy_funcs, instances, max_workers=_WORKERS, timeout=_STEP_TIMEOUT,
+        retries=_RETRIES, timings=None):
     """Handles the undeployment
 
     Executes all undeployment functions for all instances and gathers up the
-    results. No short circuiting.
+    results. No short circuiting except that the functions after one that timed
+    out are skipped for that instance. Instances are handled concurrently while
+    the undeployment functions of an instance run in order.
 
     Args
     ----
@@ -47,20 +143,32 @@ def _handler(undeploy_funcs, instances):
         the input is a fully qualified instance name and the return is True upon
         success and False for failures
     instances: List of fully qualified instance names
+    max_workers: Number of instances handled at the same time
+    timeout: Seconds allowed for each function call. None means no limit.
+    retries: Number of times a failed function call is tried again
+    timings: Optional dict that gets filled with instance name to a tuple of
+        seconds taken per undeployment function
 
     Returns
     -------
     (failures, results) where each are a list of tuples.  Each tuple has the
     structure: `(<instance name>, result of func 1, result of func 2, ..)`.
     """
+    instances = list(instances)
+
     if not instances:
         return [], []
 
-    # Invoke all undeploy funcs for all instances
-    def invoke_undeploys(instance):
-        return tuple([ undeploy_func(instance) for undeploy_func in undeploy_funcs ])
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        steps = list(executor.map(partial(_undeploy_instance, undeploy_funcs,
+            timeout=timeout, retries=retries), instances))
+
+    results = [ (instance, ) + tuple(result for result, _ in instance_steps)
+            for instance, instance_steps in zip(instances, steps) ]
 
-    results = [ (instance, ) + invoke_undeploys(instance) for instance in instances ]
+    if timings is not None:
+        timings.update((instance, tuple(seconds for _, seconds in instance_steps))
+            for instance, instance_steps in zip(instances, steps))
 
     # Determine failures
     filter_failures_func = partial(filter, lambda result: not all(result[1:]))
@@ -69,8 +177,21 @@ def _handler(undeploy_funcs, instances):
     return failures, results
 
 
-def _handler_report(failures, results):
-    """Reports the result of handling"""
+def _handler_report(failures, results, timings=None, step_names=None):
+    """Reports the result of handling
+
+    timings and step_names are optional. When given, the time taken per
+    undeployment function is reported too.
+    """
+    if timings:
+        step_names = step_names or []
+        columns = list(zip(*timings.values()))
+
+        for i, seconds in enumerate(columns):
+            name = step_names[i] if i < len(step_names) else "step {0}".format(i + 1)
+            log.info("{0}: total {1:.2f}s, max {2:.2f}s".format(name, sum(seconds),
+                max(seconds)))
+
     if len(failures) > 0:
         failed_names = [ result[0] for result in failures ]
         log.warn("Could not completely undeploy: {0}".format(", ".join(failed_names)))
@@ -89,14 +210,21 @@ def _handler_report(failures, results):
         log.warn("Undeployed components: {0}".format(len(results)))
 
 
-def undeploy_component(user, cname, cver, catalog):
-    '''Undeploys a component based on the component type'''
-    cname, cver = catalog.verify_component(cname, cver)
+def _get_handler_settings():
+    settings = get_undeploy_settings()
+    return dict((k, settings[k]) for k in ("max_workers", "timeout", "retries")
+            if k in settings)
+
+
+def undeploy_instances(cname, cver, catalog, instances, timings=None):
+    '''Undeploys the given instances of a component based on the component type
+
+    Returns
+    -------
+    (failures, results) as returned by _handler
+    '''
     ctype = catalog.get_component_type(cname, cver)
     profile = profiles.get_profile()
-    # Get *all* instances of the component whether running healthy or in a bad partial
-    # deployed state
-    instances = get_healthy_instances(user, cname, cver) + get_defective_instances(user, cname, cver)
 
     if ctype == 'docker':
         client = du.get_docker_client(profile)
@@ -107,5 +235,138 @@ def undeploy_component(user, cname, cver, catalog):
     else:
         raise DcaeException("Unsupported component type for undeploy")
 
+    return _handler([undeploy_func, remove_config], instances, timings=timings,
+            **_get_handler_settings())
+
+
+def undeploy_component(user, cname, cver, catalog):
+    '''Undeploys a component based on the component type'''
+    cname, cver = catalog.verify_component(cname, cver)
+    # Get *all* instances of the component whether running healthy or in a bad partial
+    # deployed state
+    healthy, defective = lookup_snapshot(snapshot(user), cname, cver)
+    instances = healthy + defective
+
+    log.warn("Undeploying components: {0}".format(len(instances)))
+    timings = dict()
+    failures, results = undeploy_instances(cname, cver, catalog, instances, timings)
+    _handler_report(failures, results, timings, _STEP_NAMES)
+
+
+def _resolve_names(catalog_keys, snap):
+    """Re-keys a snapshot by the catalog names of its components
+
+    Snapshot names have their dashes turned into dots, see replace_dots, so a
+    component named foo-bar shows up as foo.bar. Names that aren't in the
+    catalog as is are matched on their dashed form. Components that still can't
+    be found keep their snapshot name.
+
+    Args
+    ----
+    catalog_keys: Iterable of the (name, version) tuples of the catalog components
+    snap: Snapshot as returned by discovery.snapshot
+    """
+    catalog_keys = set(catalog_keys)
+    dashed = dict(((replace_dots(cname), cver), (cname, cver)) for cname, cver in catalog_keys)
+    resolved = dict()
+
+    for (cname, cver), entry in snap.items():
+        key = (cname, cver)
+        if key not in catalog_keys:
+            key = dashed.get((replace_dots(cname), cver), key)
+        resolved[key] = entry
+
+    return resolved
+
+
+def select_instances(snap, match=None, defective_only=False):
+    """Selects component instances from a discovery snapshot
+
+    Args
+    ----
+    snap: Snapshot as returned by discovery.snapshot
+    match: Optional glob matched against the component name or name:version.
+        None selects every component. See _resolve_names to match catalog names.
+    defective_only: Only select instances that are not healthy
+
+    Returns
+    -------
+    Dict whose keys are component (name, version) tuples and values are lists
+    of instance names. Components without selected instances are left out.
+    """
+    selected = dict()
+
+    for (cname, cver), entry in snap.items():
+        if match and not (fnmatch(cname, match) or fnmatch(":".join([cname, cver]), match)):
+            continue
+
+        instances = list(entry["defective"]) if defective_only \
+                else entry["healthy"] + entry["defective"]
+
+        if instances:
+            selected[(cname, cver)] = instances
+
+    return selected
+
+
+def _group_by_type(get_type_func, selected):
+    """Groups selected components by component type
+
+    Components that can't be found in the catalog are logged and left out.
+
+    Returns
+    -------
+    Dict of component type to dict of component (name, version) to list of
+    instance names
+    """
+    groups = dict()
+
+    for (cname, cver), instances in sorted(selected.items()):
+        try:
+            ctype = get_type_func(cname, cver)
+        except MissingEntry:
+            log.warn("Skipping {0}:{1}, not found in the catalog".format(cname, cver))
+            continue
+        groups.setdefault(ctype, dict())[(cname, cver)] = instances
+
+    return groups
+
+
+def undeploy_components(user, catalog, match=None, defective_only=False):
+    """Undeploys many components in one pass
+
+    The deployed instances are looked up once and all selected instances are
+    undeployed concurrently sharing one Docker client and the broker session.
+    See select_instances for match and defective_only.
+    """
+    snap = snapshot(user)
+    catalog_keys = catalog.list_component_keys(set(cname for cname, _ in snap))
+    snap = _resolve_names(catalog_keys, snap)
+    selected = select_instances(snap, match, defective_only)
+    groups = _group_by_type(catalog.get_component_type, selected)
+    profile = profiles.get_profile()
+    undeploy_funcs = dict()
+
+    for ctype, components in groups.items():
+        if ctype == 'docker':
+            client = du.get_docker_client(profile)
+            for (cname, cver), instances in components.items():
+                func = partial(du.undeploy_component, client,
+                        catalog.get_docker_image(cname, cver))
+                undeploy_funcs.update((instance, func) for instance in instances)
+        elif ctype == 'cdap':
+            func = partial(undeploy_cdap_component, profile)
+            for instances in components.values():
+                undeploy_funcs.update((instance, func) for instance in instances)
+        else:
+            log.warn("Skipping unsupported component type for undeploy: {0}".format(ctype))
+
+    def undeploy_func(instance):
+        return undeploy_funcs[instance](instance)
+
+    instances = sorted(undeploy_funcs.keys())
     log.warn("Undeploying components: {0}".format(len(instances)))
-    _handler_report(*_handler([undeploy_func, remove_config], instances))
+    timings = dict()
+    failures, results = _handler([undeploy_func, remove_config], instances,
+            timings=timings, **_get_handler_settings())
+    _handler_report(failures, results, timings, _STEP_NAMES)
@@ -0,0 +1,88 @@
+# ============LICENSE_START=======================================================
+# org.onap.dcae
+# ================================================================================
+# Copyright (c) 2018 AT&T Intellectual Property. All rights reserved.
+# ================================================================================
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============LICENSE_END=========================================================
+#
+# ECOMP is a trademark and service mark of AT&T Intellectual Property.
+
+# -*- coding: utf-8 -*-
+"""
+Provides a registry of compiled json schema validators
+
+jsonschema.validate checks the schema against its metaschema and builds a new
+validator, including ref resolution, on every call. Validators here are built
+once per schema and reused for every instance validated against it.
+"""
+import json
+import hashlib
+
+from jsonschema.validators import validator_for
+from jsonschema.exceptions import best_match
+
+
+# (schema path, schema hash) -> validator
+_registry = {}
+
+# id(schema) -> (schema, schema hash). The schema is kept so that its id isn't
+# reused by another object. Bounded so that callers passing a new dict on every
+# call don't grow it without limit.
+_hashes = {}
+_MAX_HASHES = 64
+
+
+def _hash_schema(schema):
+    '''Returns the hash of a schema, computed once per schema object'''
+    try:
+        cached, hash_ = _hashes[id(schema)]
+        if cached is schema:
+            return hash_
+    except KeyError:
+        pass
+
+    if len(_hashes) >= _MAX_HASHES:
+        _hashes.clear()
+
+    hash_ = hashlib.sha256(json.dumps(schema, sort_keys=True).encode('utf-8')).hexdigest()
+    _hashes[id(schema)] = (schema, hash_)
+    return hash_
+
+
+def get_validator(schema_path, schema):
+    '''Returns the validator for a schema, building it on first use
+
+    Args
+    ----
+    schema_path: (string) identifies the schema e.g. its path on the remote server
+    schema: (dict) the json schema. Its hash is part of the key so that a changed
+        schema at the same path gets a new validator. The schema must not be
+        changed in place after it has been passed in.
+    '''
+    key = (schema_path, _hash_schema(schema))
+
+    try:
+        return _registry[key]
+    except KeyError:
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        validator = _registry[key] = cls(schema)
+        return validator
+
+
+def validate(instance, schema_path, schema):
+    '''Validates instance against schema, raising ValidationError like jsonschema.validate'''
+    error = best_match(get_validator(schema_path, schema).iter_errors(instance))
+    if error is not None:
+        raise error